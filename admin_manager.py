@@ -2,6 +2,7 @@
 from datetime import datetime, timedelta
 import pandas as pd
 import os
+import payroll
 
 class AdminManager:
     def __init__(self, data_handler, student_manager):
@@ -16,7 +17,7 @@ class AdminManager:
         present_today = len([r for r in attendance if r.get('status') == 'Present'])
         late_today = len([r for r in attendance if r.get('status') == 'Late'])
         total_employees = len(self.data_handler.get_all_employees())
-        total_students = len(self.data_handler.get_all_students())
+        total_students = self.data_handler.get_student_count()
         classes = self.data_handler.get_all_classes()
         class_counts = {}
         for class_name in classes:
@@ -53,6 +54,54 @@ class AdminManager:
         hours_analysis = self.data_handler.calculate_overtime(employee_id, start_date, end_date)
         return hours_analysis
 
+    # Payroll
+    def run_payroll(self, start_date, end_date, department=None):
+        """Payroll rows for all employees (optionally one department), sorted by name"""
+        # Zero-padded ISO only: rows are matched by string comparison ("2024-1-31" parses
+        # but would sort after "2024-10-01")
+        try:
+            valid = all(datetime.strptime(d, "%Y-%m-%d").strftime("%Y-%m-%d") == d for d in (start_date, end_date))
+        except (TypeError, ValueError):
+            valid = False
+        if not valid:
+            return False, "Dates must be in YYYY-MM-DD format", []
+        if start_date > end_date:
+            return False, "Start date must be on or before end date", []
+        rows = self.data_handler.calculate_payroll(start_date, end_date)
+        if department:
+            rows = [r for r in rows if r["department"] == department]
+        rows.sort(key=lambda r: r["name"].lower())
+        total_pay = sum(r["overtime_pay"] for r in rows)
+        return True, f"Payroll for {len(rows)} employees ({start_date} to {end_date}), overtime pay ${total_pay:.2f}", rows
+
+    def export_payroll_csv(self, start_date, end_date, department=None):
+        """Write a payroll run to reports/ as CSV; returns (success, message, path)"""
+        success, message, rows = self.run_payroll(start_date, end_date, department)
+        if not success:
+            return False, message, None
+        os.makedirs("reports", exist_ok=True)
+        filepath = os.path.join("reports", f"payroll_{start_date}_to_{end_date}.csv")
+        with open(filepath, "w", newline="") as f:
+            f.writelines(payroll.iter_csv(rows))
+        return True, message, filepath
+
+    # School-year rollover
+    def rollover_school_year(self, new_year=None, promotions=None, retain=()):
+        """Archive the closing year and promote all classes; returns (success, message, summary)"""
+        # Every student shard is rewritten below, so don't start without a backup
+        if not self.data_handler.create_backup():
+            return False, "Backup failed; rollover not started", None
+        try:
+            summary = self.data_handler.rollover_school_year(new_year, promotions, retain)
+        except FileExistsError:
+            return False, "This school year has already been archived", None
+        except (ValueError, OSError) as e:
+            return False, str(e), None
+        message = (f"School year {summary['closing_year']} archived; now {summary['new_year']}. "
+                   f"Promoted {summary['promoted']}, graduated {summary['graduated']}, "
+                   f"retained {summary['retained']}, unchanged {summary['unchanged']}")
+        return True, message, summary
+
     # Announcement management
     def create_announcement(self, title, content, author, author_id, priority="Medium", visible_to=None, attachments=None):
         if not title or not content:
@@ -223,10 +272,4 @@ class AdminManager:
         return True, "Valid assignment"
 
     def get_unread_announcements_count(self, employee_id, employee_department="All"):
-        announcements = self.data_handler.get_announcements_for_employee(employee_id, employee_department)
-        unread_count = 0
-        for ann in announcements:
-            read_by = ann.get("read_by", [])
-            if employee_id not in read_by:
-                unread_count += 1
-        return unread_count
\ No newline at end of file
+        return self.data_handler.get_unread_announcement_count(employee_id, employee_department)
\ No newline at end of file
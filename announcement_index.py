@@ -0,0 +1,208 @@
+# announcement_index.py - audience index, read log and unread sets for announcements
+# Announcements stay in dashboard.json; this keeps, per audience key ("All", a
+# department name or an employee id as a string - the values visible_to holds), the
+# ids visible to it, newest first. Read receipts are appended to
+# data/announcement_reads.log ("<announcement id>,<employee id>" per line) instead of
+# rewriting dashboard.json, and each employee's unread set is built once from the
+# index and then updated in place as announcements are posted and read, so badge
+# counts cost O(1) and unread lists O(unread) however long the history gets.
+# Writes made elsewhere (another process, AdminManager edits) are picked up through
+# the file signatures, which trigger a one-off rebuild.
+import os
+import heapq
+import threading
+from bisect import insort
+
+ALL = "All"
+
+
+def audience_keys(employee_id, department):
+    keys = [ALL, str(employee_id)]
+    if department and department != ALL:
+        keys.append(department)
+    return keys
+
+
+def _sort_key(ann):
+    return (ann.get("date", ""), ann.get("id", 0))
+
+
+class AnnouncementIndex:
+    def __init__(self, data_handler, reads_file):
+        self.data_handler = data_handler
+        self.reads_file = reads_file
+        self._lock = threading.RLock()
+        self._signature = None
+        self._by_id = {}        # id -> announcement dict
+        self._audiences = {}    # audience key -> sorted [(date, id)], oldest first
+        self._reads = {}        # employee id -> {announcement ids}
+        self._reads_offset = 0  # bytes of the read log already applied
+        self._unread = {}       # (employee id, department) -> {announcement ids}
+
+    # Loading
+    def _dashboard_signature(self):
+        try:
+            st = os.stat(self.data_handler.dashboard_file)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _rebuild(self):
+        self._by_id = {}
+        self._audiences = {}
+        for ann in self.data_handler.load_json(self.data_handler.dashboard_file).get("announcements", []):
+            self._add(ann)
+        self._unread = {}
+        self._signature = self._dashboard_signature()
+
+    def _add(self, ann):
+        self._by_id[ann.get("id")] = ann
+        for key in {str(x) for x in (ann.get("visible_to") or [ALL])}:
+            insort(self._audiences.setdefault(key, []), _sort_key(ann))
+
+    def _read_log(self):
+        """Apply read-log lines appended since the last call (by us or another process)"""
+        try:
+            size = os.path.getsize(self.reads_file)
+        except OSError:
+            size = 0
+        if size < self._reads_offset:  # truncated or restored: start over
+            self._reads = {}
+            self._reads_offset = 0
+            self._unread = {}
+        if size == self._reads_offset:
+            return
+        # Binary, so the offset counts bytes on disk (text mode would translate
+        # newlines on Windows and seek to the middle of a line)
+        with open(self.reads_file, "rb") as f:
+            f.seek(self._reads_offset)
+            chunk = f.read()
+        complete = chunk.rfind(b"\n") + 1  # ignore a partly written last line
+        for line in chunk[:complete].splitlines():
+            ann_id, _, emp_id = line.partition(b",")
+            try:
+                ann_id, emp_id = int(ann_id), int(emp_id)
+            except ValueError:
+                continue
+            self._apply_read(ann_id, emp_id)
+        self._reads_offset += complete
+
+    def _apply_read(self, ann_id, emp_id):
+        self._reads.setdefault(emp_id, set()).add(ann_id)
+        for (unread_emp, _), unread in self._unread.items():
+            if unread_emp == emp_id:
+                unread.discard(ann_id)
+
+    def invalidate(self):
+        """Forget the index and the applied read log; both are rebuilt on next use"""
+        with self._lock:
+            self._signature = None
+            self._reads = {}
+            self._reads_offset = 0
+            self._unread = {}
+
+    def _current(self):
+        if self._signature is None or self._signature != self._dashboard_signature():
+            self._rebuild()
+        self._read_log()
+
+    # Migration
+    def migrate_read_by(self):
+        """Move legacy per-announcement read_by lists into the read log (one dashboard.json
+        write); returns the number of receipts moved"""
+        data = self.data_handler.load_json(self.data_handler.dashboard_file)
+        announcements = data.get("announcements", [])
+        if not any("read_by" in ann for ann in announcements):
+            return 0
+        lines = []
+        for ann in announcements:
+            for emp_id in ann.pop("read_by", None) or []:
+                lines.append(f"{ann.get('id')},{emp_id}\n")
+        with self._lock:
+            if lines:
+                self._append(lines)
+            self.data_handler.save_json(self.data_handler.dashboard_file, data)
+        return len(lines)
+
+    # Writes
+    def _append(self, lines):
+        os.makedirs(os.path.dirname(self.reads_file), exist_ok=True)
+        with open(self.reads_file, "ab") as f:
+            f.write("".join(lines).encode("utf-8"))
+        self.data_handler.notifier.notify_write(self.reads_file)
+
+    def expect_write(self):
+        """Call before saving dashboard.json with a new announcement; returns whether the
+        index is current (so added() can update it instead of rebuilding)"""
+        with self._lock:
+            return self._signature is not None and self._signature == self._dashboard_signature()
+
+    def added(self, ann, was_current=True):
+        with self._lock:
+            if not was_current:
+                self._signature = None
+                return
+            self._add(ann)
+            keys = {str(x) for x in (ann.get("visible_to") or [ALL])}
+            for (emp_id, department), unread in self._unread.items():
+                if keys.intersection(audience_keys(emp_id, department)):
+                    unread.add(ann.get("id"))
+            self._signature = self._dashboard_signature()
+
+    def mark_read(self, employee_id, announcement_ids):
+        """Append receipts for the ids this employee hasn't read yet; returns how many"""
+        with self._lock:
+            self._current()
+            already = self._reads.get(employee_id, set())
+            new = [a for a in dict.fromkeys(announcement_ids) if a in self._by_id and a not in already]
+            if not new:
+                return 0
+            self._append([f"{a},{employee_id}\n" for a in new])
+            self._read_log()
+            return len(new)
+
+    # Queries
+    def _visible_ids(self, employee_id, department):
+        lists = [self._audiences.get(k, []) for k in audience_keys(employee_id, department)]
+        seen = set()
+        for _, ann_id in heapq.merge(*[reversed(lst) for lst in lists], reverse=True):
+            if ann_id not in seen:
+                seen.add(ann_id)
+                yield ann_id
+
+    def _unread_set(self, employee_id, department):
+        key = (employee_id, department)
+        unread = self._unread.get(key)
+        if unread is None:
+            read = self._reads.get(employee_id, set())
+            unread = {a for a in self._visible_ids(employee_id, department) if a not in read}
+            self._unread[key] = unread
+        return unread
+
+    def for_employee(self, employee_id, department=ALL, unread_only=False, limit=None):
+        """Visible announcements, newest first, each with an "unread" flag"""
+        with self._lock:
+            self._current()
+            unread = self._unread_set(employee_id, department)
+            if unread_only:
+                ids = sorted(unread, key=lambda a: _sort_key(self._by_id[a]), reverse=True)
+            else:
+                ids = self._visible_ids(employee_id, department)
+            result = []
+            for ann_id in ids:
+                if limit is not None and len(result) >= limit:
+                    break
+                ann = dict(self._by_id[ann_id])
+                ann["unread"] = ann_id in unread
+                result.append(ann)
+            return result
+
+    def unread_count(self, employee_id, department=ALL):
+        with self._lock:
+            self._current()
+            return len(self._unread_set(employee_id, department))
+
+    def read_count(self, announcement_id):
+        with self._lock:
+            self._current()
+            return sum(1 for ids in self._reads.values() if announcement_id in ids)
@@ -1,30 +1,121 @@
 # Simple Flask API to serve the INDEX.HTML SIS frontend and expose endpoints
 # that the frontend will call. Uses the same JSON-backed DataHandler.
-from flask import Flask, jsonify, request, send_from_directory, send_file, abort
+from flask import Flask, jsonify, request, send_from_directory, send_file, abort, Response, stream_with_context, g, url_for
 import os
 from io import BytesIO
 import base64
+import shutil
+import tempfile
 from werkzeug.utils import secure_filename
+from werkzeug.local import LocalProxy
 
-def create_app(data_handler=None, static_folder=".", static_index="INDEX.HTML"):
+import json_codec
+
+try:
+    from flask.json.provider import DefaultJSONProvider
+except ImportError:  # Flask < 2.2: jsonify keeps the stdlib encoder
+    DefaultJSONProvider = None
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+UPLOAD_SPOOL_SIZE = 1024 * 1024  # raw bodies above this go to a temp file on disk
+
+
+def spool_photo_upload(req):
+    """Return a binary file object for a photo sent as multipart ('photo' part) or as a
+    raw image/* or application/octet-stream body, or None if the request has no photo.
+
+    Multipart parts are already spooled to a temp file by werkzeug; raw bodies are
+    copied from the input stream in chunks rather than read into memory at once.
+    """
+    if req.files:
+        upload = req.files.get("photo") or next(iter(req.files.values()))
+        return upload.stream if upload and upload.filename is not None else None
+    if req.mimetype.startswith("image/") or req.mimetype == "application/octet-stream":
+        spool = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_SIZE)
+        shutil.copyfileobj(req.stream, spool, UPLOAD_CHUNK_SIZE)
+        if spool.tell() == 0:
+            spool.close()
+            return None
+        spool.seek(0)
+        return spool
+    return None
+
+if DefaultJSONProvider is not None:
+    class CodecJSONProvider(DefaultJSONProvider):
+        """jsonify / request.get_json through json_codec (orjson or msgspec when installed)"""
+        def dumps(self, obj, **kwargs):
+            return json_codec.dumps(obj, default=self.default).decode("utf-8")
+
+        def loads(self, s, **kwargs):
+            return json_codec.loads(s)
+
+        def response(self, *args, **kwargs):
+            obj = self._prepare_response_obj(args, kwargs)
+            return self._app.response_class(json_codec.dumps(obj, default=self.default), mimetype=self.mimetype)
+
+
+def json_response(payload, status=200):
+    """JSON response encoded by json_codec; payload values may be json_codec.Raw bytes"""
+    return Response(json_codec.dumps(payload), status=status, mimetype="application/json")
+
+
+def create_app(data_handler=None, static_folder=".", static_index="INDEX.HTML", tenant_pool=None):
+    """The API for one DataHandler, or - given a tenant_pool.TenantPool - for every
+    school in the pool, chosen per request"""
     # Import backend classes here to avoid import-time circular dependencies
     from data_handler import DataHandler
     from student_manager import StudentManager
     from admin_manager import AdminManager
     from report_generator import ReportGenerator
+    from tenant_pool import SchoolPrefixMiddleware, UnknownSchool, ENVIRON_KEY as SCHOOL_ENVIRON_KEY, HEADER as SCHOOL_HEADER
+    import photo_pipeline
+    import payroll
 
     app = Flask(__name__, static_folder=static_folder)
     app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16 MB limit for uploads
+    if DefaultJSONProvider is not None:
+        app.json = CodecJSONProvider(app)
+
+    if tenant_pool is not None:
+        # One school per request (X-School-ID header or /schools/<id>/ prefix); the names
+        # the routes below use resolve to that school's objects
+        app.wsgi_app = SchoolPrefixMiddleware(app.wsgi_app)
+        data_handler = LocalProxy(lambda: g.tenant.data_handler)
+        student_manager = LocalProxy(lambda: g.tenant.student_manager)
+        admin_manager = LocalProxy(lambda: g.tenant.admin_manager)
+        report_generator = LocalProxy(lambda: g.tenant.report_generator)
+
+        @app.before_request
+        def select_school():
+            if request.endpoint in (None, "static", "serve_sis_index"):
+                return None
+            school_id = request.environ.get(SCHOOL_ENVIRON_KEY) or request.headers.get(SCHOOL_HEADER)
+            if not school_id:
+                return jsonify({"success": False, "message": f"{SCHOOL_HEADER} header or /schools/<id>/ prefix required"}), 400
+            try:
+                g.tenant = tenant_pool.acquire(school_id)
+            except UnknownSchool as e:
+                return jsonify({"success": False, "message": str(e)}), 404
+            return None
 
-    # Use provided DataHandler instance if given (so GUI and API can share same instance),
-    # otherwise create one locally.
-    if data_handler is None:
-        data_handler = DataHandler()
-    student_manager = StudentManager(data_handler)
-    admin_manager = AdminManager(data_handler, student_manager)
-    report_generator = ReportGenerator(data_handler)
+        @app.teardown_request
+        def release_school(exc):
+            tenant = g.pop("tenant", None)
+            if tenant is not None:
+                tenant_pool.release(tenant)
+    else:
+        # Use provided DataHandler instance if given (so GUI and API can share same instance),
+        # otherwise create one locally.
+        if data_handler is None:
+            data_handler = DataHandler()
+        student_manager = StudentManager(data_handler)
+        admin_manager = AdminManager(data_handler, student_manager)
+        report_generator = ReportGenerator(data_handler)
+        # Pick up writes from other processes / DataHandler instances for /api/events
+        data_handler.start_change_watcher()
 
-    # Serve the front-end index page
+    # Serve the front-end index page (also at "/", so /schools/<id>/ opens that school's page)
+    @app.route("/")
     @app.route("/sis")
     def serve_sis_index():
         return send_from_directory(static_folder, static_index)
@@ -32,14 +123,50 @@ def create_app(data_handler=None, static_folder=".", static_index="INDEX.HTML"):
     # Serve photos (student/employee photos saved in data/photos)
     @app.route("/photos/<path:filename>")
     def serve_photos(filename):
-        photos_dir = data_handler.photos_dir
-        safe = os.path.normpath(os.path.join(photos_dir, filename))
-        if os.path.exists(safe):
-            return send_file(safe)
-        abort(404)
+        if os.path.basename(filename).startswith("."):
+            abort(404)
+        # send_from_directory rejects paths escaping photos_dir and answers
+        # If-None-Match / If-Modified-Since with 304 using the file's ETag
+        response = send_from_directory(os.path.abspath(data_handler.photos_dir), filename, conditional=True, etag=True)
+        if photo_pipeline.is_hashed_name(filename):
+            # Content-addressed names never change content
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        else:
+            # Legacy student_<id>.jpg style names are overwritten in place; revalidate each time
+            response.headers["Cache-Control"] = "no-cache"
+        return response
 
     # --- API endpoints ---
 
+    # Server-Sent Events stream of data changes (kinds=students,attendance,... to filter)
+    @app.route("/api/events", methods=["GET"])
+    def api_events():
+        kinds = [k.strip() for k in (request.args.get("kinds") or "").split(",") if k.strip()]
+        last_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+        stream = data_handler.notifier.open_stream(kinds or None, since=last_id)
+
+        def generate():
+            try:
+                yield "retry: 3000\n\n"
+                while True:
+                    event = stream.get(timeout=15)
+                    if event is None:
+                        yield ": keep-alive\n\n"
+                        continue
+                    yield f"id: {event.seq}\nevent: {event.kind}\ndata: {json_codec.dumps(event.to_dict()).decode('utf-8')}\n\n"
+            finally:
+                stream.close()
+
+        response = Response(stream_with_context(generate()), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+        tenant = g.get("tenant")
+        if tenant is not None:
+            # The stream outlives the request, so it keeps its school checked out until
+            # the server closes the response (even one that was never iterated)
+            tenant_pool.retain(tenant)
+            response.call_on_close(lambda: tenant_pool.release(tenant))
+        return response
+
     @app.route("/api/classes", methods=["GET"])
     def api_get_classes():
         classes = data_handler.get_all_classes()
@@ -48,11 +175,9 @@ def create_app(data_handler=None, static_folder=".", static_index="INDEX.HTML"):
     @app.route("/api/students", methods=["GET"])
     def api_get_students():
         class_name = request.args.get("class")  # expects e.g. "Grade 10"
-        if class_name:
-            students = data_handler.get_students_by_class(class_name)
-        else:
-            students = data_handler.get_all_students()
-        return jsonify({"success": True, "students": students})
+        # Cached shard encodings go out as-is, without a decode/encode round trip
+        students = data_handler.get_students_json(class_name)
+        return json_response({"success": True, "students": json_codec.Raw(students)})
 
     @app.route("/api/students/<int:student_id>", methods=["GET"])
     def api_get_student(student_id):
@@ -63,12 +188,16 @@ def create_app(data_handler=None, static_folder=".", static_index="INDEX.HTML"):
 
     @app.route("/api/students", methods=["POST"])
     def api_create_student():
-        payload = request.get_json() or {}
+        # JSON body, or multipart/form-data fields with an optional 'photo' file part
+        if request.mimetype == "multipart/form-data":
+            payload = request.form.to_dict()
+        else:
+            payload = request.get_json(silent=True) or {}
         name = payload.get("name")
         class_name = payload.get("class")
         if not name or not class_name:
             return jsonify({"success": False, "message": "name and class are required"}), 400
-        ok, msg = student_manager.add_new_student(
+        ok, msg, student_id = student_manager.create_student(
             name=name,
             class_name=class_name,
             parent_contact=payload.get("parent_contact", ""),
@@ -79,9 +208,18 @@ def create_app(data_handler=None, static_folder=".", static_index="INDEX.HTML"):
             allergies=payload.get("allergies", ""),
             emergency_contact=payload.get("emergency_contact", "")
         )
-        if ok:
-            return jsonify({"success": True, "message": msg})
-        return jsonify({"success": False, "message": msg}), 400
+        if not ok:
+            return jsonify({"success": False, "message": msg}), 400
+        result = {"success": True, "message": msg, "id": student_id}
+        photo = spool_photo_upload(request)
+        if photo is not None:
+            with photo:
+                filename = data_handler.save_student_photo(student_id, photo)
+            if filename:
+                result["photo_url"] = url_for("serve_photos", filename=filename)
+            else:
+                result["message"] = f"{msg} (photo could not be saved)"
+        return jsonify(result)
 
     @app.route("/api/students/<int:student_id>", methods=["PUT"])
     def api_update_student(student_id):
@@ -112,8 +250,6 @@ def create_app(data_handler=None, static_folder=".", static_index="INDEX.HTML"):
         payload = request.get_json()
         if not isinstance(payload, list):
             return jsonify({"success": False, "message": "Expected an array of students"}), 400
-        base = data_handler.load_json(data_handler.students_file)
-        next_id = max([s.get("id", 0) for s in base.get("students", [])], default=0)
         new_list = []
         for s in payload:
             # Accept either 'fullName'/'grade' (frontend) or 'name'/'class' (API style)
@@ -121,9 +257,8 @@ def create_app(data_handler=None, static_folder=".", static_index="INDEX.HTML"):
             grade_raw = s.get("grade") or (s.get("class") and s.get("class").replace("Grade ", ""))
             if not fullname or not grade_raw:
                 return jsonify({"success": False, "message": "Each student must have fullName (or name) and grade (or class)"}), 400
-            next_id += 1
             new_list.append({
-                "id": next_id,
+                "id": None,
                 "name": fullname,
                 "class": f"Grade {grade_raw}",
                 "parent_contact": s.get("parentPhone", s.get("parent_contact", "")),
@@ -141,8 +276,12 @@ def create_app(data_handler=None, static_folder=".", static_index="INDEX.HTML"):
                 "monthly_attendance": {},
                 "term_attendance": {}
             })
-        base["students"] = new_list
-        ok = data_handler.save_json(data_handler.students_file, base)
+        # One block of ids for the whole import, reserved once every row has validated
+        if new_list:
+            first_id = data_handler.reserve_ids("students", len(new_list))
+            for offset, student in enumerate(new_list):
+                student["id"] = first_id + offset
+        ok = data_handler.replace_students(new_list)
         if ok:
             return jsonify({"success": True})
         return jsonify({"success": False}), 500
@@ -157,14 +296,21 @@ def create_app(data_handler=None, static_folder=".", static_index="INDEX.HTML"):
 
     @app.route("/api/students/<int:student_id>/photo", methods=["POST"])
     def api_upload_photo(student_id):
-        payload = request.get_json() or {}
-        image_b64 = payload.get("image_base64")
-        if not image_b64:
-            return jsonify({"success": False, "message": "image_base64 required"}), 400
+        # Preferred: multipart 'photo' part or a raw image body; JSON image_base64 is still accepted
+        photo = spool_photo_upload(request)
+        if photo is None:
+            payload = request.get_json(silent=True) or {}
+            image_b64 = payload.get("image_base64")
+            if not image_b64:
+                return jsonify({"success": False, "message": "photo file or image_base64 required"}), 400
         try:
-            filename = data_handler.save_student_photo_from_base64(student_id, image_b64)
+            if photo is not None:
+                with photo:
+                    filename = data_handler.save_student_photo(student_id, photo)
+            else:
+                filename = data_handler.save_student_photo_from_base64(student_id, image_b64)
             if filename:
-                return jsonify({"success": True, "photo_url": f"/photos/{filename}"})
+                return jsonify({"success": True, "photo_url": url_for("serve_photos", filename=filename)})
             return jsonify({"success": False, "message": "Failed to save photo"}), 500
         except Exception as e:
             return jsonify({"success": False, "message": str(e)}), 500
@@ -188,6 +334,133 @@ def create_app(data_handler=None, static_folder=".", static_index="INDEX.HTML"):
             return send_file(filepath, as_attachment=True)
         return jsonify({"success": False, "message": message}), 400
 
+    # Class positions: one student's positions per term, or a class/term table
+    @app.route("/api/students/<int:student_id>/rankings", methods=["GET"])
+    def api_student_rankings(student_id):
+        return jsonify({"success": True, "rankings": data_handler.rankings.student_positions(student_id)})
+
+    @app.route("/api/rankings", methods=["GET"])
+    def api_rankings():
+        class_name = request.args.get("class")
+        term = request.args.get("term")
+        if not class_name or not term:
+            return jsonify({"success": False, "message": "class and term are required"}), 400
+        table = data_handler.rankings.class_table(class_name, term, request.args.get("subject"))
+        return jsonify({"success": True, "rankings": [{"rank": rank, "student_id": sid, "score": score} for rank, sid, score in table]})
+
+    # Class academic statistics (?class=Grade 10 for one class, otherwise all classes)
+    @app.route("/api/analytics", methods=["GET"])
+    def api_analytics():
+        class_name = request.args.get("class")
+        if class_name:
+            if class_name not in data_handler.get_all_classes():
+                return jsonify({"success": False, "message": "Class not found"}), 404
+            return jsonify({"success": True, "analytics": report_generator.analytics.class_summary(class_name)})
+        return jsonify({"success": True, "analytics": report_generator.analytics.all_classes()})
+
+    # Payroll for a period as JSON, or streamed as CSV with ?format=csv
+    @app.route("/api/payroll", methods=["GET"])
+    def api_payroll():
+        start, end = request.args.get("start"), request.args.get("end")
+        if not start or not end:
+            return jsonify({"success": False, "message": "start and end (YYYY-MM-DD) are required"}), 400
+        ok, msg, rows = admin_manager.run_payroll(start, end, request.args.get("department"))
+        if not ok:
+            return jsonify({"success": False, "message": msg}), 400
+        if request.args.get("format") == "csv":
+            return Response(stream_with_context(payroll.iter_csv(rows)), mimetype="text/csv",
+                            headers={"Content-Disposition": f"attachment; filename=payroll_{start}_to_{end}.csv"})
+        return jsonify({"success": True, "message": msg, "payroll": rows})
+
+    # Backups: list snapshots, take one now, or restore one
+    @app.route("/api/backups", methods=["GET"])
+    def api_backups():
+        return jsonify({"success": True, "backups": data_handler.list_backups()})
+
+    @app.route("/api/backups", methods=["POST"])
+    def api_create_backup():
+        if not data_handler.create_backup():
+            return jsonify({"success": False, "message": "Backup failed"}), 500
+        return jsonify({"success": True, "backups": data_handler.list_backups()})
+
+    @app.route("/api/backups/<snapshot_id>/restore", methods=["POST"])
+    def api_restore_backup(snapshot_id):
+        if not data_handler.restore_backup(snapshot_id):
+            return jsonify({"success": False, "message": "Backup not found or restore failed"}), 400
+        return jsonify({"success": True, "message": f"Restored backup {snapshot_id}"})
+
+    # Past school years from the archives plus the current one
+    @app.route("/api/students/<int:student_id>/transcript", methods=["GET"])
+    def api_student_transcript(student_id):
+        years = data_handler.get_student_transcript(student_id)
+        if not years:
+            return jsonify({"success": False, "message": "Student not found"}), 404
+        return jsonify({"success": True, "transcript": years})
+
+    @app.route("/api/school_year/archives", methods=["GET"])
+    def api_school_year_archives():
+        return jsonify({"success": True, "years": data_handler.archives.years()})
+
+    # Year-end rollover: {"new_year": "2025-2026", "promotions": {"Grade 12": null}, "retain": [ids]}, all optional
+    @app.route("/api/school_year/rollover", methods=["POST"])
+    def api_school_year_rollover():
+        payload = request.get_json(silent=True) or {}
+        ok, msg, summary = admin_manager.rollover_school_year(payload.get("new_year"), payload.get("promotions"), payload.get("retain") or ())
+        if not ok:
+            return jsonify({"success": False, "message": msg}), 400
+        return jsonify({"success": True, "message": msg, "summary": summary})
+
+    # Schema check of every data file; lists the records that fail validation
+    @app.route("/api/data/validate", methods=["GET"])
+    def api_validate_data():
+        report = data_handler.validate_data()
+        return jsonify({"success": True, "checked": report["checked"],
+                        "errors": [error._asdict() for error in report["errors"]]})
+
+    # Live events by date (?start=&end= or ?days=N from today) and archived dashboard history
+    @app.route("/api/dashboard/events", methods=["GET"])
+    def api_dashboard_events():
+        start, end = request.args.get("start"), request.args.get("end")
+        if start or end:
+            events = data_handler.get_events_between(start, end)
+        else:
+            events = data_handler.get_upcoming_events(request.args.get("days", type=int), request.args.get("limit", type=int))
+        return jsonify({"success": True, "events": events})
+
+    @app.route("/api/dashboard/history", methods=["GET"])
+    def api_dashboard_history():
+        kind = request.args.get("kind", "announcements")
+        if kind not in ("announcements", "events"):
+            return jsonify({"success": False, "message": "kind must be announcements or events"}), 400
+        page = max(request.args.get("page", 1, type=int), 1)
+        page_size = min(max(request.args.get("page_size", 20, type=int), 1), 200)
+        return jsonify({"success": True, **data_handler.get_dashboard_history(kind, page, page_size)})
+
+    # Announcements visible to an employee (?unread=1 for unread only) and read receipts
+    @app.route("/api/employee/<int:employee_id>/announcements", methods=["GET"])
+    def api_employee_announcements(employee_id):
+        emp = admin_manager.get_employee_full_info(employee_id)
+        if not emp:
+            return jsonify({"success": False, "message": "Employee not found"}), 404
+        department = emp.get("department", "All")
+        limit = request.args.get("limit", type=int)
+        announcements = data_handler.get_announcements_for_employee(employee_id, department, unread_only=request.args.get("unread") == "1", limit=limit)
+        return jsonify({"success": True, "announcements": announcements, "unread": data_handler.get_unread_announcement_count(employee_id, department)})
+
+    @app.route("/api/employee/<int:employee_id>/announcements/read", methods=["POST"])
+    def api_mark_announcements_read(employee_id):
+        if not admin_manager.get_employee_full_info(employee_id):
+            return jsonify({"success": False, "message": "Employee not found"}), 404
+        ids = (request.get_json(silent=True) or {}).get("ids") or []
+        try:
+            if not isinstance(ids, list):
+                raise TypeError
+            ids = [int(i) for i in ids]
+        except (TypeError, ValueError):
+            return jsonify({"success": False, "message": "ids must be a list of announcement ids"}), 400
+        marked = data_handler.mark_announcements_as_read(ids, employee_id)
+        return jsonify({"success": True, "marked": marked})
+
     @app.route("/api/employee/<int:employee_id>/context", methods=["GET"])
     def api_employee_context(employee_id):
         emp = admin_manager.get_employee_full_info(employee_id)
@@ -207,4 +480,30 @@ def create_app(data_handler=None, static_folder=".", static_index="INDEX.HTML"):
         settings = data_handler.load_json(data_handler.settings_file)
         return jsonify({"success": True, "school_info": school_info, "terms": settings.get("terms", []), "term_days_default": settings.get("term_days_default", 60)})
 
-    return app
\ No newline at end of file
+    return app
+
+
+# Headless server (no GUI): python api_server.py [host] [port] [schools_dir]
+# With schools_dir, every subdirectory is a school served through a TenantPool.
+if __name__ == "__main__":
+    import sys
+    from data_handler import DataHandler
+    from maintenance import create_scheduler
+
+    host = sys.argv[1] if len(sys.argv) > 1 else "127.0.0.1"
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    if len(sys.argv) > 3:
+        from tenant_pool import TenantPool
+        pool = TenantPool(sys.argv[3])
+        try:
+            create_app(tenant_pool=pool).run(host=host, port=port, threaded=True)
+        finally:
+            pool.close()
+        sys.exit(0)
+    handler = DataHandler()
+    scheduler = create_scheduler(handler)
+    scheduler.start()
+    try:
+        create_app(data_handler=handler).run(host=host, port=port, threaded=True)
+    finally:
+        scheduler.stop()
\ No newline at end of file
@@ -0,0 +1,301 @@
+# attendance_store.py - employee attendance partitioned into monthly segment files
+# data/attendance/ holds one file per month ("2024-03.json", {"attendance": [...]})
+# plus manifest.json listing the segments. Range queries open only the months they
+# overlap. The current month is the hot segment and is rewritten on each check-in/out;
+# earlier months are sealed: marked closed and, if compress_closed, gzipped. A sealed
+# file is never modified in place - a late correction writes a new revision
+# ("2024-03.r2.json.gz") and swaps the manifest entry, so a sealed file's contents
+# never change once written (incremental backups see it as unchanged forever).
+# Segments are JSON or MessagePack ("2024-03.msgpack.gz") per the manifest's "format";
+# convert() rewrites every month in the other format. A replaced segment file that a
+# reader may still open (retain(filename), see snapshots) is left in place until
+# collect_replaced() finds it unreferenced.
+import os
+import re
+import gzip
+import threading
+from datetime import date
+
+import json_codec
+import storage_format
+from records import AttendanceRecord
+
+MANIFEST = "manifest.json"
+UNDATED = "undated"  # segment for rows without a usable YYYY-MM-DD date
+_MONTH_RE = re.compile(r"^\d{4}-\d{2}$")
+_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+def month_of(record_date):
+    key = (record_date or "")[:7]
+    return key if _MONTH_RE.match(key) else UNDATED
+
+
+def months_between(start_date, end_date):
+    """'YYYY-MM' keys covering start_date..end_date (ISO dates), inclusive; None if
+    either isn't YYYY-MM-DD (callers then read every month and filter rows by date)"""
+    if not (_DATE_RE.match(start_date or "") and _DATE_RE.match(end_date or "")):
+        return None
+    year, month = int(start_date[:4]), int(start_date[5:7])
+    end_year, end_month = int(end_date[:4]), int(end_date[5:7])
+    keys = []
+    while (year, month) <= (end_year, end_month):
+        keys.append(f"{year:04d}-{month:02d}")
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+    return keys
+
+
+class AttendanceStore:
+    def __init__(self, root_dir, compress_closed=True, on_write=None):
+        self.root_dir = root_dir
+        self.manifest_file = os.path.join(root_dir, MANIFEST)
+        self.compress_closed = compress_closed
+        self.on_write = on_write  # called with the manifest path after each change
+        self.retain = None  # retain(filename) -> True while a reader may still open a replaced file
+        self._lock = threading.RLock()
+        self._cache = {}  # month -> (file, (mtime_ns, size), [AttendanceRecord])
+        os.makedirs(root_dir, exist_ok=True)
+
+    # Manifest
+    def manifest(self):
+        try:
+            data = json_codec.load(self.manifest_file)
+        except (FileNotFoundError, *json_codec.DECODE_ERRORS):
+            data = {}
+        data.setdefault("version", 1)
+        data.setdefault("format", storage_format.JSON)
+        data.setdefault("segments", {})
+        return data
+
+    def months(self):
+        return sorted(self.manifest()["segments"])
+
+    def _write_file(self, path, payload, compress, fmt=storage_format.JSON):
+        tmp = os.path.join(self.root_dir, f".{os.path.basename(path)}.tmp")
+        raw = storage_format.dumps(payload, fmt, indent=not compress)
+        if compress:
+            # mtime=0 keeps the bytes identical for identical contents
+            raw = gzip.compress(raw, mtime=0)
+        with open(tmp, "wb") as f:
+            f.write(raw)
+        os.replace(tmp, path)
+
+    def _save_manifest(self, manifest):
+        # Every change ends with a manifest write, so that is the one change event
+        self._write_file(self.manifest_file, manifest, compress=False)
+        if self.on_write:
+            self.on_write(self.manifest_file)
+
+    def consistent(self):
+        """Lock held by every write; readers holding it see whole changes only"""
+        return self._lock
+
+    # Segment IO
+    def _segment_bytes(self, filename):
+        with open(os.path.join(self.root_dir, filename), "rb") as f:
+            raw = f.read()
+        return gzip.decompress(raw) if filename.endswith(".gz") else raw
+
+    def segment_bytes(self, month):
+        """(file name, uncompressed JSON bytes) of a month's segment, or None"""
+        entry = self.manifest()["segments"].get(month)
+        return (entry["file"], self._segment_bytes(entry["file"])) if entry else None
+
+    def _read_segment(self, filename):
+        try:
+            return storage_format.loads(self._segment_bytes(filename)).get("attendance", [])
+        except (OSError, EOFError, *json_codec.DECODE_ERRORS) as e:
+            print(f"Error reading attendance segment {filename}: {e}")
+            return []
+
+    def load_month(self, month):
+        """Rows of one month as fresh dicts (safe to modify and pass to save_month)"""
+        entry = self.manifest()["segments"].get(month)
+        return self._read_segment(entry["file"]) if entry else []
+
+    def records(self, month, filename=None):
+        """Rows of one month as shared AttendanceRecord objects (read-only), cached per file.
+        filename asks for a specific segment file (a snapshot's sealed month); if a late
+        correction has replaced it since, that (retained) file is read uncached."""
+        entry = self.manifest()["segments"].get(month)
+        if filename and (not entry or entry["file"] != filename):
+            if os.path.exists(os.path.join(self.root_dir, filename)):
+                return [AttendanceRecord.from_dict(d) for d in self._read_segment(filename)]
+        if not entry:
+            return []
+        filename = entry["file"]
+        path = os.path.join(self.root_dir, filename)
+        try:
+            st = os.stat(path)
+            sig = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            sig = None
+        with self._lock:
+            cached = self._cache.get(month)
+        if cached and sig is not None and cached[0] == filename and cached[1] == sig:
+            return cached[2]
+        rows = [AttendanceRecord.from_dict(d) for d in self._read_segment(filename)]
+        with self._lock:
+            self._cache[month] = (filename, sig, rows)
+        return rows
+
+    def save_month(self, month, rows):
+        """Replace a month's rows. Open months are rewritten in place; a closed month
+        gets a new revision file and the old one is removed once the manifest points away."""
+        with self._lock:
+            manifest = self.manifest()
+            segments = manifest["segments"]
+            entry = segments.get(month, {"revision": 0, "closed": False})
+            old_file = entry.get("file")
+            if entry.get("closed"):
+                revision = entry.get("revision", 1) + 1
+                compress = old_file.endswith(".gz") if old_file else self.compress_closed
+            else:
+                revision = entry.get("revision", 0) or 1
+                compress = False
+            filename = self._segment_name(month, revision, compress, manifest["format"])
+            self._write_file(os.path.join(self.root_dir, filename), {"attendance": rows}, compress, manifest["format"])
+            segments[month] = dict(entry, file=filename, revision=revision, rows=len(rows))
+            self._save_manifest(manifest)
+            if old_file and old_file != filename:
+                self._remove_replaced(old_file)
+            self._cache.pop(month, None)
+            return True
+
+    @staticmethod
+    def _segment_name(month, revision, compress, fmt=storage_format.JSON):
+        name = month if revision <= 1 else f"{month}.r{revision}"
+        name = f"{name}.{fmt}"
+        return f"{name}.gz" if compress else name
+
+    def _remove(self, filename):
+        try:
+            os.remove(os.path.join(self.root_dir, filename))
+        except OSError:
+            pass
+
+    def _remove_replaced(self, filename):
+        if not (self.retain and self.retain(filename)):
+            self._remove(filename)
+
+    def collect_replaced(self):
+        """Remove segment files the manifest no longer lists and no reader retains
+        (including any left behind by an earlier run); returns how many"""
+        with self._lock:
+            live = {entry["file"] for entry in self.manifest()["segments"].values()}
+            stale = [name for name in os.listdir(self.root_dir)
+                     if not name.startswith(".") and name != MANIFEST and name not in live
+                     and not (self.retain and self.retain(name))]
+            for name in stale:
+                self._remove(name)
+            return len(stale)
+
+    # Writes
+    def append(self, record):
+        month = month_of(record.get("date"))
+        with self._lock:
+            starts_month = month not in self.manifest()["segments"]
+            rows = self.load_month(month)
+            rows.append(record)
+            ok = self.save_month(month, rows)
+            if starts_month and month != UNDATED:
+                # First row of a new month: the previous hot segment can be sealed now
+                self.seal_closed_months()
+            return ok
+
+    def update_month(self, month, update):
+        """Load a month, call update(rows) and save if it returns True"""
+        with self._lock:
+            rows = self.load_month(month)
+            if update(rows):
+                return self.save_month(month, rows)
+            return True
+
+    def add_rows(self, rows):
+        """Bulk append (migration/import): one rewrite per month touched"""
+        by_month = {}
+        for row in rows:
+            by_month.setdefault(month_of(row.get("date")), []).append(row)
+        with self._lock:
+            for month, new_rows in sorted(by_month.items()):
+                existing = self.load_month(month)
+                self.save_month(month, existing + new_rows)
+        return len(rows)
+
+    def seal_closed_months(self, today=None):
+        """Close every dated month before the current one (compressing it if configured).
+        Returns the months sealed."""
+        current = (today or date.today()).isoformat()[:7]
+        sealed = []
+        with self._lock:
+            manifest = self.manifest()
+            for month, entry in sorted(manifest["segments"].items()):
+                if entry.get("closed") or month == UNDATED or month >= current:
+                    continue
+                old_file = entry["file"]
+                if self.compress_closed and not old_file.endswith(".gz"):
+                    rows = self._read_segment(old_file)
+                    filename = self._segment_name(month, entry.get("revision", 1), True, manifest["format"])
+                    self._write_file(os.path.join(self.root_dir, filename), {"attendance": rows}, True, manifest["format"])
+                    entry["file"] = filename
+                entry["closed"] = True
+                sealed.append((month, old_file))
+            if sealed:
+                self._save_manifest(manifest)
+                for month, old_file in sealed:
+                    if manifest["segments"][month]["file"] != old_file:
+                        self._remove_replaced(old_file)
+                    self._cache.pop(month, None)
+        return [month for month, _ in sealed]
+
+    def convert(self, fmt):
+        """Rewrite every segment in fmt (closed months as new revisions, like any edit to
+        a sealed month) and make it the format for new segments; returns months rewritten"""
+        if fmt not in storage_format.FORMATS:
+            raise ValueError(f"format must be one of {storage_format.FORMATS}")
+        with self._lock:
+            manifest = self.manifest()
+            manifest["format"] = fmt
+            self._save_manifest(manifest)
+            converted = 0
+            for month, entry in sorted(manifest["segments"].items()):
+                if storage_format.detect(self._segment_bytes(entry["file"])) != fmt:
+                    self.save_month(month, self.load_month(month))
+                    converted += 1
+            return converted
+
+    def evict_cache(self, today=None):
+        """Drop parsed rows for every month but the current one; returns how many"""
+        current = (today or date.today()).isoformat()[:7]
+        with self._lock:
+            stale = [month for month in self._cache if month != current]
+            for month in stale:
+                del self._cache[month]
+        return len(stale)
+
+    def clear_cache(self):
+        """Drop every month's parsed rows (e.g. after the files were restored)"""
+        with self._lock:
+            self._cache.clear()
+
+    def cache_bytes(self):
+        """On-disk size of the segments whose rows are cached (a rough memory measure)"""
+        with self._lock:
+            return sum(sig[1] for _, sig, _ in self._cache.values() if sig)
+
+    # Queries
+    def iter_records(self, start_date=None, end_date=None):
+        """AttendanceRecords in month order, limited to the segments overlapping the range
+        (rows are still filtered by date; open-ended ranges read every segment)"""
+        covered = months_between(start_date, end_date) if start_date and end_date else None
+        if covered is not None:
+            months = [m for m in covered if m in self.manifest()["segments"]]
+        else:
+            months = self.months()
+        for month in months:
+            for record in self.records(month):
+                if start_date and end_date and not (start_date <= (record.date or "") <= end_date):
+                    continue
+                yield record
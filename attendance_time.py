@@ -0,0 +1,61 @@
+# attendance_time.py - normalized times stored on employee attendance records
+# Alongside the "HH:MM:SS" strings, records carry check_in_sec / check_out_sec
+# (second of day) and worked_seconds, written when the record changes, so reports
+# read a number instead of parsing two strings per row. A shift's length is
+# (check_out - check_in) wrapped to 0-24h, the same as timedelta.seconds gave before.
+from datetime import datetime
+
+DAY_SECONDS = 86400
+
+
+def time_to_seconds(value):
+    """'HH:MM:SS' -> second of day, or None if missing/malformed"""
+    if not value or not isinstance(value, str):
+        return None
+    try:
+        t = datetime.strptime(value, "%H:%M:%S")
+    except ValueError:
+        return None
+    return t.hour * 3600 + t.minute * 60 + t.second
+
+
+def stamp_times(record):
+    """(Re)compute the stored second-of-day fields of an attendance dict in place"""
+    ci = time_to_seconds(record.get("check_in"))
+    co = time_to_seconds(record.get("check_out"))
+    for key, value in (("check_in_sec", ci), ("check_out_sec", co)):
+        if value is None:
+            record.pop(key, None)
+        else:
+            record[key] = value
+    if ci is not None and co is not None:
+        record["worked_seconds"] = (co - ci) % DAY_SECONDS
+    else:
+        record.pop("worked_seconds", None)
+    return record
+
+
+def worked_seconds(record):
+    """Stored duration of a completed shift, or None (falls back to the strings for
+    rows written by something that didn't stamp them)"""
+    value = record.get("worked_seconds")
+    if value is not None:
+        return value
+    if not (record.get("check_in") and record.get("check_out")):
+        return None
+    ci = time_to_seconds(record.get("check_in"))
+    co = time_to_seconds(record.get("check_out"))
+    if ci is None or co is None:
+        return None
+    return (co - ci) % DAY_SECONDS
+
+
+def worked_hours(record):
+    seconds = worked_seconds(record)
+    return None if seconds is None else seconds / 3600
+
+
+def needs_stamp(record):
+    """True if a record's stored fields are missing or disagree with its strings"""
+    expected = stamp_times({"check_in": record.get("check_in"), "check_out": record.get("check_out")})
+    return any(record.get(k) != expected.get(k) for k in ("check_in_sec", "check_out_sec", "worked_seconds"))
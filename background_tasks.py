@@ -0,0 +1,106 @@
+# background_tasks.py - runs slow DataHandler / report work off the Tk main loop
+# Work runs on a small thread pool; results are collected by a root.after poll so
+# callbacks (which touch widgets) always execute on the Tk thread.
+import threading
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BackgroundTask:
+    """Handle for a submitted job. cancel() drops its result; `cancelled` can be
+    checked by long-running jobs that want to stop early."""
+    def __init__(self, task_id, future, on_done, on_error, message, scope):
+        self.id = task_id
+        self.future = future
+        self.on_done = on_done
+        self.on_error = on_error
+        self.message = message
+        self.scope = scope
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+        # Jobs that have not started yet never run; running ones finish but are ignored
+        self.future.cancel()
+
+    def done(self):
+        return self.future.done()
+
+
+class BackgroundTasks:
+    def __init__(self, root, max_workers=2, poll_interval=50, on_busy_change=None):
+        self.root = root
+        self.poll_interval = poll_interval
+        self.on_busy_change = on_busy_change  # called with the current message (or None when idle)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gui-worker")
+        self._tasks = {}
+        self._ids = itertools.count(1)
+        self._polling = False
+
+    def submit(self, func, *args, on_done=None, on_error=None, message="Working...", scope="view", **kwargs):
+        """Run func(*args, **kwargs) on a worker thread.
+
+        on_done(result) / on_error(exc) are called on the Tk thread. Tasks with
+        scope="view" are cancelled by cancel_scope("view") when the screen changes;
+        use scope="global" for work whose result should still be reported (e.g. a
+        report the user asked to save).
+        """
+        future = self._executor.submit(func, *args, **kwargs)
+        task = BackgroundTask(next(self._ids), future, on_done, on_error, message, scope)
+        self._tasks[task.id] = task
+        self._notify_busy()
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_interval, self._poll)
+        return task
+
+    def cancel_scope(self, scope="view"):
+        for task in list(self._tasks.values()):
+            if task.scope == scope:
+                task.cancel()
+                self._tasks.pop(task.id, None)
+        self._notify_busy()
+
+    def cancel_all(self):
+        for task in list(self._tasks.values()):
+            task.cancel()
+        self._tasks.clear()
+        self._notify_busy()
+
+    def shutdown(self):
+        self.cancel_all()
+        self._executor.shutdown(wait=False)
+
+    def busy(self):
+        return bool(self._tasks)
+
+    def _notify_busy(self):
+        if self.on_busy_change:
+            pending = list(self._tasks.values())
+            self.on_busy_change(pending[-1].message if pending else None)
+
+    def _poll(self):
+        finished = [t for t in self._tasks.values() if t.done()]
+        for task in finished:
+            self._tasks.pop(task.id, None)
+        if finished:
+            self._notify_busy()
+        for task in finished:
+            if task.cancelled.is_set() or task.future.cancelled():
+                continue
+            exc = task.future.exception()
+            try:
+                if exc is not None:
+                    if task.on_error:
+                        task.on_error(exc)
+                    else:
+                        print(f"Background task failed: {exc}")
+                elif task.on_done:
+                    task.on_done(task.future.result())
+            except Exception as e:
+                # A callback can outlive its widgets (e.g. window closed); keep polling
+                print(f"Background task callback failed: {e}")
+        if self._tasks:
+            self.root.after(self.poll_interval, self._poll)
+        else:
+            self._polling = False
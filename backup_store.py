@@ -0,0 +1,193 @@
+# backup_store.py - incremental, deduplicated snapshots of the data directory
+# Every file under data/ (JSON files, attendance segments, archives, photos) is split
+# into chunks stored once under data/backups/chunks/<aa>/<sha256>, zlib-compressed.
+# A snapshot is a small JSON manifest in data/backups/snapshots/ listing each file's
+# size, mtime and chunk hashes. Files whose size and mtime match the previous
+# snapshot reuse its chunk list without being read, so a run where little changed
+# only stats the tree. prune() applies the backup_days retention and removes chunks
+# no remaining snapshot refers to; restore() rebuilds files from any snapshot.
+import os
+import json
+import zlib
+import hashlib
+import threading
+from datetime import datetime, timedelta
+
+CHUNK_SIZE = 1 << 20
+COMPRESS_LEVEL = 6
+# Photo formats are already compressed; zlib at level 1 just frames them
+STORED_FORMATS = (".jpg", ".jpeg", ".png", ".webp", ".gif", ".gz")
+
+
+class BackupStore:
+    def __init__(self, data_dir, backup_dir=None):
+        self.data_dir = data_dir
+        self.backup_dir = backup_dir or os.path.join(data_dir, "backups")
+        self.chunks_dir = os.path.join(self.backup_dir, "chunks")
+        self.snapshots_dir = os.path.join(self.backup_dir, "snapshots")
+        self._lock = threading.Lock()
+
+    # Layout
+    def _chunk_path(self, digest):
+        return os.path.join(self.chunks_dir, digest[:2], digest)
+
+    def _snapshot_path(self, snapshot_id):
+        return os.path.join(self.snapshots_dir, f"{snapshot_id}.json")
+
+    def _data_files(self):
+        """Relative paths of every file to back up (skips backups/ and dot-files such as
+        photos/.thumbs and temp files)"""
+        backup_root = os.path.abspath(self.backup_dir)
+        for root, dirs, files in os.walk(self.data_dir):
+            dirs[:] = sorted(d for d in dirs if not d.startswith(".")
+                             and os.path.abspath(os.path.join(root, d)) != backup_root)
+            for name in sorted(files):
+                if not name.startswith("."):
+                    path = os.path.join(root, name)
+                    yield os.path.relpath(path, self.data_dir).replace(os.sep, "/")
+
+    # Snapshots
+    def snapshots(self):
+        """Snapshot ids, oldest first"""
+        if not os.path.isdir(self.snapshots_dir):
+            return []
+        return sorted(n[:-5] for n in os.listdir(self.snapshots_dir) if n.endswith(".json") and not n.startswith("."))
+
+    def load_snapshot(self, snapshot_id):
+        with open(self._snapshot_path(snapshot_id), "r") as f:
+            return json.load(f)
+
+    def _write_json(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    def _store_file(self, path, level, stats):
+        chunks = []
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+                digest = hashlib.sha256(block).hexdigest()
+                chunk_path = self._chunk_path(digest)
+                if not os.path.exists(chunk_path):
+                    os.makedirs(os.path.dirname(chunk_path), exist_ok=True)
+                    tmp = f"{chunk_path}.{threading.get_ident()}.tmp"
+                    with open(tmp, "wb") as out:
+                        out.write(zlib.compress(block, level))
+                    os.replace(tmp, chunk_path)
+                    stats["new_chunks"] += 1
+                    stats["bytes_written"] += os.path.getsize(chunk_path)
+                chunks.append(digest)
+        return chunks
+
+    def create_snapshot(self):
+        """Snapshot the data directory; returns a summary dict"""
+        with self._lock:
+            started = datetime.now()
+            previous = {}
+            existing = self.snapshots()
+            if existing:
+                try:
+                    previous = self.load_snapshot(existing[-1]).get("files", {})
+                except (OSError, json.JSONDecodeError):
+                    previous = {}
+            stats = {"files": 0, "reused": 0, "new_chunks": 0, "bytes_written": 0, "total_bytes": 0}
+            files = {}
+            for rel in self._data_files():
+                path = os.path.join(self.data_dir, rel)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue  # removed while walking
+                stats["files"] += 1
+                stats["total_bytes"] += st.st_size
+                old = previous.get(rel)
+                if old and old["size"] == st.st_size and old["mtime_ns"] == st.st_mtime_ns:
+                    files[rel] = old
+                    stats["reused"] += 1
+                    continue
+                level = 1 if rel.lower().endswith(STORED_FORMATS) else COMPRESS_LEVEL
+                try:
+                    chunks = self._store_file(path, level, stats)
+                except OSError as e:
+                    print(f"Backup: skipping {rel}: {e}")
+                    continue
+                files[rel] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "mode": st.st_mode & 0o777, "chunks": chunks}
+
+            snapshot_id = started.strftime("%Y%m%dT%H%M%S")
+            if snapshot_id in existing:
+                snapshot_id = started.strftime("%Y%m%dT%H%M%S_%f")
+            self._write_json(self._snapshot_path(snapshot_id),
+                             {"id": snapshot_id, "created": started.isoformat(), "files": files})
+            stats["id"] = snapshot_id
+            stats["seconds"] = round((datetime.now() - started).total_seconds(), 3)
+            return stats
+
+    # Retention
+    def prune(self, keep_days, now=None):
+        """Delete snapshots older than keep_days (always keeping the newest), then any
+        chunk no remaining snapshot references. Returns (snapshots removed, chunks removed)."""
+        with self._lock:
+            ids = self.snapshots()
+            cutoff = (now or datetime.now()) - timedelta(days=keep_days)
+            removed = []
+            for snapshot_id in ids[:-1]:
+                try:
+                    created = datetime.fromisoformat(self.load_snapshot(snapshot_id).get("created", ""))
+                except (OSError, ValueError, json.JSONDecodeError):
+                    continue
+                if created < cutoff:
+                    os.remove(self._snapshot_path(snapshot_id))
+                    removed.append(snapshot_id)
+            return removed, (self._collect_garbage() if removed else 0)
+
+    def _collect_garbage(self):
+        live = set()
+        for snapshot_id in self.snapshots():
+            for entry in self.load_snapshot(snapshot_id).get("files", {}).values():
+                live.update(entry["chunks"])
+        deleted = 0
+        if not os.path.isdir(self.chunks_dir):
+            return 0
+        for prefix in os.listdir(self.chunks_dir):
+            prefix_dir = os.path.join(self.chunks_dir, prefix)
+            for name in os.listdir(prefix_dir):
+                if name not in live:
+                    os.remove(os.path.join(prefix_dir, name))
+                    deleted += 1
+        return deleted
+
+    # Restore
+    def restore(self, snapshot_id, target_dir=None, remove_extra=False):
+        """Rebuild a snapshot into target_dir (default: the data directory). Files already
+        matching the snapshot's size and mtime are left alone; remove_extra deletes files
+        the snapshot doesn't contain. Returns the number of files written."""
+        target_dir = target_dir or self.data_dir
+        with self._lock:
+            files = self.load_snapshot(snapshot_id).get("files", {})
+            written = 0
+            for rel, entry in files.items():
+                dest = os.path.join(target_dir, *rel.split("/"))
+                try:
+                    st = os.stat(dest)
+                    if st.st_size == entry["size"] and st.st_mtime_ns == entry["mtime_ns"]:
+                        continue
+                except OSError:
+                    pass
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                tmp = os.path.join(os.path.dirname(dest), f".{os.path.basename(dest)}.restore")
+                with open(tmp, "wb") as out:
+                    for digest in entry["chunks"]:
+                        with open(self._chunk_path(digest), "rb") as f:
+                            out.write(zlib.decompress(f.read()))
+                os.utime(tmp, ns=(entry["mtime_ns"], entry["mtime_ns"]))
+                if "mode" in entry:
+                    os.chmod(tmp, entry["mode"])  # e.g. read-only year archives
+                os.replace(tmp, dest)
+                written += 1
+            if remove_extra and os.path.abspath(target_dir) == os.path.abspath(self.data_dir):
+                for rel in list(self._data_files()):
+                    if rel not in files:
+                        os.remove(os.path.join(self.data_dir, *rel.split("/")))
+            return written
@@ -0,0 +1,62 @@
+# benchmarks/json_codec.py - parse/serialize timings for each json_codec backend
+# Uses the synthetic students.json / database.json payloads from records_memory.py
+# and times loads, compact dumps (API responses) and indented dumps (data files)
+# for every backend installed here, plus the per-class shard encodings that
+# /api/students serves from cache.
+#
+#   python benchmarks/json_codec.py [students] [attendance_rows] [repeats]
+import os
+import sys
+import random
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import json_codec  # noqa: E402
+from records_memory import make_students, make_attendance  # noqa: E402
+
+
+def best_of(repeats, func):
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def bench(label, text, repeats):
+    raw = text.encode("utf-8")
+    data = json_codec.loads(raw, backend="json")
+    print(f"{label}: {len(raw) / 2**20:.1f} MiB")
+    for backend in json_codec.BACKENDS:
+        parse = best_of(repeats, lambda: json_codec.loads(raw, backend=backend))
+        compact = best_of(repeats, lambda: json_codec.dumps(data, backend=backend))
+        indented = best_of(repeats, lambda: json_codec.dumps(data, indent=True, backend=backend))
+        assert json_codec.loads(json_codec.dumps(data, backend=backend), backend="json") == data
+        print(f"  {backend:8s} loads {parse * 1000:8.1f} ms   dumps {compact * 1000:8.1f} ms   "
+              f"dumps(indent) {indented * 1000:8.1f} ms")
+    return data
+
+
+def main():
+    n_students = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    n_attendance = int(sys.argv[2]) if len(sys.argv) > 2 else 200_000
+    repeats = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    random.seed(1)
+    print(f"backends: {', '.join(json_codec.BACKENDS)} (active: {json_codec.BACKEND})")
+    students = bench("students.json", make_students(n_students), repeats)["students"]
+    bench("database.json", make_attendance(n_attendance), repeats)
+
+    # /api/students: re-encoding every class per request vs splicing cached shard encodings
+    by_class = {}
+    for student in students:
+        by_class.setdefault(student["class"], []).append(student)
+    cached = [json_codec.dumps(rows) for rows in by_class.values()]
+    encode = best_of(repeats, lambda: json_codec.dumps({"success": True, "students": students}))
+    splice = best_of(repeats, lambda: json_codec.dumps({"success": True, "students": json_codec.Raw(json_codec.join_arrays(cached))}))
+    print(f"/api/students ({len(students):,} students): encode {encode * 1000:.1f} ms, "
+          f"cached shards {splice * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# benchmarks/records_memory.py - per-record memory of plain dicts vs records.py models
+# Builds synthetic students/attendance the way DataHandler sees them (parsed from
+# JSON text, so repeated strings are separate objects) and measures both shapes
+# with tracemalloc.
+#
+#   python benchmarks/records_memory.py [students] [attendance_rows]
+import os
+import sys
+import json
+import random
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from records import Student, AttendanceRecord  # noqa: E402
+
+CLASSES = [f"Grade {g}" for g in range(1, 13)]
+HEALTH = ["Good", "Good", "Good", "Asthma", "Allergies"]
+DEPARTMENTS = ["Teaching", "Administration", "Support Staff", "Management", "Library"]
+STATUSES = ["Present", "Present", "Present", "Late", "Absent"]
+
+
+def make_students(n):
+    students = []
+    for i in range(1, n + 1):
+        students.append({
+            "id": i, "name": f"Student {i}", "class": random.choice(CLASSES),
+            "parent_contact": f"555-{i:04d}", "parent_email": "", "dob": "2012-05-01", "age": 12,
+            "address": f"{i} Main St", "health_status": random.choice(HEALTH), "allergies": "",
+            "emergency_contact": "", "enrollment_date": "2024-09-01", "photo": None,
+            "academic_results": {"Term 1": {"Math": random.randint(40, 100)}, "Term 2": {}, "Term 3": {}},
+            "attendance_record": {"present": 0, "absent": 0, "late": 0},
+            "monthly_attendance": {}, "term_attendance": {},
+        })
+    return json.dumps({"students": students})
+
+
+def make_attendance(n, employees=200):
+    start = date(2020, 1, 1)
+    rows = []
+    for i in range(n):
+        emp = i % employees + 1
+        day = (start + timedelta(days=i // employees)).isoformat()
+        rows.append({
+            "employee_id": emp, "employee_name": f"Employee {emp}", "department": DEPARTMENTS[emp % len(DEPARTMENTS)],
+            "date": day, "check_in": "08:0%d:00" % (i % 10), "check_out": "16:3%d:00" % (i % 10),
+            "status": random.choice(STATUSES), "timestamp": f"{day}T08:00:00",
+        })
+    return json.dumps({"attendance": rows})
+
+
+def measure(build):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    value = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return value, size
+
+
+def compare(label, text, key, record_cls):
+    dicts, dict_bytes = measure(lambda: json.loads(text)[key])
+    count = len(dicts)
+    records, record_bytes = measure(lambda: [record_cls.from_dict(d) for d in json.loads(text)[key]])
+    assert records[0].to_dict() == dicts[0]
+    print(f"{label}: {count:,} rows")
+    print(f"  dicts   {dict_bytes / 2**20:8.1f} MiB  {dict_bytes / count:7.0f} B/row")
+    print(f"  records {record_bytes / 2**20:8.1f} MiB  {record_bytes / count:7.0f} B/row  ({record_bytes / dict_bytes:.0%} of dicts)")
+
+
+def main():
+    n_students = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    n_attendance = int(sys.argv[2]) if len(sys.argv) > 2 else 500_000
+    random.seed(1)
+    compare("students", make_students(n_students), "students", Student)
+    compare("attendance", make_attendance(n_attendance), "attendance", AttendanceRecord)
+
+
+if __name__ == "__main__":
+    main()
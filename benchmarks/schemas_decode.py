@@ -0,0 +1,54 @@
+# benchmarks/schemas_decode.py - json.loads + dicts vs schemas.decode
+# Decodes the synthetic students.json / database.json payloads from records_memory.py
+# both ways and reports the best-of-N time and the memory held by the result
+# (tracemalloc). schemas.decode parses with storage_format and validates into the
+# records.py models, so the difference is the cost of validation and the saving
+# of the slotted, interned records.
+#
+#   python benchmarks/schemas_decode.py [students] [attendance_rows] [repeats]
+import os
+import sys
+import json
+import random
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import schemas  # noqa: E402
+from records_memory import make_students, make_attendance, measure  # noqa: E402
+
+
+def best_of(repeats, func):
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def compare(kind, text, repeats):
+    raw = text.encode("utf-8")
+    key = schemas.LIST_KEYS[kind]
+    dicts, dict_bytes = measure(lambda: json.loads(raw)[key])
+    decoded, typed_bytes = measure(lambda: schemas.decode(kind, raw))
+    assert not decoded.errors and len(decoded.records) == len(dicts)
+    dict_time = best_of(repeats, lambda: json.loads(raw))
+    typed_time = best_of(repeats, lambda: schemas.decode(kind, raw))
+    count = len(dicts)
+    print(f"{kind}: {count:,} rows, {len(raw) / 2**20:.1f} MiB")
+    print(f"  json.loads + dicts {dict_time * 1000:8.1f} ms  {dict_bytes / 2**20:7.1f} MiB  {dict_bytes / count:6.0f} B/row")
+    print(f"  schemas.decode     {typed_time * 1000:8.1f} ms  {typed_bytes / 2**20:7.1f} MiB  {typed_bytes / count:6.0f} B/row"
+          f"  ({typed_time / dict_time:.0%} time, {typed_bytes / dict_bytes:.0%} memory)")
+
+
+def main():
+    n_students = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    n_attendance = int(sys.argv[2]) if len(sys.argv) > 2 else 200_000
+    repeats = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    random.seed(1)
+    compare("students", make_students(n_students), repeats)
+    compare("attendance", make_attendance(n_attendance), repeats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# benchmarks/storage_format.py - file size and load/save time, JSON vs MessagePack
+# Uses the synthetic students / attendance payloads from records_memory.py and times
+# a save (encode + write) and a load (read + decode) through storage_format, the way
+# DataHandler and the stores do, for indented JSON (the default on-disk form) and
+# MessagePack.
+#
+#   python benchmarks/storage_format.py [students] [attendance_rows] [repeats]
+import os
+import sys
+import json
+import random
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import storage_format  # noqa: E402
+from records_memory import make_students, make_attendance  # noqa: E402
+
+
+def best_of(repeats, func):
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def bench(label, data, repeats, tmp_dir):
+    print(label)
+    path = os.path.join(tmp_dir, "bench.dat")
+
+    def save(fmt):
+        with open(path, "wb") as f:
+            f.write(storage_format.dumps(data, fmt))
+
+    for fmt in storage_format.FORMATS:
+        if fmt == storage_format.MSGPACK and not storage_format.MSGPACK_AVAILABLE:
+            print(f"  {fmt:8s} (not installed)")
+            continue
+        save_time = best_of(repeats, lambda: save(fmt))
+        size = os.path.getsize(path)
+        load_time = best_of(repeats, lambda: storage_format.load(path))
+        assert storage_format.load(path) == data
+        print(f"  {fmt:8s} {size / 2**20:7.2f} MiB   save {save_time * 1000:8.1f} ms   load {load_time * 1000:8.1f} ms")
+
+
+def main():
+    n_students = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    n_attendance = int(sys.argv[2]) if len(sys.argv) > 2 else 200_000
+    repeats = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    random.seed(1)
+    print(f"MessagePack backend: {storage_format.MSGPACK_BACKEND or 'none'}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        bench(f"students ({n_students:,})", json.loads(make_students(n_students)), repeats, tmp_dir)
+        bench(f"attendance ({n_attendance:,} rows)", json.loads(make_attendance(n_attendance)), repeats, tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+# change_notifier.py - publishes typed change events for the JSON data files
+# Events come from two sources: DataHandler writes (published immediately) and a
+# watcher thread on the data/ directory that catches writes made by other
+# processes or DataHandler instances (inotify when available, mtime polling otherwise).
+import os
+import threading
+import queue
+import itertools
+from collections import deque
+from datetime import datetime
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+    INOTIFY_AVAILABLE = True
+except ImportError:
+    INOTIFY_AVAILABLE = False
+
+# Data file name -> event kind
+FILE_KINDS = {
+    "students.json": "students",
+    "employees.json": "employees",
+    "database.json": "attendance",
+    "settings.json": "settings",
+    "correction_requests.json": "correction_requests",
+    "dashboard.json": "dashboard",
+    "working_hours.json": "working_hours",
+    "announcement_reads.log": "dashboard",
+}
+# Data subdirectory -> event kind for every file written inside it
+DIR_KINDS = {
+    "attendance": "attendance",
+    "dashboard_archive": "dashboard",
+    "students": "students",
+}
+# Subdirectories whose files change without a manifest rewrite, so polling checks each file
+SHARDED_DIRS = ("students",)
+PHOTOS_KIND = "photos"
+EVENT_KINDS = tuple(FILE_KINDS.values()) + (PHOTOS_KIND,)
+
+
+class ChangeEvent:
+    """A change to one data collection (students, attendance, settings, ...)"""
+    __slots__ = ("seq", "kind", "action", "path", "source", "timestamp")
+
+    def __init__(self, kind, action="modified", path=None, source="local"):
+        self.seq = 0
+        self.kind = kind
+        self.action = action
+        self.path = path
+        self.source = source
+        self.timestamp = datetime.now().isoformat()
+
+    def to_dict(self):
+        return {"id": self.seq, "kind": self.kind, "action": self.action, "file": os.path.basename(self.path) if self.path else None, "source": self.source, "timestamp": self.timestamp}
+
+    def __repr__(self):
+        return f"ChangeEvent({self.seq}, {self.kind!r}, {self.action!r}, source={self.source!r})"
+
+
+class ChangeStream:
+    """Queue-backed subscription used by long-lived consumers (e.g. the SSE endpoint)"""
+    def __init__(self, notifier, kinds=None, maxsize=500):
+        self.notifier = notifier
+        self.kinds = set(kinds) if kinds else None
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.token = None
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            # Slow consumer: drop the oldest event rather than blocking publishers
+            try:
+                self.queue.get_nowait()
+                self.queue.put_nowait(event)
+            except (queue.Empty, queue.Full):
+                pass
+
+    def get(self, timeout=None):
+        """Return the next event, or None if nothing arrived within timeout"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        if self.token is not None:
+            self.notifier.unsubscribe(self.token)
+            self.token = None
+
+
+class ChangeNotifier:
+    def __init__(self, data_dir, photos_dir=None, poll_interval=1.0, history_size=200):
+        self.data_dir = data_dir
+        self.photos_dir = photos_dir
+        self.poll_interval = poll_interval
+        self._subscribers = {}
+        self._token_counter = itertools.count(1)
+        self._seq_counter = itertools.count(1)
+        self._history = deque(maxlen=history_size)
+        self._known = {}  # path -> (mtime_ns, size) as last seen/written
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._inotify = None
+        self.mode = None
+
+    # Subscriptions
+    def subscribe(self, callback, kinds=None):
+        """Register callback(event); kinds limits delivery to those event kinds. Returns a token."""
+        token = next(self._token_counter)
+        with self._lock:
+            self._subscribers[token] = (callback, set(kinds) if kinds else None)
+        return token
+
+    def unsubscribe(self, token):
+        with self._lock:
+            self._subscribers.pop(token, None)
+
+    def open_stream(self, kinds=None, since=None):
+        """Open a queue subscription; events newer than `since` (an event id) are replayed first"""
+        stream = ChangeStream(self, kinds)
+        with self._lock:
+            backlog = []
+            if since is not None:
+                try:
+                    since = int(since)
+                    backlog = [e for e in self._history if e.seq > since]
+                except (TypeError, ValueError):
+                    backlog = []
+        for event in backlog:
+            if stream.kinds is None or event.kind in stream.kinds:
+                stream.put(event)
+        stream.token = self.subscribe(stream.put, kinds)
+        return stream
+
+    def publish(self, event):
+        with self._lock:
+            event.seq = next(self._seq_counter)
+            self._history.append(event)
+            subscribers = list(self._subscribers.values())
+        for callback, kinds in subscribers:
+            if kinds is None or event.kind in kinds:
+                try:
+                    callback(event)
+                except Exception as e:
+                    print(f"Change subscriber failed for {event}: {e}")
+        return event
+
+    # DataHandler write hook
+    def notify_write(self, filepath, action="modified"):
+        kind = self.kind_for_path(filepath)
+        if kind is None:
+            return None
+        self._known[os.path.abspath(filepath)] = self._signature(filepath)
+        return self.publish(ChangeEvent(kind, action, filepath, source="local"))
+
+    def kind_for_path(self, filepath):
+        if os.path.basename(filepath).startswith("."):
+            return None  # caches and temp files (e.g. photos/.thumbs)
+        parent = os.path.abspath(os.path.dirname(filepath))
+        if self.photos_dir and parent == os.path.abspath(self.photos_dir):
+            return PHOTOS_KIND
+        if os.path.dirname(parent) == os.path.abspath(self.data_dir) and os.path.basename(parent) in DIR_KINDS:
+            return DIR_KINDS[os.path.basename(parent)]
+        return FILE_KINDS.get(os.path.basename(filepath))
+
+    @staticmethod
+    def _signature(path):
+        try:
+            st = os.stat(path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _check_path(self, path):
+        """Publish a watcher event if path changed since we last saw or wrote it"""
+        kind = self.kind_for_path(path)
+        if kind is None:
+            return
+        key = os.path.abspath(path)
+        sig = self._signature(path)
+        previous = self._known.get(key, False)
+        if previous == sig:
+            return
+        self._known[key] = sig
+        if sig is None:
+            action = "deleted"
+        elif previous is False or previous is None:
+            action = "created"
+        else:
+            action = "modified"
+        self.publish(ChangeEvent(kind, action, path, source="watcher"))
+
+    def _watched_paths(self):
+        paths = [os.path.join(self.data_dir, name) for name in FILE_KINDS]
+        # Segmented collections rewrite their manifest on every change
+        paths.extend(os.path.join(self.data_dir, name, "manifest.json") for name in DIR_KINDS)
+        for name in SHARDED_DIRS:
+            subdir = os.path.join(self.data_dir, name)
+            if os.path.isdir(subdir):
+                try:
+                    paths.extend(e.path for e in os.scandir(subdir) if e.is_file() and not e.name.startswith("."))
+                except OSError:
+                    pass
+        if self.photos_dir and os.path.isdir(self.photos_dir):
+            try:
+                paths.extend(e.path for e in os.scandir(self.photos_dir) if e.is_file())
+            except OSError:
+                pass
+        return paths
+
+    # Watcher thread
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        # Baseline so existing files don't all fire on startup
+        for path in self._watched_paths():
+            self._known[os.path.abspath(path)] = self._signature(path)
+        self._stop.clear()
+        target = self._run_polling
+        self.mode = "polling"
+        if INOTIFY_AVAILABLE:
+            try:
+                self._inotify = INotify()
+                mask = inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO | inotify_flags.DELETE | inotify_flags.CREATE
+                self._watch_dirs = {self._inotify.add_watch(self.data_dir, mask): self.data_dir}
+                if self.photos_dir and os.path.isdir(self.photos_dir):
+                    self._watch_dirs[self._inotify.add_watch(self.photos_dir, mask)] = self.photos_dir
+                for name in DIR_KINDS:
+                    subdir = os.path.join(self.data_dir, name)
+                    if os.path.isdir(subdir):
+                        self._watch_dirs[self._inotify.add_watch(subdir, mask)] = subdir
+                target = self._run_inotify
+                self.mode = "inotify"
+            except OSError as e:
+                print(f"inotify unavailable ({e}); falling back to polling")
+                self._close_inotify()
+        self._thread = threading.Thread(target=target, name="data-change-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the watcher thread and release its inotify descriptor"""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            # The inotify read wakes at least every poll_interval to see the stop flag
+            thread.join(timeout=self.poll_interval + 1)
+        self._thread = None
+        self._close_inotify()
+        self.mode = None
+
+    def _close_inotify(self):
+        if self._inotify is not None:
+            try:
+                self._inotify.close()
+            except OSError:
+                pass
+            self._inotify = None
+
+    def watching(self):
+        """True while the watcher thread runs (writes by other processes get published)"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run_polling(self):
+        while not self._stop.wait(self.poll_interval):
+            for path in self._watched_paths():
+                self._check_path(path)
+            # Files that disappeared since the last pass
+            for key, sig in list(self._known.items()):
+                if sig is not None and not os.path.exists(key):
+                    self._check_path(key)
+
+    def _run_inotify(self):
+        while not self._stop.is_set():
+            try:
+                events = self._inotify.read(timeout=int(self.poll_interval * 1000))
+            except OSError:
+                break
+            changed = set()
+            for event in events:
+                base = self._watch_dirs.get(event.wd)
+                if event.name and base:
+                    changed.add(os.path.join(base, event.name))
+            for path in changed:
+                self._check_path(path)
@@ -0,0 +1,196 @@
+# class_analytics.py - vectorized academic statistics over every student's results
+# All academic_results are packed once into a dense term x subject x student matrix
+# (NaN where no score was entered). Class, subject and term-over-term statistics are
+# numpy reductions over slices of that matrix. The matrix and per-class summaries are
+# cached against the students/settings file signatures, so they are rebuilt only
+# after a score (or the term/subject configuration) actually changes.
+import os
+import threading
+import warnings
+import numpy as np
+
+# Lower bounds of the D, C, B and A bands (same cut-offs as StudentManager.get_grade_from_score)
+GRADE_BANDS = np.array([60, 70, 80, 90])
+GRADE_LABELS = ("F", "D", "C", "B", "A")
+PERCENTILES = (25, 50, 75, 90)
+
+
+def _clean(value, digits=2):
+    """numpy scalar -> JSON-friendly float (None for NaN)"""
+    value = float(value)
+    return None if np.isnan(value) else round(value, digits)
+
+
+class ResultsMatrix:
+    """Dense scores[term, subject, student] array plus the labels for each axis"""
+    def __init__(self, students, terms, subjects):
+        self.terms = list(terms)
+        self.subjects = list(subjects)
+        self.student_ids = np.array([s.get("id") for s in students])
+        self.student_names = [s.get("name", "") for s in students]
+        self.student_classes = np.array([s.get("class", "") for s in students], dtype=object)
+        term_index = {t: i for i, t in enumerate(self.terms)}
+        subject_index = {s: i for i, s in enumerate(self.subjects)}
+        self.scores = np.full((len(self.terms), len(self.subjects), len(students)), np.nan)
+        for col, student in enumerate(students):
+            for term, results in (student.get("academic_results") or {}).items():
+                t = term_index.get(term)
+                if t is None or not results:
+                    continue
+                for subject, score in results.items():
+                    s = subject_index.get(subject)
+                    if s is not None and isinstance(score, (int, float)):
+                        self.scores[t, s, col] = score
+
+    def class_mask(self, class_name):
+        return self.student_classes == class_name
+
+
+class ClassAnalytics:
+    def __init__(self, data_handler):
+        self.data_handler = data_handler
+        self._lock = threading.Lock()
+        self._signature = None
+        self._matrix = None
+        self._summaries = {}
+
+    def _files_signature(self):
+        try:
+            st = os.stat(self.data_handler.settings_file)
+            settings_sig = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            settings_sig = None
+        return (self.data_handler.students_signature(), settings_sig)
+
+    def matrix(self):
+        """The results matrix, rebuilt only when the student shards or settings.json changed"""
+        signature = self._files_signature()
+        with self._lock:
+            if self._matrix is not None and signature == self._signature:
+                return self._matrix
+        students = self.data_handler.get_all_students()
+        terms = list(self.data_handler.get_available_terms())
+        subjects = list(self.data_handler.get_available_subjects())
+        # Terms/subjects that have scores but are no longer configured still count
+        for student in students:
+            for term, results in (student.get("academic_results") or {}).items():
+                if results and term not in terms:
+                    terms.append(term)
+                for subject in (results or {}):
+                    if subject not in subjects:
+                        subjects.append(subject)
+        built = ResultsMatrix(students, terms, subjects)
+        with self._lock:
+            self._matrix = built
+            self._signature = signature
+            self._summaries = {}
+        return built
+
+    # Vectorized statistics
+    @staticmethod
+    def _stats(values, axis):
+        """count/mean/median/std/min/max/percentiles of values along axis, NaNs ignored"""
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)  # all-NaN slices
+            count = np.sum(~np.isnan(values), axis=axis)
+            pct = np.nanpercentile(values, PERCENTILES, axis=axis) if values.size else np.full((len(PERCENTILES),) + count.shape, np.nan)
+            return {
+                "count": count,
+                "mean": np.nanmean(values, axis=axis),
+                "median": np.nanmedian(values, axis=axis),
+                "std": np.nanstd(values, axis=axis),
+                "min": np.nanmin(values, axis=axis) if values.size else np.full(count.shape, np.nan),
+                "max": np.nanmax(values, axis=axis) if values.size else np.full(count.shape, np.nan),
+                "percentiles": pct,
+            }
+
+    @staticmethod
+    def _grade_counts(values, axis):
+        """Counts per A-F band along axis (NaNs excluded)"""
+        bands = np.digitize(np.nan_to_num(values, nan=-1), GRADE_BANDS)
+        present = ~np.isnan(values)
+        return np.stack([np.sum((bands == b) & present, axis=axis) for b in range(len(GRADE_LABELS))], axis=-1)
+
+    @staticmethod
+    def _stats_entry(stats, index=()):
+        entry = {
+            "count": int(stats["count"][index]),
+            "mean": _clean(stats["mean"][index]),
+            "median": _clean(stats["median"][index]),
+            "std": _clean(stats["std"][index]),
+            "min": _clean(stats["min"][index]),
+            "max": _clean(stats["max"][index]),
+        }
+        index = index if isinstance(index, tuple) else (index,)
+        for i, p in enumerate(PERCENTILES):
+            entry[f"p{p}"] = _clean(stats["percentiles"][(i,) + index])
+        return entry
+
+    @staticmethod
+    def _distribution(counts):
+        # Highest band first, like a report card reads
+        return {label: int(counts[i]) for i, label in reversed(list(enumerate(GRADE_LABELS)))}
+
+    def class_summary(self, class_name):
+        """Statistics for one class: per term (overall and per subject), grade
+        distributions and term-over-term changes. Cached until a score changes."""
+        m = self.matrix()
+        with self._lock:
+            cached = self._summaries.get(class_name)
+        if cached is not None:
+            return cached
+
+        mask = m.class_mask(class_name)
+        scores = m.scores[:, :, mask]                      # (term, subject, student)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            student_avg = np.nanmean(scores, axis=1)       # (term, student)
+        overall = self._stats(student_avg, axis=1)         # per term, over student averages
+        by_subject = self._stats(scores, axis=2)           # (term, subject)
+        term_grades = self._grade_counts(scores.reshape(scores.shape[0], scores.shape[1] * scores.shape[2]), axis=1)  # (term, band)
+        subject_grades = self._grade_counts(scores, axis=2)                            # (term, subject, band)
+
+        terms = {}
+        for t, term in enumerate(m.terms):
+            if not int(overall["count"][t]) and not int(by_subject["count"][t].sum()):
+                continue
+            entry = self._stats_entry(overall, t)
+            entry["grade_distribution"] = self._distribution(term_grades[t])
+            entry["subjects"] = {}
+            for s, subject in enumerate(m.subjects):
+                if not int(by_subject["count"][t, s]):
+                    continue
+                subject_entry = self._stats_entry(by_subject, (t, s))
+                subject_entry["grade_distribution"] = self._distribution(subject_grades[t, s])
+                entry["subjects"][subject] = subject_entry
+            terms[term] = entry
+
+        # Term-over-term change: mean of each student's own difference, so students
+        # missing one of the two terms don't skew the comparison
+        deltas = []
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            avg_diff = np.nanmean(np.diff(student_avg, axis=0), axis=1) if len(m.terms) > 1 else np.array([])
+            subject_diff = np.nanmean(np.diff(scores, axis=0), axis=2) if len(m.terms) > 1 else np.empty((0, len(m.subjects)))
+        for t in range(len(avg_diff)):
+            if np.isnan(avg_diff[t]) and np.isnan(subject_diff[t]).all():
+                continue
+            deltas.append({
+                "from": m.terms[t],
+                "to": m.terms[t + 1],
+                "mean_change": _clean(avg_diff[t]),
+                "subjects": {subject: _clean(subject_diff[t, s]) for s, subject in enumerate(m.subjects) if not np.isnan(subject_diff[t, s])},
+            })
+
+        summary = {
+            "class": class_name,
+            "students": int(mask.sum()),
+            "terms": terms,
+            "term_deltas": deltas,
+        }
+        with self._lock:
+            self._summaries[class_name] = summary
+        return summary
+
+    def all_classes(self):
+        return {c: self.class_summary(c) for c in self.data_handler.get_all_classes()}
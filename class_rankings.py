@@ -0,0 +1,200 @@
+# class_rankings.py - class positions per term, kept in sync with score updates
+# Each (class, term) has a ranking of term totals plus one ranking per subject. A
+# ranking is a sorted list of negated scores (so bisect orders highest first) and a
+# student -> score map; a student's position is found by binary search (O(log n)) and
+# a score change is one bisect removal plus one insort - a binary search each, then an
+# O(n) shift of the list, which for class-sized lists is a short memmove rather than a
+# re-sort of the class. Ties share a position ("1224" style).
+# The rankings are rebuilt when the student files change behind their back: a change
+# event marks them stale, and only then are the shard signatures compared (every read
+# compares them while the change watcher isn't running, since writes by other
+# processes aren't announced then).
+import threading
+from bisect import bisect_left, bisect_right, insort
+
+TOTAL = "__total__"
+
+
+def ordinal(n):
+    """1 -> '1st', 2 -> '2nd', 11 -> '11th', 23 -> '23rd'"""
+    if 10 <= n % 100 <= 20:
+        suffix = "th"
+    else:
+        suffix = {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
+    return f"{n}{suffix}"
+
+
+class Ranking:
+    """Scores of one class for one term/subject, ordered highest first"""
+    __slots__ = ("_keys", "_scores")
+
+    def __init__(self):
+        self._keys = []    # sorted -score values
+        self._scores = {}  # student_id -> score
+
+    def __len__(self):
+        return len(self._scores)
+
+    def set(self, student_id, score):
+        old = self._scores.get(student_id)
+        if old == score:
+            return
+        if old is not None:
+            del self._keys[bisect_left(self._keys, -old)]
+        self._scores[student_id] = score
+        insort(self._keys, -score)
+
+    def remove(self, student_id):
+        old = self._scores.pop(student_id, None)
+        if old is not None:
+            del self._keys[bisect_left(self._keys, -old)]
+
+    def score(self, student_id):
+        return self._scores.get(student_id)
+
+    def rank(self, student_id):
+        """1-based competition rank (tied scores share the better position), or None"""
+        score = self._scores.get(student_id)
+        if score is None:
+            return None
+        return bisect_left(self._keys, -score) + 1
+
+    def tied(self, student_id):
+        """How many students share this student's score (including them)"""
+        score = self._scores.get(student_id)
+        if score is None:
+            return 0
+        return bisect_right(self._keys, -score) - bisect_left(self._keys, -score)
+
+    def ordered(self):
+        """[(rank, student_id, score)] highest first"""
+        ordered = sorted(self._scores.items(), key=lambda item: -item[1])
+        return [(bisect_left(self._keys, -score) + 1, sid, score) for sid, score in ordered]
+
+
+def _other_shards(signature, class_name):
+    """A StudentShards.signature() without one class's shard"""
+    return tuple(entry for entry in signature if entry[0] != class_name)
+
+
+class ClassRankings:
+    def __init__(self, data_handler):
+        self.data_handler = data_handler
+        self._lock = threading.RLock()
+        self._rankings = {}       # (class, term) -> {subject or TOTAL: Ranking}
+        self._student_class = {}  # student_id -> class
+        self._signature = None    # student shards signature the rankings reflect
+        self._stale = True        # a student file was written since the last check
+        data_handler.notifier.subscribe(self._on_change, ["students"])
+
+    def _on_change(self, event):
+        # Runs inside the writer (which may hold shard locks): just flag it
+        self._stale = True
+
+    def _file_signature(self):
+        return self.data_handler.students_signature()
+
+    def _rebuild(self, signature=None):
+        # Taken before reading, so a write that lands mid-rebuild is seen next time
+        signature = signature or self._file_signature()
+        self._rankings = {}
+        self._student_class = {}
+        for student in self.data_handler.get_all_students():
+            sid, class_name = student.get("id"), student.get("class") or ""
+            self._student_class[sid] = class_name
+            for term, results in (student.get("academic_results") or {}).items():
+                scores = {subj: score for subj, score in (results or {}).items() if isinstance(score, (int, float))}
+                if not scores:
+                    continue
+                group = self._rankings.setdefault((class_name, term), {})
+                for subject, score in scores.items():
+                    group.setdefault(subject, Ranking()).set(sid, score)
+                group.setdefault(TOTAL, Ranking()).set(sid, sum(scores.values()))
+        self._signature = signature
+
+    def _current(self):
+        # Writes from elsewhere (imports, other processes, edits) -> rebuild once
+        if self._signature is not None and not self._stale and self.data_handler.notifier.watching():
+            return
+        self._stale = False  # cleared before checking: a write meanwhile flags it again
+        signature = self._file_signature()
+        if self._signature is None or self._signature != signature:
+            self._rebuild(signature)
+
+    def invalidate(self):
+        """Rebuild on next read"""
+        with self._lock:
+            self._signature = None
+
+    def refresh(self):
+        """Rebuild now if the student shards changed behind our back (maintenance job)"""
+        with self._lock:
+            self._current()
+
+    def expect_write(self):
+        """Call under the shard lock, before a write that will be followed by
+        record_score; returns whether the rankings are current, i.e. whether an
+        incremental update is valid"""
+        with self._lock:
+            return self._signature is not None and self._signature == self._file_signature()
+
+    def record_score(self, student, term, subject, score, was_current=True):
+        """Apply one saved score change without a rebuild: an O(n) list update per
+        ranking touched, not a re-sort of the class. Call with the student's shard
+        written and still locked (StudentShards.update's saved hook) and was_current
+        from expect_write() under that same lock; if the rankings weren't current, or
+        another student file has changed since, they are rebuilt on the next read."""
+        with self._lock:
+            sid, class_name = student.get("id"), student.get("class") or ""
+            before, after = self._signature, self._file_signature()
+            if not was_current or before is None or _other_shards(before, class_name) != _other_shards(after, class_name):
+                self._signature = None  # rebuild lazily on next read
+                return
+            self._student_class[sid] = class_name
+            group = self._rankings.setdefault((class_name, term), {})
+            group.setdefault(subject, Ranking()).set(sid, score)
+            results = (student.get("academic_results") or {}).get(term, {})
+            group.setdefault(TOTAL, Ranking()).set(sid, sum(v for v in results.values() if isinstance(v, (int, float))))
+            self._signature = after
+
+    def ranking(self, class_name, term, subject=None):
+        with self._lock:
+            self._current()
+            return self._rankings.get((class_name, term), {}).get(subject or TOTAL)
+
+    def position(self, student_id, term, subject=None):
+        """{'rank', 'of', 'tied', 'label'} for a student's total (or subject) in a term, or None"""
+        with self._lock:
+            self._current()
+            class_name = self._student_class.get(student_id)
+            ranking = self._rankings.get((class_name, term), {}).get(subject or TOTAL)
+            if ranking is None:
+                return None
+            rank = ranking.rank(student_id)
+            if rank is None:
+                return None
+            tied = ranking.tied(student_id)
+            label = f"{ordinal(rank)} of {len(ranking)}" + (" (tied)" if tied > 1 else "")
+            return {"rank": rank, "of": len(ranking), "tied": tied > 1, "label": label}
+
+    def student_positions(self, student_id):
+        """{term: {'total': position, 'subjects': {subject: position}}} for every ranked term"""
+        with self._lock:
+            self._current()
+            class_name = self._student_class.get(student_id)
+            positions = {}
+            for (cls, term), group in self._rankings.items():
+                if cls != class_name or TOTAL not in group or group[TOTAL].score(student_id) is None:
+                    continue
+                positions[term] = {
+                    "total": self.position(student_id, term),
+                    "subjects": {subj: self.position(student_id, term, subj) for subj in group
+                                 if subj != TOTAL and group[subj].score(student_id) is not None},
+                }
+            return positions
+
+    def class_table(self, class_name, term, subject=None):
+        """[(rank, student_id, score)] for a class/term, highest first"""
+        with self._lock:
+            ranking = self.ranking(class_name, term, subject)
+            return ranking.ordered() if ranking else []
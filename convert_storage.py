@@ -0,0 +1,134 @@
+# convert_storage.py - switch data files between JSON and MessagePack, or export JSON
+# Run it while the GUI and API server are stopped.
+#
+#   python convert_storage.py status                      # format and size of each file
+#   python convert_storage.py to-msgpack [target ...]     # default: students attendance database.json
+#   python convert_storage.py to-json [target ...]        # default: everything
+#   python convert_storage.py export OUT_DIR              # readable JSON copy of data/
+#
+# Targets are "students" (every shard), "attendance" (every monthly segment) or a
+# top-level file name such as employees.json. DataHandler detects each file's format
+# on load and keeps it on save, so nothing else needs to change after a conversion.
+import os
+import sys
+import gzip
+import argparse
+
+import storage_format
+from student_shards import StudentShards
+from attendance_store import AttendanceStore
+
+TOP_LEVEL_FILES = ("employees.json", "database.json", "settings.json", "correction_requests.json",
+                   "dashboard.json", "working_hours.json")
+COLLECTIONS = ("students", "attendance")
+DEFAULT_MSGPACK_TARGETS = ("students", "attendance", "database.json")
+
+
+def _stores(data_dir):
+    return {"students": StudentShards(os.path.join(data_dir, "students")),
+            "attendance": AttendanceStore(os.path.join(data_dir, "attendance"))}
+
+
+def convert(data_dir, fmt, targets):
+    """Rewrite targets in fmt; returns {target: files rewritten}"""
+    stores = _stores(data_dir)
+    results = {}
+    for target in targets:
+        if target in COLLECTIONS:
+            results[target] = stores[target].convert(fmt)
+            continue
+        if target not in TOP_LEVEL_FILES:
+            raise ValueError(f"Unknown target {target!r}; use {', '.join(COLLECTIONS + TOP_LEVEL_FILES)}")
+        path = os.path.join(data_dir, target)
+        if not os.path.exists(path) or storage_format.file_format(path) == fmt:
+            results[target] = 0
+            continue
+        data = storage_format.load(path)
+        tmp = os.path.join(data_dir, f".{target}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(storage_format.dumps(data, fmt))
+        os.replace(tmp, path)
+        results[target] = 1
+    return results
+
+
+def _data_files(data_dir):
+    """(relative path, absolute path) of every file the formats apply to"""
+    for name in TOP_LEVEL_FILES:
+        path = os.path.join(data_dir, name)
+        if os.path.exists(path):
+            yield name, path
+    for collection in COLLECTIONS:
+        subdir = os.path.join(data_dir, collection)
+        if os.path.isdir(subdir):
+            for name in sorted(os.listdir(subdir)):
+                if not name.startswith(".") and name != "manifest.json":
+                    yield os.path.join(collection, name), os.path.join(subdir, name)
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        raw = f.read()
+    return gzip.decompress(raw) if path.endswith(".gz") else raw
+
+
+def status(data_dir):
+    rows = []
+    for rel, path in _data_files(data_dir):
+        raw = _read(path)
+        rows.append((rel, storage_format.detect(raw), os.path.getsize(path), len(raw)))
+    return rows
+
+
+def export(data_dir, out_dir):
+    """Write an indented JSON copy of every data file (decompressed) under out_dir"""
+    count = 0
+    for rel, path in _data_files(data_dir):
+        data = storage_format.loads(_read(path))
+        stem = rel[:-3] if rel.endswith(".gz") else rel
+        stem = stem.rsplit(".", 1)[0] if stem.rsplit(".", 1)[-1] in storage_format.FORMATS else stem
+        target = os.path.join(out_dir, stem + ".json")
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as f:
+            f.write(storage_format.dumps(data, storage_format.JSON, indent=True))
+        count += 1
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert data files between JSON and MessagePack")
+    parser.add_argument("--data-dir", default="data")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status")
+    to_msgpack = sub.add_parser("to-msgpack")
+    to_msgpack.add_argument("targets", nargs="*")
+    to_json = sub.add_parser("to-json")
+    to_json.add_argument("targets", nargs="*")
+    export_cmd = sub.add_parser("export")
+    export_cmd.add_argument("out_dir")
+    args = parser.parse_args(argv)
+
+    if args.command == "status":
+        for rel, fmt, size, raw_size in status(args.data_dir):
+            print(f"{rel:40s} {fmt:8s} {size:>12,} bytes" + (f" ({raw_size:,} uncompressed)" if raw_size != size else ""))
+        return 0
+    if args.command == "export":
+        print(f"Exported {export(args.data_dir, args.out_dir)} files to {args.out_dir}")
+        return 0
+    if args.command == "to-msgpack" and not storage_format.MSGPACK_AVAILABLE:
+        print("MessagePack needs msgspec or msgpack installed")
+        return 1
+    fmt = storage_format.MSGPACK if args.command == "to-msgpack" else storage_format.JSON
+    targets = args.targets or (DEFAULT_MSGPACK_TARGETS if fmt == storage_format.MSGPACK else COLLECTIONS + TOP_LEVEL_FILES)
+    try:
+        results = convert(args.data_dir, fmt, targets)
+    except (ValueError, storage_format.FormatUnavailable) as e:
+        print(e)
+        return 1
+    for target, count in results.items():
+        print(f"{target}: {count} file(s) rewritten as {fmt}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+# dashboard_archive.py - retention for dashboard.json plus an index of upcoming events
+# archive_expired() moves announcements past their retention (or their own "expires"
+# date) and events that have already happened out of dashboard.json into monthly
+# segments under data/dashboard_archive/ ("2024-03.json.gz", keyed by the item's
+# date), so every dashboard view loads only live items. The manifest keeps per-segment
+# counts, so history() pages back through old items opening only the segments the
+# page touches. EventIndex keeps the live events sorted by date for range queries.
+import os
+import json
+import gzip
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+
+MANIFEST = "manifest.json"
+KINDS = ("announcements", "events")
+DEFAULT_ANNOUNCEMENT_RETENTION_DAYS = 90
+DEFAULT_EVENT_RETENTION_DAYS = 30
+
+
+def _month(item):
+    value = (item.get("date") or "")[:7]
+    return value if len(value) == 7 and value[4] == "-" else "undated"
+
+
+def _item_key(kind, item):
+    """Identity used to avoid archiving an item twice (events have no id)"""
+    if kind == "announcements":
+        return ("id", item.get("id"))
+    return (item.get("date"), item.get("title"), item.get("description"))
+
+
+def split_expired(dashboard, today, announcement_days, event_days):
+    """(live dashboard dict, {"announcements": [...], "events": [...]} to archive)"""
+    today_iso = today.isoformat()
+    ann_cutoff = (today - timedelta(days=announcement_days)).isoformat()
+    event_cutoff = (today - timedelta(days=event_days)).isoformat()
+    live = dict(dashboard)
+    expired = {kind: [] for kind in KINDS}
+    kept = []
+    for ann in dashboard.get("announcements", []):
+        expires = ann.get("expires")
+        if (expires and expires < today_iso) or (ann.get("date", "")[:10] or today_iso) < ann_cutoff:
+            expired["announcements"].append(ann)
+        else:
+            kept.append(ann)
+    live["announcements"] = kept
+    kept = []
+    for event in dashboard.get("events", []):
+        if (event.get("date") or today_iso)[:10] < event_cutoff:
+            expired["events"].append(event)
+        else:
+            kept.append(event)
+    live["events"] = kept
+    return live, expired
+
+
+class DashboardArchive:
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+        self.manifest_file = os.path.join(root_dir, MANIFEST)
+        self._lock = threading.Lock()
+
+    def manifest(self):
+        try:
+            with open(self.manifest_file, "r") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            data = {}
+        data.setdefault("segments", {})
+        return data
+
+    def _write(self, path, payload, compress):
+        os.makedirs(self.root_dir, exist_ok=True)
+        tmp = os.path.join(self.root_dir, f".{os.path.basename(path)}.tmp")
+        raw = json.dumps(payload).encode("utf-8")
+        with open(tmp, "wb") as f:
+            f.write(gzip.compress(raw, mtime=0) if compress else raw)
+        os.replace(tmp, path)
+
+    def load_segment(self, month):
+        entry = self.manifest()["segments"].get(month)
+        if not entry:
+            return {kind: [] for kind in KINDS}
+        try:
+            with gzip.open(os.path.join(self.root_dir, entry["file"]), "rt") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Error reading dashboard archive {entry['file']}: {e}")
+            data = {}
+        return {kind: data.get(kind, []) for kind in KINDS}
+
+    def add(self, expired):
+        """Append expired items to their month segments; returns how many were new"""
+        by_month = {}
+        for kind in KINDS:
+            for item in expired.get(kind, []):
+                by_month.setdefault(_month(item), {k: [] for k in KINDS})[kind].append(item)
+        added = 0
+        with self._lock:
+            manifest = self.manifest()
+            for month, items in sorted(by_month.items()):
+                segment = self.load_segment(month)
+                for kind in KINDS:
+                    known = {_item_key(kind, i) for i in segment[kind]}
+                    for item in items[kind]:
+                        if _item_key(kind, item) not in known:
+                            segment[kind].append(item)
+                            added += 1
+                    segment[kind].sort(key=lambda i: (i.get("date") or "", i.get("id", 0)), reverse=True)
+                filename = f"{month}.json.gz"
+                self._write(os.path.join(self.root_dir, filename), segment, compress=True)
+                manifest["segments"][month] = {"file": filename, **{kind: len(segment[kind]) for kind in KINDS}}
+            if by_month:
+                self._write(self.manifest_file, manifest, compress=False)
+        return added
+
+    def max_id(self, kind):
+        """Highest id among archived items of a kind (0 if none); reads every segment"""
+        return max((item.get("id") or 0 for month in self.manifest()["segments"]
+                    for item in self.load_segment(month)[kind]), default=0)
+
+    def count(self, kind):
+        return sum(entry.get(kind, 0) for entry in self.manifest()["segments"].values())
+
+    def history(self, kind, page=1, page_size=20):
+        """Archived items of one kind, newest first, one page at a time. Segments wholly
+        before or after the page are skipped using the manifest counts."""
+        if kind not in KINDS:
+            raise ValueError(f"kind must be one of {KINDS}")
+        start = max(page - 1, 0) * page_size
+        end = start + page_size
+        items = []
+        offset = 0
+        segments = self.manifest()["segments"]
+        # "undated" sorts after digits, so reverse order puts it first; keep it last
+        for month in sorted((m for m in segments if m != "undated"), reverse=True) + (["undated"] if "undated" in segments else []):
+            n = segments[month].get(kind, 0)
+            if offset + n <= start:
+                offset += n
+                continue
+            if offset >= end:
+                break
+            segment = self.load_segment(month)[kind]
+            items.extend(segment[max(start - offset, 0):end - offset])
+            offset += n
+        return {"items": items, "page": page, "page_size": page_size, "total": self.count(kind)}
+
+
+class EventIndex:
+    """Live events sorted by date, rebuilt when dashboard.json changes"""
+    def __init__(self, data_handler):
+        self.data_handler = data_handler
+        self._lock = threading.Lock()
+        self._signature = None
+        self._dates = []
+        self._events = []
+
+    def _current(self):
+        try:
+            st = os.stat(self.data_handler.dashboard_file)
+            sig = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            sig = None
+        if sig is not None and sig == self._signature:
+            return
+        events = self.data_handler.load_json(self.data_handler.dashboard_file).get("events", [])
+        events = sorted(events, key=lambda e: (e.get("date") or "")[:10])
+        self._events = events
+        self._dates = [(e.get("date") or "")[:10] for e in events]
+        self._signature = sig
+
+    def invalidate(self):
+        with self._lock:
+            self._signature = None
+
+    def between(self, start_date=None, end_date=None, limit=None):
+        """Events with start_date <= date <= end_date (ISO), soonest first"""
+        with self._lock:
+            self._current()
+            lo = bisect_left(self._dates, start_date) if start_date else 0
+            hi = bisect_right(self._dates, end_date) if end_date else len(self._dates)
+            events = self._events[lo:hi]
+        return [dict(e) for e in (events[:limit] if limit else events)]
+
+    def upcoming(self, days=None, limit=None, today=None):
+        start = (today or date.today()).isoformat()
+        end = ((today or date.today()) + timedelta(days=days)).isoformat() if days else None
+        return self.between(start, end, limit)
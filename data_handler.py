@@ -1,5 +1,4 @@
 # data_handler.py - updated with term attendance and base64 photo saving
-import json
 import os
 import shutil
 from datetime import datetime, date, timedelta
@@ -7,34 +6,82 @@ import hashlib
 import base64
 import io
 import pandas as pd
-import calendar
-
-try:
-    from PIL import Image
-    PIL_AVAILABLE = True
-except ImportError:
-    PIL_AVAILABLE = False
-    print("Warning: Pillow (PIL) not installed. Photo features will be disabled.")
+from change_notifier import ChangeNotifier
+import photo_pipeline
+import storage_format
+from class_rankings import ClassRankings
+import month_bitmap
+import payroll
+import attendance_time
+from attendance_store import AttendanceStore, month_of, months_between
+import school_year
+from backup_store import BackupStore
+from announcement_index import AnnouncementIndex
+import dashboard_archive
+import schemas
+from student_shards import StudentShards
+from id_sequences import IdSequences
+from snapshots import SnapshotManager
+from records import Employee
 
 class DataHandler:
-    def __init__(self):
-        self.data_dir = "data"
+    def __init__(self, data_dir="data"):
+        self.data_dir = data_dir
         self.employees_file = os.path.join(self.data_dir, "employees.json")
         self.database_file = os.path.join(self.data_dir, "database.json")
         self.settings_file = os.path.join(self.data_dir, "settings.json")
-        self.students_file = os.path.join(self.data_dir, "students.json")
+        self.students_file = os.path.join(self.data_dir, "students.json")  # pre-shard layout, migrated on startup
         self.correction_requests_file = os.path.join(self.data_dir, "correction_requests.json")
         self.dashboard_file = os.path.join(self.data_dir, "dashboard.json")
         self.working_hours_file = os.path.join(self.data_dir, "working_hours.json")
+        self.announcement_reads_file = os.path.join(self.data_dir, "announcement_reads.log")
         self.photos_dir = os.path.join(self.data_dir, "photos")
+        self.attendance_dir = os.path.join(self.data_dir, "attendance")
+        self.students_dir = os.path.join(self.data_dir, "students")
+        self.archive_dir = os.path.join(self.data_dir, "archive")
+        self.dashboard_archive_dir = os.path.join(self.data_dir, "dashboard_archive")
 
         if not os.path.exists(self.data_dir):
             os.makedirs(self.data_dir)
         if not os.path.exists(self.photos_dir):
             os.makedirs(self.photos_dir)
 
+        # Change events for GUI views / SSE clients (writes below publish through it)
+        self.notifier = ChangeNotifier(self.data_dir, self.photos_dir)
+        # New record ids per collection, persisted in sequences.json (see id_sequences);
+        # a collection's first allocation starts after the highest id in its files
+        self.sequences = IdSequences(os.path.join(self.data_dir, "sequences.json"), seeds={
+            "students": lambda: self.student_shards.last_id(),
+            "employees": lambda: max((e.id or 0 for e in self.employee_records()), default=0),
+            "announcements": self._last_announcement_id,
+            "correction_requests": lambda: max((r.get("id") or 0 for r in self.load_json(self.correction_requests_file).get("requests", [])), default=0),
+        })
+        # Students, one shard file per class (see student_shards)
+        self.student_shards = StudentShards(self.students_dir, on_write=self.notifier.notify_write, sequences=self.sequences)
+        # Class positions per term, updated incrementally by update_student_results
+        self.rankings = ClassRankings(self)
+        # Parsed records per file, reused until the file's stat signature changes
+        self._record_cache = {}
+        # Employee attendance, one segment file per month (see attendance_store)
+        self.attendance = AttendanceStore(self.attendance_dir, on_write=self.notifier.notify_write)
+        # Immutable versioned views of students/employees/attendance for readers (see snapshots)
+        self.snapshots = SnapshotManager(self)
+        # Read-only archives of past school years (see school_year)
+        self.archives = school_year.YearArchives(self.archive_dir)
+        # Deduplicated snapshots of everything under data/ (see backup_store)
+        self.backups = BackupStore(self.data_dir)
+        # Announcements by audience, with read receipts in an append-only log
+        self.announcements = AnnouncementIndex(self, self.announcement_reads_file)
+        # Expired announcements / past events (dashboard_archive) and live events by date
+        self.dashboard_archive = dashboard_archive.DashboardArchive(self.dashboard_archive_dir)
+        self.events = dashboard_archive.EventIndex(self)
+
         self.initialize_files()
 
+    def start_change_watcher(self):
+        """Start watching data/ for writes made outside this DataHandler (safe to call repeatedly)"""
+        self.notifier.start()
+
     def initialize_files(self):
         # -- employees.json
         if not os.path.exists(self.employees_file):
@@ -103,8 +150,10 @@ class DataHandler:
             }
             self.save_json(self.settings_file, default_settings)
 
-        # -- students.json
-        if not os.path.exists(self.students_file):
+        # -- students/ (one shard per class; an older students.json is split up)
+        if not self.student_shards.exists() and os.path.exists(self.students_file):
+            self.migrate_student_shards()
+        if not self.student_shards.exists():
             default_students = {
                 "classes": ["Grade 1", "Grade 2", "Grade 3", "Grade 4", "Grade 5", "Grade 6",
                            "Grade 7", "Grade 8", "Grade 9", "Grade 10", "Grade 11", "Grade 12"],
@@ -130,7 +179,7 @@ class DataHandler:
                     }
                 ]
             }
-            self.save_json(self.students_file, default_students)
+            self.student_shards.replace_all(default_students["students"], default_students["classes"])
 
         # -- correction_requests.json
         if not os.path.exists(self.correction_requests_file):
@@ -150,8 +199,7 @@ class DataHandler:
                         "date": datetime.now().isoformat(),
                         "priority": "High",
                         "visible_to": ["All"],
-                        "attachments": [],
-                        "read_by": []
+                        "attachments": []
                     }
                 ],
                 "events": []
@@ -168,12 +216,75 @@ class DataHandler:
             }
             self.save_json(self.working_hours_file, default_hours)
 
+        # Existing data written by older versions
+        self.migrate_monthly_attendance()
+        self.migrate_attendance_times()
+        self.migrate_attendance_segments()
+        self.attendance.seal_closed_months()
+        self.announcements.migrate_read_by()
+        self.archive_dashboard()
+
+    def migrate_student_shards(self):
+        """Split the monolithic students.json into per-class shards (it is kept as
+        students.json.migrated). Returns the number of students moved."""
+        moved = self.student_shards.migrate_from(self.students_file)
+        print(f"Migrated {moved} students from students.json into {self.students_dir}")
+        return moved
+
+    def migrate_monthly_attendance(self):
+        """Convert monthly_attendance present_dates lists to per-month day bitmaps.
+        Returns the number of students converted (0 once everything is migrated)."""
+        converted = 0
+        for class_name in list(self.student_shards.manifest()["shards"]):
+            counted = []
+
+            def migrate(students):
+                counted.append(sum(1 for s in students if month_bitmap.migrate_student(s)))
+                return counted[-1] > 0
+            self.student_shards.update_shard(class_name, migrate)
+            converted += counted[-1]
+        return converted
+
+    def migrate_attendance_times(self):
+        """Backfill check_in_sec / check_out_sec / worked_seconds on attendance history.
+        Returns the number of records updated."""
+        data = self.load_json(self.database_file)
+        updated = 0
+        for record in data.get("attendance", []):
+            if attendance_time.needs_stamp(record):
+                attendance_time.stamp_times(record)
+                updated += 1
+        if updated:
+            self.save_json(self.database_file, data)
+        return updated
+
+    def migrate_attendance_segments(self):
+        """Move attendance rows still held in database.json (already backfilled by
+        migrate_attendance_times) into the monthly segments. Returns the number moved."""
+        data = self.load_json(self.database_file)
+        rows = data.get("attendance") or []
+        if not rows:
+            return 0
+        self.attendance.add_rows(rows)
+        data["attendance"] = []
+        self.save_json(self.database_file, data)
+        return len(rows)
+
+    # Id allocation
+    def reserve_ids(self, collection, count):
+        """Reserve count consecutive ids (e.g. for a bulk import); returns the first"""
+        return self.sequences.reserve(collection, count)
+
+    def _last_announcement_id(self):
+        # Archived announcements keep their ids, so they count too
+        live = self.load_json(self.dashboard_file).get("announcements", [])
+        return max([a.get("id") or 0 for a in live] + [self.dashboard_archive.max_id("announcements")])
+
     # Basic JSON helpers
     def load_json(self, filepath):
         try:
-            with open(filepath, 'r') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
+            return storage_format.load(filepath)
+        except (FileNotFoundError, *storage_format.DECODE_ERRORS):
             # return sensible default based on file
             if "employees" in filepath:
                 return {"departments": [], "employees": []}
@@ -192,13 +303,129 @@ class DataHandler:
     def save_json(self, filepath, data):
         try:
             os.makedirs(os.path.dirname(filepath), exist_ok=True)
-            with open(filepath, 'w') as f:
-                json.dump(data, f, indent=2)
+            # A file stays in the format it is in (see storage_format / convert_storage.py)
+            encoded = storage_format.dumps(data, storage_format.file_format(filepath))
+            # Written aside and swapped in, so a reader never sees a half-written file
+            tmp = os.path.join(os.path.dirname(filepath), f".{os.path.basename(filepath)}.tmp")
+            with open(tmp, 'wb') as f:
+                f.write(encoded)
+            os.replace(tmp, filepath)
+            self._record_cache.pop(filepath, None)
+            self.notifier.notify_write(filepath)
             return True
         except Exception as e:
             print(f"Error saving {filepath}: {e}")
             return False
 
+    # Typed record access (shared, cached objects: treat as read-only)
+    def _records(self, filepath, list_key, record_cls):
+        try:
+            st = os.stat(filepath)
+            sig = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            sig = None
+        cached = self._record_cache.get(filepath)
+        if cached is not None and sig is not None and cached[0] == sig:
+            return cached[1]
+        records = [record_cls.from_dict(d) for d in self.load_json(filepath).get(list_key, [])]
+        self._record_cache[filepath] = (sig, records)
+        return records
+
+    def cache_bytes(self):
+        """Rough size of the parsed-record caches: on-disk bytes of the cached files"""
+        return (self.student_shards.cache_bytes() + self.attendance.cache_bytes()
+                + sum(sig[1] for sig, _ in list(self._record_cache.values()) if sig))
+
+    def trim_caches(self):
+        """Drop parsed records that can be re-read (the current month and the current
+        snapshot stay); returns how many cache entries were dropped"""
+        count = self.student_shards.evict_cache() + self.attendance.evict_cache() + self.archives.clear_cache()
+        count += len(self._record_cache)
+        self._record_cache.clear()
+        return count
+
+    def snapshot(self):
+        """The current Snapshot (see snapshots): a consistent, unchanging view of
+        students, employees and attendance. Hold one for the length of a report."""
+        return self.snapshots.current()
+
+    def students(self):
+        """All students as Student records (not copies; use get_all_students for dicts)"""
+        return self.snapshot().students
+
+    def class_students(self, class_name):
+        """One class's Student records"""
+        return self.snapshot().students_in(class_name)
+
+    def students_signature(self):
+        """Changes whenever any student shard or the manifest is written"""
+        return self.student_shards.signature()
+
+    def employees(self):
+        return self.snapshot().employees
+
+    def employee_records(self):
+        """Employees straight from employees.json (cached until the file changes)"""
+        return self._records(self.employees_file, "employees", Employee)
+
+    # Typed, validated views (see schemas); invalid records are reported, not returned
+    def _decode_file(self, kind, path, errors):
+        try:
+            with open(path, "rb") as f:
+                decoded = schemas.decode(kind, f.read(), os.path.relpath(path, self.data_dir))
+        except FileNotFoundError:
+            return []
+        except storage_format.DECODE_ERRORS as e:
+            errors.append(schemas.SchemaError(kind, os.path.relpath(path, self.data_dir), None, None, f"unreadable: {e}"))
+            return []
+        errors.extend(decoded.errors)
+        return decoded.records
+
+    def typed_records(self, kind, start_date=None, end_date=None, errors=None):
+        """Records of one collection ("students", "employees", "attendance",
+        "correction_requests", "announcements"): Student, Employee and AttendanceRecord
+        models for the first three, dicts for the others. Invalid records are appended to
+        `errors` (a list) if given and skipped. start_date/end_date limit attendance to the
+        overlapping monthly segments and the date range."""
+        errors = [] if errors is None else errors
+        if kind == "students":
+            return [r for _, path in self.student_shards.shard_paths() for r in self._decode_file(kind, path, errors)]
+        if kind == "attendance":
+            months = self.attendance.months()
+            covered = months_between(start_date, end_date) if start_date and end_date else None
+            if covered is not None:
+                months = [m for m in covered if m in months]
+            records = []
+            for month in months:
+                try:
+                    filename, raw = self.attendance.segment_bytes(month)
+                    decoded = schemas.decode(kind, raw, os.path.join("attendance", filename))
+                except (OSError, EOFError, *storage_format.DECODE_ERRORS) as e:
+                    errors.append(schemas.SchemaError(kind, os.path.join("attendance", month), None, None, str(e)))
+                    continue
+                errors.extend(decoded.errors)
+                records.extend(r for r in decoded.records
+                               if not (start_date and end_date) or start_date <= r.date <= end_date)
+            return records
+        path = {"employees": self.employees_file, "correction_requests": self.correction_requests_file,
+                "announcements": self.dashboard_file}[kind]
+        return self._decode_file(kind, path, errors)
+
+    def validate_data(self):
+        """Check every collection against its schema; returns {"checked": n, "errors":
+        [SchemaError, ...]} and prints one line per invalid record"""
+        errors = []
+        checked = sum(len(self.typed_records(kind, errors=errors)) for kind in schemas.FIELDS)
+        for error in errors:
+            where = f"{error.source}[{error.index}]" if error.index is not None else error.source
+            print(f"Invalid {error.kind} record {where} (id {error.record_id}): {error.message}")
+        return {"checked": checked + len(errors), "errors": errors}
+
+    def attendance_records(self, start_date=None, end_date=None):
+        """AttendanceRecords (shared, read-only); with a date range only the overlapping
+        monthly segments are read"""
+        return list(self.snapshot().attendance(start_date, end_date))
+
     # Password hashing
     def hash_password(self, password):
         return hashlib.sha256(password.encode()).hexdigest()
@@ -234,62 +461,48 @@ class DataHandler:
         return self.save_json(self.working_hours_file, data)
 
     def calculate_overtime(self, employee_id, date_range_start, date_range_end):
-        attendance_records = self.get_employee_attendance(employee_id, date_range_start, date_range_end)
-        hours_settings = self.get_working_hours_settings()
-        employee_settings = hours_settings.get("employee_settings", {}).get(str(employee_id), {})
-        daily_hours = employee_settings.get("daily", hours_settings.get("standard_daily_hours", 8))
-        overtime_rate = hours_settings.get("overtime_rate", 1.5)
-        total_hours = 0.0
-        overtime_hours = 0.0
-        overtime_pay = 0.0
-        for record in attendance_records:
-            if record.get('check_in') and record.get('check_out'):
-                try:
-                    ci = datetime.strptime(record['check_in'], "%H:%M:%S")
-                    co = datetime.strptime(record['check_out'], "%H:%M:%S")
-                    hours = (co - ci).seconds / 3600.0
-                    total_hours += hours
-                    if hours > daily_hours:
-                        ot = hours - daily_hours
-                        overtime_hours += ot
-                        overtime_pay += ot * overtime_rate
-                except:
-                    pass
-        return {"total_hours": round(total_hours, 2), "overtime_hours": round(overtime_hours, 2), "overtime_pay": round(overtime_pay, 2), "regular_hours": round(total_hours - overtime_hours, 2)}
+        rows = self.calculate_payroll(date_range_start, date_range_end, employee_ids=[employee_id])
+        if not rows:
+            return {"total_hours": 0.0, "overtime_hours": 0.0, "overtime_pay": 0.0, "regular_hours": 0.0}
+        row = rows[0]
+        return {"total_hours": row["total_hours"], "overtime_hours": row["overtime_hours"], "overtime_pay": row["overtime_pay"], "regular_hours": row["regular_hours"]}
+
+    def calculate_payroll(self, start_date, end_date, employee_ids=None):
+        """Hours and overtime pay for every employee (or employee_ids) over a period, in one pass"""
+        snapshot = self.snapshot()
+        return payroll.compute_payroll(snapshot.attendance(start_date, end_date), snapshot.employees, self.get_working_hours_settings(), start_date, end_date, employee_ids)
 
     # Announcement methods omitted for brevity (kept as before)
     def add_announcement(self, title, content, author, author_id, priority="Medium", visible_to=None):
         data = self.load_json(self.dashboard_file)
         announcements = data.get("announcements", [])
-        new_id = max([ann.get("id", 0) for ann in announcements], default=0) + 1
-        announcement = {"id": new_id, "title": title, "content": content, "author": author, "author_id": author_id, "date": datetime.now().isoformat(), "priority": priority, "visible_to": visible_to if visible_to else ["All"], "attachments": [], "read_by": []}
+        # From the persisted sequence (seeded past archived ids too, see
+        # _last_announcement_id): an archived announcement's id is never handed out
+        # again, so its read receipts can't mark a new one as read
+        new_id = self.sequences.next_id("announcements")
+        announcement = {"id": new_id, "title": title, "content": content, "author": author, "author_id": author_id, "date": datetime.now().isoformat(), "priority": priority, "visible_to": visible_to if visible_to else ["All"], "attachments": []}
         announcements.append(announcement)
         data["announcements"] = announcements
-        return self.save_json(self.dashboard_file, data)
+        index_current = self.announcements.expect_write()
+        if not self.save_json(self.dashboard_file, data):
+            return False
+        self.announcements.added(announcement, was_current=index_current)
+        return True
 
-    def get_announcements_for_employee(self, employee_id, employee_department="All"):
-        data = self.load_json(self.dashboard_file)
-        announcements = data.get("announcements", [])
-        visible_announcements = []
-        for ann in announcements:
-            visible_to = ann.get("visible_to", ["All"])
-            if "All" in visible_to or employee_department in visible_to or str(employee_id) in [str(x) for x in visible_to]:
-                visible_announcements.append(ann)
-        visible_announcements.sort(key=lambda x: x.get("date", ""), reverse=True)
-        return visible_announcements
+    def get_announcements_for_employee(self, employee_id, employee_department="All", unread_only=False, limit=None):
+        """Announcements visible to an employee, newest first, each with an "unread" flag"""
+        return self.announcements.for_employee(employee_id, employee_department, unread_only, limit)
+
+    def get_unread_announcement_count(self, employee_id, employee_department="All"):
+        return self.announcements.unread_count(employee_id, employee_department)
 
     def mark_announcement_as_read(self, announcement_id, employee_id):
-        data = self.load_json(self.dashboard_file)
-        announcements = data.get("announcements", [])
-        for ann in announcements:
-            if ann.get("id") == announcement_id:
-                if "read_by" not in ann:
-                    ann["read_by"] = []
-                if employee_id not in ann["read_by"]:
-                    ann["read_by"].append(employee_id)
-                break
-        data["announcements"] = announcements
-        return self.save_json(self.dashboard_file, data)
+        self.announcements.mark_read(employee_id, [announcement_id])
+        return True
+
+    def mark_announcements_as_read(self, announcement_ids, employee_id):
+        """Record several receipts in one append; returns how many were new"""
+        return self.announcements.mark_read(employee_id, announcement_ids)
 
     def get_announcements(self, limit=None):
         data = self.load_json(self.dashboard_file)
@@ -301,9 +514,9 @@ class DataHandler:
 
     # Export students to DataFrame (used by admin manager/report generator)
     def export_students_to_excel(self, class_filter=None):
-        students = self.get_all_students()
-        if class_filter:
-            students = [s for s in students if s.get('class') == class_filter]
+        snapshot = self.snapshot()
+        records = snapshot.students_in(class_filter) if class_filter else snapshot.students
+        students = [s.to_dict() for s in records]
         data = []
         for i, student in enumerate(students, 1):
             data.append({
@@ -324,11 +537,11 @@ class DataHandler:
         return pd.DataFrame(data)
 
     def get_students_grouped_by_class(self):
-        students = self.get_all_students()
-        classes = self.get_all_classes()
+        # Class list and students from one snapshot, so a transfer can't show up twice
+        snapshot = self.snapshot()
         grouped = {}
-        for class_name in classes:
-            class_students = [s for s in students if s.get('class') == class_name]
+        for class_name in snapshot.classes:
+            class_students = [s.to_dict() for s in snapshot.students_in(class_name)]
             if class_students:
                 class_students.sort(key=lambda x: x.get('name', ''))
                 grouped[class_name] = class_students
@@ -336,12 +549,10 @@ class DataHandler:
 
     # Employee methods
     def get_all_employees(self):
-        data = self.load_json(self.employees_file)
-        return data.get("employees", [])
+        return [emp.to_dict() for emp in self.employees()]
 
     def get_employees_by_department(self, department):
-        data = self.load_json(self.employees_file)
-        return [emp for emp in data.get("employees", []) if emp.get("department") == department]
+        return [emp.to_dict() for emp in self.employees() if emp.department == department]
 
     def get_all_departments(self):
         data = self.load_json(self.employees_file)
@@ -350,7 +561,7 @@ class DataHandler:
     def add_employee(self, name, department):
         data = self.load_json(self.employees_file)
         employees = data.get("employees", [])
-        new_id = max([emp.get("id", 0) for emp in employees], default=0) + 1
+        new_id = self.sequences.next_id("employees")
         employees.append({"id": new_id, "name": name, "department": department, "role": "", "email": "", "phone": "", "address": "", "password": self.hash_password("default123"), "assigned_grades": [], "photo": None, "working_hours": {"daily": 8, "weekly": 40}})
         data["employees"] = employees
         return self.save_json(self.employees_file, data)
@@ -395,41 +606,61 @@ class DataHandler:
 
     # Student methods
     def get_all_students(self):
-        data = self.load_json(self.students_file)
-        return data.get("students", [])
+        return [s.to_dict() for s in self.students()]
 
     def get_students_by_class(self, class_name):
-        data = self.load_json(self.students_file)
-        return [s for s in data.get("students", []) if s.get("class") == class_name]
+        return [s.to_dict() for s in self.class_students(class_name)]
+
+    def get_students_json(self, class_name=None):
+        """Encoded JSON array of one class's students (or all), from cached shard encodings"""
+        if class_name:
+            return self.student_shards.encoded(class_name)
+        return self.student_shards.encoded_all()
+
+    def get_student(self, student_id):
+        """One student as a dict (reads only the student's class shard), or None"""
+        record = self.student_shards.get(student_id)
+        return record.to_dict() if record is not None else None
+
+    def get_student_count(self):
+        return self.student_shards.count()
 
     def get_all_classes(self):
-        data = self.load_json(self.students_file)
-        return data.get("classes", [])
+        return self.student_shards.classes()
 
     def add_student(self, name, class_name, parent_contact="", parent_email="", dob="", age=0, address="", health_status="Good", allergies="", emergency_contact=""):
-        data = self.load_json(self.students_file)
-        students = data.get("students", [])
-        if class_name and class_name not in data.get("classes", []):
-            data["classes"].append(class_name)
-        new_id = max([s.get("id", 0) for s in students], default=0) + 1
-        student = {"id": new_id, "name": name, "class": class_name, "parent_contact": parent_contact, "parent_email": parent_email, "dob": dob, "age": age, "address": address, "health_status": health_status, "allergies": allergies, "emergency_contact": emergency_contact, "enrollment_date": date.today().isoformat(), "photo": None, "academic_results": {"Term 1": {}, "Term 2": {}, "Term 3": {}}, "attendance_record": {"present": 0, "absent": 0, "late": 0}, "monthly_attendance": {}, "term_attendance": {}}
-        students.append(student)
-        data["students"] = students
-        return self.save_json(self.students_file, data)
+        student = {"id": None, "name": name, "class": class_name, "parent_contact": parent_contact, "parent_email": parent_email, "dob": dob, "age": age, "address": address, "health_status": health_status, "allergies": allergies, "emergency_contact": emergency_contact, "enrollment_date": date.today().isoformat(), "photo": None, "academic_results": {"Term 1": {}, "Term 2": {}, "Term 3": {}}, "attendance_record": {"present": 0, "absent": 0, "late": 0}, "monthly_attendance": {}, "term_attendance": {}}
+        # The new id lets callers attach a photo without looking the student up by name
+        try:
+            return self.student_shards.add(student)
+        except OSError as e:
+            print(f"Error adding student: {e}")
+            return False
 
     def update_student(self, student_id, **updates):
-        data = self.load_json(self.students_file)
-        for student in data.get("students", []):
-            if student.get("id") == student_id:
-                student.update(updates)
-                break
-        return self.save_json(self.students_file, data)
+        try:
+            if "class" in updates and updates["class"] != self.student_shards.class_of(student_id):
+                # A transfer moves the student between shards
+                return self.student_shards.move(student_id, updates["class"], updates)
+            return self.student_shards.update(student_id, lambda s: s.update(updates) or True) is not None
+        except OSError as e:
+            print(f"Error updating student {student_id}: {e}")
+            return False
+
+    def replace_students(self, students):
+        """Replace every student (e.g. a bulk import); the class list is kept"""
+        try:
+            return self.student_shards.replace_all(students)
+        except OSError as e:
+            print(f"Error replacing students: {e}")
+            return False
 
     def remove_student(self, student_id):
-        data = self.load_json(self.students_file)
-        students = [s for s in data.get("students", []) if s.get("id") != student_id]
-        data["students"] = students
-        return self.save_json(self.students_file, data)
+        try:
+            return self.student_shards.remove(student_id)
+        except OSError as e:
+            print(f"Error removing student {student_id}: {e}")
+            return False
 
     # Attendance methods (employee)
     def record_check_in(self, employee_id, employee_name, department):
@@ -437,60 +668,80 @@ class DataHandler:
         today = date.today().isoformat()
         current_time = now.strftime("%H:%M:%S")
         rec = {"employee_id": employee_id, "employee_name": employee_name, "department": department, "date": today, "check_in": current_time, "check_out": None, "status": "Present", "timestamp": now.isoformat()}
-        data = self.load_json(self.database_file)
-        data.setdefault("attendance", []).append(rec)
-        return self.save_json(self.database_file, data)
+        attendance_time.stamp_times(rec)
+        return self.attendance.append(rec)
 
     def record_check_out(self, employee_id):
         today = date.today().isoformat()
         current_time = datetime.now().strftime("%H:%M:%S")
-        data = self.load_json(self.database_file)
-        for record in reversed(data.get("attendance", [])):
-            if record.get("employee_id") == employee_id and record.get("date") == today and record.get("check_out") is None:
-                record["check_out"] = current_time
-                break
-        return self.save_json(self.database_file, data)
+
+        def check_out(rows):
+            for record in reversed(rows):
+                if record.get("employee_id") == employee_id and record.get("date") == today and record.get("check_out") is None:
+                    record["check_out"] = current_time
+                    attendance_time.stamp_times(record)
+                    return True
+            return False
+        return self.attendance.update_month(month_of(today), check_out)
 
     def get_today_attendance(self):
-        today = date.today().isoformat()
-        data = self.load_json(self.database_file)
-        return [r for r in data.get("attendance", []) if r.get("date") == today]
+        return self.get_attendance_by_date(date.today().isoformat())
 
     def get_attendance_by_date(self, target_date):
-        data = self.load_json(self.database_file)
-        return [r for r in data.get("attendance", []) if r.get("date") == target_date]
+        return [r.to_dict() for r in self.snapshot().attendance(target_date, target_date)]
 
     def get_attendance_by_range(self, start_date, end_date):
-        data = self.load_json(self.database_file)
-        result = []
-        for record in data.get("attendance", []):
-            record_date = record.get("date")
-            if start_date <= record_date <= end_date:
-                result.append(record)
-        return result
+        return [r.to_dict() for r in self.snapshot().attendance(start_date, end_date)]
 
     def get_employee_attendance(self, employee_id, start_date=None, end_date=None):
-        data = self.load_json(self.database_file)
-        result = []
-        for record in data.get("attendance", []):
-            if record.get("employee_id") == employee_id:
-                if start_date and end_date:
-                    rdate = record.get("date")
-                    if start_date <= rdate <= end_date:
-                        result.append(record)
-                else:
-                    result.append(record)
-        return result
+        return [r.to_dict() for r in self.snapshot().attendance(start_date, end_date) if r.employee_id == employee_id]
 
     def has_checked_in_today(self, employee_id):
         today = date.today().isoformat()
-        data = self.load_json(self.database_file)
-        for record in data.get("attendance", []):
-            if record.get("employee_id") == employee_id and record.get("date") == today and record.get("check_out") is None:
+        for record in self.snapshot().attendance(today, today):
+            if record.employee_id == employee_id and record.check_out is None:
                 return True
         return False
 
     # Photo helpers
+    def _store_photo(self, owner, record_id, source):
+        """Run a photo through the rendition pipeline; returns {rendition: filename} or None"""
+        try:
+            renditions = photo_pipeline.ingest_photo(source, self.photos_dir, f"{owner}_{record_id}")
+        except (OSError, ValueError) as e:
+            print(f"Error saving {owner} photo: {e}")
+            return None
+        for filename in renditions.values():
+            self.notifier.notify_write(os.path.join(self.photos_dir, filename))
+        return renditions
+
+    def _remove_old_renditions(self, record, keep):
+        """Delete photo files a record referenced before its photo was replaced"""
+        old = set((record.get("photo_renditions") or {}).values())
+        if record.get("photo"):
+            old.add(record["photo"])
+        for filename in old - set(keep.values()):
+            path = os.path.join(self.photos_dir, os.path.basename(filename))
+            try:
+                os.remove(path)
+                self.notifier.notify_write(path, action="deleted")
+            except OSError:
+                pass
+
+    def save_student_photo(self, student_id, source):
+        """Save a student photo from a file path, bytes or binary file object.
+        Returns the primary rendition filename, or None on failure."""
+        student = self.get_student(student_id)
+        if not student:
+            return None
+        renditions = self._store_photo("student", student_id, source)
+        if not renditions:
+            return None
+        primary = renditions[photo_pipeline.PRIMARY_RENDITION]
+        self.update_student(student_id, photo=primary, photo_renditions=renditions)
+        self._remove_old_renditions(student, renditions)
+        return primary
+
     def save_student_photo_from_base64(self, student_id, image_base64):
         """Save base64 image for student and update student.photo with filename"""
         if not image_base64:
@@ -501,42 +752,22 @@ class DataHandler:
             if b64 == "":
                 b64 = header  # no header
             data = base64.b64decode(b64)
-            # Use safe filename
-            filename = f"student_{student_id}.jpg"
-            save_path = os.path.join(self.photos_dir, filename)
-            with open(save_path, "wb") as f:
-                f.write(data)
-            # Optionally resize using PIL
-            if PIL_AVAILABLE:
-                try:
-                    img = Image.open(save_path)
-                    img.thumbnail((300, 300))
-                    img.save(save_path, "JPEG")
-                except Exception:
-                    pass
-            # Update student record
-            self.update_student(student_id, photo=filename)
-            return filename
         except Exception as e:
             print(f"Error saving base64 photo: {e}")
             return None
+        return self.save_student_photo(student_id, data)
 
     def save_employee_photo(self, employee_id, photo_path):
-        """Save employee photo from path (if PIL available)"""
-        if not PIL_AVAILABLE:
-            print("PIL not available")
+        """Save employee photo from a file path, bytes or binary file object"""
+        employee = next((e for e in self.get_all_employees() if e.get("id") == employee_id), None)
+        if not employee:
             return False
-        try:
-            if os.path.exists(photo_path):
-                filename = f"employee_{employee_id}.jpg"
-                save_path = os.path.join(self.photos_dir, filename)
-                img = Image.open(photo_path)
-                img.thumbnail((150, 150))
-                img.save(save_path, "JPEG")
-                return self.update_employee(employee_id, photo=filename)
-        except Exception as e:
-            print(f"Error saving employee photo: {e}")
-        return False
+        renditions = self._store_photo("employee", employee_id, photo_path)
+        if not renditions:
+            return False
+        ok = self.update_employee(employee_id, photo=renditions[photo_pipeline.PRIMARY_RENDITION], photo_renditions=renditions)
+        self._remove_old_renditions(employee, renditions)
+        return ok
 
     def get_employee_photo(self, employee_id):
         employees = self.get_all_employees()
@@ -547,9 +778,16 @@ class DataHandler:
                 return path
         return None
 
+    def student_photo_path(self, student):
+        """Photo path for an already-loaded student record (no JSON reload), or None"""
+        if student and student.get("photo"):
+            path = os.path.join(self.photos_dir, student["photo"])
+            if os.path.exists(path):
+                return path
+        return None
+
     def get_student_photo(self, student_id):
-        students = self.get_all_students()
-        student = next((s for s in students if s.get("id") == student_id), None)
+        student = self.get_student(student_id)
         if student and student.get("photo"):
             path = os.path.join(self.photos_dir, student["photo"])
             if os.path.exists(path):
@@ -558,80 +796,92 @@ class DataHandler:
 
     # Update student results
     def update_student_results(self, student_id, term, subject, score):
-        data = self.load_json(self.students_file)
-        for s in data.get("students", []):
-            if s.get("id") == student_id:
-                if "academic_results" not in s:
-                    s["academic_results"] = {}
-                if term not in s["academic_results"]:
-                    s["academic_results"][term] = {}
-                s["academic_results"][term][subject] = score
-                break
-        return self.save_json(self.students_file, data)
+        rankings_current = False
+
+        def set_score(s):
+            nonlocal rankings_current
+            # Checked under the shard lock, so only this write can touch the shard
+            # between here and record_score
+            rankings_current = self.rankings.expect_write()
+            if "academic_results" not in s:
+                s["academic_results"] = {}
+            if term not in s["academic_results"]:
+                s["academic_results"][term] = {}
+            s["academic_results"][term][subject] = score
+            return True
+        try:
+            updated = self.student_shards.update(
+                student_id, set_score,
+                saved=lambda s: self.rankings.record_score(s, term, subject, score, was_current=rankings_current))
+        except OSError as e:
+            print(f"Error saving results for student {student_id}: {e}")
+            return False
+        return updated is not None
 
     def get_student_results(self, student_id):
-        students = self.get_all_students()
-        student = next((s for s in students if s.get("id") == student_id), None)
+        student = self.get_student(student_id)
         if student:
             return student.get("academic_results", {})
         return {}
 
     # Student attendance update (single day marking)
     def update_student_attendance(self, student_id, status="present"):
-        data = self.load_json(self.students_file)
-        for s in data.get("students", []):
-            if s.get("id") == student_id:
-                if "attendance_record" not in s:
-                    s["attendance_record"] = {"present": 0, "absent": 0, "late": 0}
-                if status == "present":
-                    s["attendance_record"]["present"] += 1
-                elif status == "absent":
-                    s["attendance_record"]["absent"] += 1
-                elif status == "late":
-                    s["attendance_record"]["late"] += 1
-                break
-        return self.save_json(self.students_file, data)
+        def mark(s):
+            if "attendance_record" not in s:
+                s["attendance_record"] = {"present": 0, "absent": 0, "late": 0}
+            if status == "present":
+                s["attendance_record"]["present"] += 1
+            elif status == "absent":
+                s["attendance_record"]["absent"] += 1
+            elif status == "late":
+                s["attendance_record"]["late"] += 1
+            return True
+        return self._update_student_record(student_id, mark)
 
-    # MONTHLY attendance preserved for backwards compatibility (kept)
+    def _update_student_record(self, student_id, update):
+        try:
+            return self.student_shards.update(student_id, update) is not None
+        except OSError as e:
+            print(f"Error saving student {student_id}: {e}")
+            return False
+
+    # MONTHLY attendance, stored as one day bitmap per month (see month_bitmap)
     def save_student_monthly_attendance(self, student_id, month_key, present_dates):
-        # existing monthly attendance logic (kept simple)
-        data = self.load_json(self.students_file)
-        updated = False
         try:
-            year, month = [int(x) for x in month_key.split('-')]
-            num_days = calendar.monthrange(year, month)[1]
-        except:
+            mask = month_bitmap.days_to_mask(month_key, present_dates)
+        except (ValueError, AttributeError):
             return False
-        normalized = []
-        for d in present_dates:
-            try:
-                if isinstance(d, int):
-                    day = d
-                else:
-                    day = int(str(d).split('-')[-1])
-                if 1 <= day <= num_days:
-                    normalized.append(date(year, month, day).isoformat())
-            except:
-                continue
-        for s in data.get("students", []):
-            if s.get("id") == student_id:
-                if "monthly_attendance" not in s:
-                    s["monthly_attendance"] = {}
-                s["monthly_attendance"][month_key] = {"present_dates": normalized, "summary": {"present": len(normalized), "absent": num_days - len(normalized), "month_days": num_days}}
-                # For simplicity, we do not try to reconcile attendance_record deltas here
-                updated = True
-                break
-        if updated:
-            data["students"] = data.get("students", [])
-            return self.save_json(self.students_file, data)
-        return False
+
+        def set_month(s):
+            if "monthly_attendance" not in s:
+                s["monthly_attendance"] = {}
+            s["monthly_attendance"][month_key] = mask
+            # For simplicity, we do not try to reconcile attendance_record deltas here
+            return True
+        return self._update_student_record(student_id, set_month)
 
     def get_student_monthly_attendance(self, student_id, month_key):
-        students = self.get_all_students()
-        student = next((s for s in students if s.get("id") == student_id), None)
+        """{"present_dates": [...], "summary": {...}} for a month, or {} if not recorded"""
+        student = self.get_student(student_id)
         if not student:
             return {}
-        return student.get("monthly_attendance", {}).get(month_key, {})
+        entry = student.get("monthly_attendance", {}).get(month_key)
+        if entry is None:
+            return {}
+        try:
+            return month_bitmap.expand(month_key, entry)
+        except ValueError:
+            return {}
+
+    def get_student_monthly_summaries(self, student):
+        """{month_key: {"present", "absent", "month_days"}} for a loaded student record (popcounts only)"""
+        summaries = {}
+        for month_key, entry in (student.get("monthly_attendance") or {}).items():
+            try:
+                summaries[month_key] = month_bitmap.summary(month_key, month_bitmap.entry_mask(month_key, entry))
+            except ValueError:
+                continue
+        return summaries
 
     # NEW: Term attendance (per-term summary)
     def save_student_term_attendance(self, student_id, term_key, present_days):
@@ -640,7 +890,6 @@ class DataHandler:
         term_key: arbitrary string identifying term (e.g. "2024-Term1" or "Term 1 2024")
         present_days: integer number of days present in that term (teacher supplied)
         """
-        data = self.load_json(self.students_file)
         settings = self.load_json(self.settings_file)
         default_term_days = settings.get("term_days_default", 60)
         term_days_map = settings.get("term_days", {})
@@ -650,19 +899,14 @@ class DataHandler:
             pdays = max(0, min(pdays, total_days))
         except:
             return False
-        updated = False
-        for s in data.get("students", []):
-            if s.get("id") == student_id:
-                if "term_attendance" not in s:
-                    s["term_attendance"] = {}
-                s["term_attendance"][term_key] = {"present": pdays, "absent": total_days - pdays, "total_days": total_days}
-                # We don't automatically add to cumulative attendance_record to avoid double counting — term entries remain canonical
-                updated = True
-                break
-        if updated:
-            data["students"] = data.get("students", [])
-            return self.save_json(self.students_file, data)
-        return False
+
+        def set_term(s):
+            if "term_attendance" not in s:
+                s["term_attendance"] = {}
+            s["term_attendance"][term_key] = {"present": pdays, "absent": total_days - pdays, "total_days": total_days}
+            # We don't automatically add to cumulative attendance_record to avoid double counting — term entries remain canonical
+            return True
+        return self._update_student_record(student_id, set_term)
 
     # Grade/employee helpers (kept as before)
     def assign_employee_grade(self, employee_id, grade):
@@ -699,7 +943,7 @@ class DataHandler:
     # Correction request flows
     def submit_correction_request(self, employee_id, employee_name, original_date, original_status, requested_correction, reason):
         data = self.load_json(self.correction_requests_file)
-        new_id = max([req.get("id", 0) for req in data.get("requests", [])], default=0) + 1
+        new_id = self.sequences.next_id("correction_requests")
         request = {"id": new_id, "employee_id": employee_id, "employee_name": employee_name, "original_date": original_date, "original_status": original_status, "requested_correction": requested_correction, "reason": reason, "status": "Pending", "submitted_date": datetime.now().isoformat(), "processed_by": None, "processed_date": None, "notes": ""}
         data.setdefault("requests", []).append(request)
         return self.save_json(self.correction_requests_file, data)
@@ -725,24 +969,55 @@ class DataHandler:
         return self.save_json(self.correction_requests_file, data)
 
     def apply_attendance_correction(self, request):
-        data = self.load_json(self.database_file)
-        for rec in data.get("attendance", []):
-            if rec.get("employee_id") == request.get("employee_id") and rec.get("date") == request.get("original_date"):
-                if "status" in request["requested_correction"]:
-                    rec["status"] = request["requested_correction"]["status"]
-                if "check_in" in request["requested_correction"]:
-                    rec["check_in"] = request["requested_correction"]["check_in"]
-                if "check_out" in request["requested_correction"]:
-                    rec["check_out"] = request["requested_correction"]["check_out"]
-                rec["correction_applied"] = True
-                rec["correction_date"] = datetime.now().isoformat()
-                break
-        return self.save_json(self.database_file, data)
+        def correct(rows):
+            for rec in rows:
+                if rec.get("employee_id") == request.get("employee_id") and rec.get("date") == request.get("original_date"):
+                    if "status" in request["requested_correction"]:
+                        rec["status"] = request["requested_correction"]["status"]
+                    if "check_in" in request["requested_correction"]:
+                        rec["check_in"] = request["requested_correction"]["check_in"]
+                    if "check_out" in request["requested_correction"]:
+                        rec["check_out"] = request["requested_correction"]["check_out"]
+                    attendance_time.stamp_times(rec)
+                    rec["correction_applied"] = True
+                    rec["correction_date"] = datetime.now().isoformat()
+                    return True
+            return False
+        # A closed month gets a new segment revision rather than an in-place edit
+        return self.attendance.update_month(month_of(request.get("original_date")), correct)
 
     # Dashboard events
     def get_dashboard_data(self):
         return self.load_json(self.dashboard_file)
 
+    def get_upcoming_events(self, days=None, limit=None):
+        """Live events from today on (within `days` if given), soonest first"""
+        return self.events.upcoming(days, limit)
+
+    def get_events_between(self, start_date, end_date):
+        return self.events.between(start_date, end_date)
+
+    def archive_dashboard(self, today=None):
+        """Move expired announcements and past events out of dashboard.json into the
+        dashboard archive (retention from settings); returns the number of items moved"""
+        settings = self.load_json(self.settings_file)
+        data = self.load_json(self.dashboard_file)
+        live, expired = dashboard_archive.split_expired(
+            data, today or date.today(),
+            settings.get("announcement_retention_days", dashboard_archive.DEFAULT_ANNOUNCEMENT_RETENTION_DAYS),
+            settings.get("event_retention_days", dashboard_archive.DEFAULT_EVENT_RETENTION_DAYS))
+        moved = sum(len(items) for items in expired.values())
+        if not moved:
+            return 0
+        # Archive first: a crash before the save leaves duplicates the archive ignores, never losses
+        self.dashboard_archive.add(expired)
+        self.save_json(self.dashboard_file, live)
+        return moved
+
+    def get_dashboard_history(self, kind="announcements", page=1, page_size=20):
+        """A page of archived announcements or events, newest first"""
+        return self.dashboard_archive.history(kind, page, page_size)
+
     def add_event(self, title, event_date, description=""):
         data = self.load_json(self.dashboard_file)
         events = data.get("events", [])
@@ -753,7 +1028,7 @@ class DataHandler:
     # School info
     def get_school_info(self):
         settings = self.load_json(self.settings_file)
-        return {"name": settings.get("school_name", "School"), "year": settings.get("school_year", ""), "total_employees": len(self.get_all_employees()), "total_students": len(self.get_all_students())}
+        return {"name": settings.get("school_name", "School"), "year": settings.get("school_year", ""), "total_employees": len(self.get_all_employees()), "total_students": self.get_student_count()}
 
     def get_available_subjects(self):
         settings = self.load_json(self.settings_file)
@@ -763,19 +1038,97 @@ class DataHandler:
         settings = self.load_json(self.settings_file)
         return settings.get("terms", [])
 
+    # School-year rollover
+    def rollover_school_year(self, new_year=None, promotions=None, retain=()):
+        """Archive the closing year, promote/graduate every class and reset per-year data.
+        promotions overrides the class -> next class mapping (None = graduates); retain
+        is student ids kept in their class. Returns a summary dict; raises ValueError for
+        an unusable year label and FileExistsError if the year was already archived."""
+        settings = self.load_json(self.settings_file)
+        closing_year = settings.get("school_year", "")
+        new_year = new_year or school_year.next_school_year(closing_year)
+        if not closing_year or not new_year:
+            raise ValueError(f"Cannot determine the next school year after '{closing_year}'")
+        classes = self.get_all_classes()
+        entries, remaining, counts = school_year.plan_rollover(
+            self.get_all_students(), classes, settings.get("terms", []), promotions, retain)
+
+        archive_path = self.archives.path_for(closing_year)
+        school_year.write_archive(archive_path, school_year.build_archive(closing_year, classes, entries))
+        if not self.replace_students(remaining):
+            school_year.remove_archive(archive_path)
+            raise OSError("Failed to write the student shards; rollover undone")
+        settings["school_year"] = new_year
+        self.save_json(self.settings_file, settings)
+        summary = dict(counts, closing_year=closing_year, new_year=new_year, archive=archive_path)
+        return summary
+
+    def get_student_transcript(self, student_id):
+        """Archived years for a student (including graduates) plus the year in progress"""
+        years = self.archives.transcript(student_id)
+        student = self.get_student(student_id)
+        if student is not None:
+            settings = self.load_json(self.settings_file)
+            years.append({
+                "school_year": settings.get("school_year", ""),
+                "class": student.get("class", ""),
+                "outcome": "in progress",
+                "next_class": None,
+                "academic_results": student.get("academic_results") or {},
+                "term_attendance": student.get("term_attendance") or {},
+                "attendance_record": student.get("attendance_record") or {},
+                "monthly_summary": self.get_student_monthly_summaries(student),
+            })
+        return years
+
+    # Backups
     def create_backup(self):
-        backup_dir = os.path.join(self.data_dir, "backups")
-        os.makedirs(backup_dir, exist_ok=True)
-        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_file = os.path.join(backup_dir, f"backup_{ts}.json")
-        data = self.load_json(self.database_file)
-        return self.save_json(backup_file, data)
+        """Snapshot data/ into the backup store and apply the backup_days retention"""
+        try:
+            stats = self.backups.create_snapshot()
+            settings = self.load_json(self.settings_file)
+            removed, chunks = self.backups.prune(settings.get("backup_days", 7))
+        except OSError as e:
+            print(f"Error creating backup: {e}")
+            return False
+        print(f"Backup {stats['id']}: {stats['files']} files, {stats['reused']} unchanged, "
+              f"{stats['new_chunks']} new chunks ({stats['bytes_written']} bytes) in {stats['seconds']}s; "
+              f"pruned {len(removed)} snapshots, {chunks} chunks")
+        return True
+
+    def list_backups(self):
+        """Snapshot ids, newest first"""
+        return list(reversed(self.backups.snapshots()))
+
+    def restore_backup(self, snapshot_id):
+        """Return data/ to a snapshot's point in time: its files are restored and files
+        written since (a new attendance month, class shard, photo...) are removed"""
+        if snapshot_id not in self.backups.snapshots():
+            return False
+        try:
+            self.backups.restore(snapshot_id, remove_extra=True)
+        except (OSError, ValueError) as e:
+            print(f"Error restoring backup {snapshot_id}: {e}")
+            return False
+        # Restored files carry their old mtimes, so nothing keyed on stat signatures
+        # can be trusted to notice the change
+        self._record_cache.clear()
+        self.student_shards.evict_cache()
+        self.attendance.clear_cache()
+        self.archives.clear_cache()
+        self.rankings.invalidate()
+        self.announcements.invalidate()
+        self.events.invalidate()
+        self.snapshots.invalidate()
+        for path in (self.student_shards.manifest_file, self.employees_file, self.settings_file, self.dashboard_file,
+                     self.correction_requests_file, self.working_hours_file, self.attendance.manifest_file):
+            self.notifier.notify_write(path)
+        return True
 
     def get_student_full_info(self, student_id):
-        students = self.get_all_students()
-        student = next((s for s in students if s.get("id") == student_id), None)
+        student = self.get_student(student_id)
         if student:
-            student["photo_path"] = self.get_student_photo(student_id)
+            student["photo_path"] = self.student_photo_path(student)
             return student
         return None
 
@@ -1,11 +1,15 @@
 # gui.py - COMPLETE WORKING VERSION WITH ALL FIXES (UPDATED)
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext, filedialog
-from datetime import datetime, date, timedelta
-import os
+from datetime import date, timedelta
 from PIL import Image, ImageTk
 import calendar
 import webbrowser
+import queue
+from virtual_table import VirtualTable
+from background_tasks import BackgroundTasks
+from thumbnail_cache import ThumbnailCache
+import attendance_time
 
 class AttendanceGUI:
     def __init__(self, root, data_handler, report_generator, admin_manager, student_manager):
@@ -22,6 +26,14 @@ class AttendanceGUI:
         self.student_photo_path = None
         self.employee_photo_path = None
         
+        # Data change events: notifier callbacks run on writer/watcher threads, so they are
+        # queued here and handed to the current view from the Tk loop
+        self.change_queue = queue.Queue()
+        self.view_change_handlers = []
+        self.data_handler.notifier.subscribe(self.change_queue.put)
+        self.data_handler.start_change_watcher()
+        self.root.after(300, self.process_change_events)
+        
         # Set up main window
         self.root.title("School Management System")
         self.root.geometry("1200x700")
@@ -31,6 +43,17 @@ class AttendanceGUI:
         self.main_container = tk.Frame(self.root, bg='#f0f0f0')
         self.main_container.pack(fill='both', expand=True)
         
+        # Status bar with a spinner, shown while background work is running
+        self.status_bar = tk.Frame(self.main_container, bg='#dfe6e9')
+        self.status_label = tk.Label(self.status_bar, text="", bg='#dfe6e9', font=('Arial', 9))
+        self.status_label.pack(side='left', padx=10, pady=3)
+        self.status_spinner = ttk.Progressbar(self.status_bar, mode='indeterminate', length=120)
+        self.status_spinner.pack(side='right', padx=10, pady=3)
+        
+        # Slow DataHandler / report work runs on worker threads, results come back via root.after
+        self.tasks = BackgroundTasks(self.root, on_busy_change=self.set_busy)
+        self.thumbnails = ThumbnailCache(self.data_handler.photos_dir)
+        
         # Create content frame
         self.content_frame = tk.Frame(self.main_container, bg='#f0f0f0')
         self.content_frame.pack(fill='both', expand=True, padx=20, pady=20)
@@ -40,9 +63,66 @@ class AttendanceGUI:
     
     def clear_content_frame(self):
         """Clear all widgets from content frame"""
+        # Views re-register their change handlers when built; their pending loads are dropped
+        self.view_change_handlers = []
+        self.tasks.cancel_scope("view")
         for widget in self.content_frame.winfo_children():
             widget.destroy()
     
+    def watch_data_changes(self, kinds, callback):
+        """Call callback() on the Tk thread when any of the given data kinds changes.
+        Handlers belong to the current screen and are dropped on navigation."""
+        self.view_change_handlers.append((set(kinds), callback))
+    
+    def set_busy(self, message):
+        """Show or hide the status bar spinner (message is None when idle)"""
+        if message:
+            self.status_label.config(text=message)
+            if not self.status_bar.winfo_ismapped():
+                self.status_bar.pack(side='bottom', fill='x', before=self.content_frame)
+                self.status_spinner.start(12)
+        elif self.status_bar.winfo_ismapped():
+            self.status_spinner.stop()
+            self.status_bar.pack_forget()
+    
+    def run_in_background(self, func, *args, on_done=None, message="Working...", scope="view", **kwargs):
+        """Run func off the Tk thread; on_done(result) runs back on the Tk thread.
+        View-scoped work is cancelled when the user navigates to another screen."""
+        def on_error(exc):
+            messagebox.showerror("Error", f"{message.rstrip('.')} failed:\n{exc}")
+        return self.tasks.submit(func, *args, on_done=on_done, on_error=on_error,
+                                 message=message, scope=scope, **kwargs)
+    
+    def show_loading(self, parent=None, text="Loading..."):
+        """Placeholder shown in a view while its data loads; returns the widget to destroy"""
+        frame = tk.Frame(parent or self.content_frame, bg='#f0f0f0')
+        frame.pack(pady=40)
+        tk.Label(frame, text=text, font=('Arial', 12), bg='#f0f0f0').pack(pady=(0, 10))
+        bar = ttk.Progressbar(frame, mode='indeterminate', length=200)
+        bar.pack()
+        bar.start(12)
+        return frame
+    
+    def process_change_events(self):
+        """Drain queued change events and refresh subscribed views (polled via root.after)"""
+        kinds = set()
+        try:
+            while True:
+                kinds.add(self.change_queue.get_nowait().kind)
+        except queue.Empty:
+            pass
+        if kinds:
+            handlers = self.view_change_handlers
+            for watched, callback in list(handlers):
+                if self.view_change_handlers is not handlers:
+                    break  # a handler rebuilt the screen; the rest are stale
+                if watched & kinds:
+                    try:
+                        callback()
+                    except tk.TclError:
+                        pass  # widgets went away underneath the handler
+        self.root.after(300, self.process_change_events)
+    
     def show_login_screen(self):
         """Show login/selection screen"""
         self.clear_content_frame()
@@ -291,6 +371,11 @@ class AttendanceGUI:
             bg='#f0f0f0'
         ).pack(pady=(0, 20))
         
+        # Unread badge on the announcements button
+        unread = self.data_handler.get_unread_announcement_count(
+            self.current_employee['id'], self.current_employee.get('department', 'All'))
+        announcements_label = f"📢 View Announcements ({unread} new)" if unread else "📢 View Announcements"
+        
         # Action buttons - Different for teaching vs non-teaching
         if self.current_employee.get("department") == "Teaching":
             actions = [
@@ -300,7 +385,7 @@ class AttendanceGUI:
                 ("📝 Request Correction", self.show_correction_request_form),
                 ("📅 Record Monthly Student Attendance", self.show_record_monthly_attendance),
                 ("⚙️ Settings", self.show_employee_settings),
-                ("📢 View Announcements", self.show_all_announcements)
+                (announcements_label, self.show_all_announcements)
             ]
         else:
             actions = [
@@ -308,7 +393,7 @@ class AttendanceGUI:
                 ("📊 View My Attendance", self.show_my_attendance),
                 ("📝 Request Correction", self.show_correction_request_form),
                 ("⚙️ Settings", self.show_employee_settings),
-                ("📢 View Announcements", self.show_all_announcements)
+                (announcements_label, self.show_all_announcements)
             ]
         
         for text, command in actions:
@@ -338,8 +423,9 @@ class AttendanceGUI:
         # Get announcements for this employee only
         announcements = self.data_handler.get_announcements_for_employee(
             self.current_employee['id'],
-            self.current_employee.get('department', 'All')
-        )[:3]
+            self.current_employee.get('department', 'All'),
+            limit=3
+        )
         
         if not announcements:
             tk.Label(
@@ -358,7 +444,7 @@ class AttendanceGUI:
                 
                 tk.Label(
                     ann_frame,
-                    text=f"📢 {ann['title'][:30]}",
+                    text=f"{'🆕' if ann.get('unread') else '📢'} {ann['title'][:30]}",
                     font=('Arial', 10, 'bold'),
                     bg='white'
                 ).pack(anchor='w', padx=10, pady=(5, 0))
@@ -494,51 +580,51 @@ class AttendanceGUI:
             bg='#f0f0f0'
         ).pack(pady=(20, 10))
         
-        # Get attendance records
-        records = self.data_handler.get_employee_attendance(self.current_employee['id'])
+        body = tk.Frame(self.content_frame, bg='#f0f0f0')
+        body.pack(fill='both', expand=True)
+        loading = self.show_loading(body, "Loading attendance history...")
         
-        if not records:
-            tk.Label(
-                self.content_frame,
-                text="No attendance records found",
-                font=('Arial', 14),
-                bg='#f0f0f0'
-            ).pack(pady=50)
-        else:
-            # Create treeview
-            columns = ('Date', 'Check-in', 'Check-out', 'Status', 'Hours Worked')
-            tree = ttk.Treeview(self.content_frame, columns=columns, show='headings', height=15)
-            
-            for col in columns:
-                tree.heading(col, text=col)
-                tree.column(col, width=120)
-            
-            tree.pack(fill='both', expand=True, padx=20, pady=20)
-            
-            # Add records (show most recent first)
-            for record in reversed(records[-50:]):  # Show last 50 records
+        tk.Button(
+            self.content_frame,
+            text="Back to Dashboard",
+            command=self.show_employee_dashboard
+        ).pack(pady=20)
+        
+        def load_rows(employee_id):
+            # Full history (most recent first); the table only renders what is scrolled into view
+            records = self.data_handler.get_employee_attendance(employee_id)
+            rows = []
+            for record in reversed(records):
                 hours = "N/A"
-                if record.get('check_in') and record.get('check_out'):
-                    try:
-                        check_in = datetime.strptime(record['check_in'], "%H:%M:%S")
-                        check_out = datetime.strptime(record['check_out'], "%H:%M:%S")
-                        hours = f"{(check_out - check_in).seconds / 3600:.2f}h"
-                    except:
-                        hours = "N/A"
+                worked = attendance_time.worked_hours(record)
+                if worked is not None:
+                    hours = f"{worked:.2f}h"
                 
-                tree.insert('', 'end', values=(
+                rows.append((
                     record.get('date', ''),
                     record.get('check_in', 'N/A'),
                     record.get('check_out', 'N/A'),
                     record.get('status', ''),
                     hours
                 ))
+            return rows
         
-        tk.Button(
-            self.content_frame,
-            text="Back to Dashboard",
-            command=self.show_employee_dashboard
-        ).pack(pady=20)
+        def show_rows(rows):
+            loading.destroy()
+            if not rows:
+                tk.Label(
+                    body,
+                    text="No attendance records found",
+                    font=('Arial', 14),
+                    bg='#f0f0f0'
+                ).pack(pady=50)
+                return
+            columns = ('Date', 'Check-in', 'Check-out', 'Status', 'Hours Worked')
+            table = VirtualTable(body, columns, rows, default_width=120, show_filter=True)
+            table.pack(fill='both', expand=True, padx=20, pady=20)
+        
+        self.run_in_background(load_rows, self.current_employee['id'], on_done=show_rows,
+                               message="Loading attendance history...")
     
     def show_correction_request_form(self):
         """Show form to request attendance correction"""
@@ -679,7 +765,7 @@ class AttendanceGUI:
                 
                 tk.Label(
                     frame,
-                    text=f"📢 {ann['title']}",
+                    text=f"{'🆕' if ann.get('unread') else '📢'} {ann['title']}",
                     font=('Arial', 12, 'bold'),
                     bg=frame['bg']
                 ).pack(anchor='w', padx=10, pady=(10, 0))
@@ -701,12 +787,11 @@ class AttendanceGUI:
                     fg='#666'
                 ).pack(anchor='w', padx=10, pady=(0, 10))
                 
-                # Mark read for current employee
-                if self.current_employee:
-                    try:
-                        self.data_handler.mark_announcement_as_read(ann.get('id'), self.current_employee['id'])
-                    except:
-                        pass
+            # Mark everything shown as read for the current employee (one log append)
+            if self.current_employee:
+                unread_ids = [ann.get('id') for ann in announcements if ann.get('unread')]
+                if unread_ids:
+                    self.data_handler.mark_announcements_as_read(unread_ids, self.current_employee['id'])
             
             canvas.pack(side='left', fill='both', expand=True)
             scrollbar.pack(side='right', fill='y')
@@ -793,8 +878,9 @@ class AttendanceGUI:
             
             # Number of days in the month
             num_days = calendar.monthrange(year, month)[1]
-            # Load existing month map if any
-            existing = self.data_handler.get_student_monthly_attendance(sid, month_key)
+            # Days already recorded as present for this month, if any
+            existing = set(self.data_handler.get_student_monthly_attendance(sid, month_key).get("present_dates", []))
+            check_vars.clear()
             
             canvas = tk.Canvas(days_frame)
             scrollbar = tk.Scrollbar(days_frame, orient='vertical', command=canvas.yview)
@@ -808,8 +894,7 @@ class AttendanceGUI:
             for d in range(1, num_days+1):
                 day_date = date(year, month, d)
                 date_str = day_date.isoformat()
-                status = existing.get(date_str, "Absent")
-                var = tk.IntVar(value=1 if status=="Present" else 0)
+                var = tk.IntVar(value=1 if date_str in existing else 0)
                 check_vars[date_str] = var
                 row = tk.Frame(inner, bg='white', pady=2)
                 row.pack(fill='x', padx=5, pady=2)
@@ -827,11 +912,11 @@ class AttendanceGUI:
             except:
                 messagebox.showerror("Error", "Invalid student selection")
                 return
-            # Build map
-            attendance_map = {}
-            for date_str, var in check_vars.items():
-                attendance_map[date_str] = "Present" if var.get()==1 else "Absent"
-            success, message = self.student_manager.record_monthly_attendance(sid, month_key, attendance_map)
+            if not check_vars:
+                messagebox.showwarning("Input Required", "Load the days for the month first")
+                return
+            present_dates = [date_str for date_str, var in check_vars.items() if var.get() == 1]
+            success, message = self.student_manager.record_student_monthly_attendance(sid, month_key, present_dates)
             if success:
                 messagebox.showinfo("Success", message)
                 dialog.destroy()
@@ -947,6 +1032,7 @@ class AttendanceGUI:
             ("➕ Add Student", self.show_add_student_to_grade),
             ("📊 Attendance", self.show_grade_attendance),
             ("📚 Academic Results", self.show_grade_results),
+            ("📈 Class Analytics", self.show_class_analytics),
             ("🏥 Health Records", self.show_health_records),
             ("📸 Update Photos", self.show_photo_management)
         ]
@@ -972,7 +1058,7 @@ class AttendanceGUI:
             command=self.show_teaching_grade_selection
         ).pack(pady=20)
     
-    def show_grade_students(self):
+    def show_grade_students(self, selected_tab=0):
         """Show students in the selected grade"""
         self.clear_content_frame()
         
@@ -1010,28 +1096,24 @@ class AttendanceGUI:
             basic_tab = tk.Frame(notebook, bg='#f0f0f0')
             notebook.add(basic_tab, text="Basic Info")
             
-            # Treeview
+            # Students table with numbering
             columns = ('No.', 'ID', 'Name', 'Age', 'Parent Contact', 'Health Status')
-            tree = ttk.Treeview(basic_tab, columns=columns, show='headings', height=15)
-            
-            for col in columns:
-                tree.heading(col, text=col)
-                tree.column(col, width=100)
-            
-            tree.column('Name', width=180)
-            tree.column('Parent Contact', width=120)
-            tree.pack(fill='both', expand=True, padx=10, pady=10)
-            
-            # Add students to tree with numbering
-            for idx, student in enumerate(students, start=1):
-                tree.insert('', 'end', values=(
-                    idx,
-                    student.get('id', ''),
-                    student.get('name', ''),
-                    student.get('age', ''),
-                    student.get('parent_contact', ''),
-                    student.get('health_status', '')
-                ))
+            rows = [(
+                idx,
+                student.get('id', ''),
+                student.get('name', ''),
+                student.get('age', ''),
+                student.get('parent_contact', ''),
+                student.get('health_status', '')
+            ) for idx, student in enumerate(students, start=1)]
+            table = VirtualTable(
+                basic_tab, columns, rows,
+                row_ids=[student['id'] for student in students],
+                column_widths={'Name': 180, 'Parent Contact': 120},
+                show_filter=True,
+                on_activate=lambda sid, values: self.edit_student_details(sid)
+            )
+            table.pack(fill='both', expand=True, padx=10, pady=10)
             
             # Detailed info tab
             detail_tab = tk.Frame(notebook, bg='#f0f0f0')
@@ -1055,18 +1137,12 @@ class AttendanceGUI:
                 frame = tk.Frame(scrollable_frame, bg='white', relief='solid', borderwidth=1)
                 frame.pack(fill='x', pady=5, padx=5)
                 
-                # Student photo if available
-                photo_path = self.data_handler.get_student_photo(student['id'])
-                if photo_path and os.path.exists(photo_path):
-                    try:
-                        img = Image.open(photo_path)
-                        img.thumbnail((80, 80))
-                        photo = ImageTk.PhotoImage(img)
-                        photo_label = tk.Label(frame, image=photo, bg='white')
-                        photo_label.image = photo
-                        photo_label.pack(side='left', padx=10, pady=10)
-                    except:
-                        pass
+                # Student photo if available (cached thumbnail)
+                photo = self.thumbnails.photo_image(self.data_handler.student_photo_path(student), (80, 80))
+                if photo:
+                    photo_label = tk.Label(frame, image=photo, bg='white')
+                    photo_label.image = photo
+                    photo_label.pack(side='left', padx=10, pady=10)
                 
                 # Student info
                 info_frame = tk.Frame(frame, bg='white')
@@ -1126,6 +1202,15 @@ class AttendanceGUI:
             
             canvas.pack(side='left', fill='both', expand=True)
             scrollbar.pack(side='right', fill='y')
+            notebook.select(selected_tab)
+        
+        # Re-render when students/photos change (keeping the open tab)
+        def refresh_students():
+            tab = 0
+            if students:
+                tab = notebook.index('current')
+            self.show_grade_students(selected_tab=tab)
+        self.watch_data_changes(["students", "photos"], refresh_students)
         
         # Back button
         tk.Button(
@@ -1254,7 +1339,7 @@ class AttendanceGUI:
                 return
             
             # Add student
-            success, message = self.student_manager.add_new_student(
+            success, message, new_id = self.student_manager.create_student(
                 name=name,
                 class_name=self.current_grade,
                 parent_contact=parent_phone_entry.get(),
@@ -1269,11 +1354,7 @@ class AttendanceGUI:
             if success:
                 # Save photo if selected
                 if self.student_photo_path:
-                    # Get the new student ID
-                    students = self.data_handler.get_students_by_class(self.current_grade)
-                    new_student = next((s for s in students if s['name'] == name), None)
-                    if new_student:
-                        self.data_handler.save_student_photo(new_student['id'], self.student_photo_path)
+                    self.data_handler.save_student_photo(new_id, self.student_photo_path)
                 
                 messagebox.showinfo("Success", message)
                 self.show_grade_students()
@@ -1823,26 +1904,17 @@ class AttendanceGUI:
                 tk.Label(results_frame, text="No records found", bg='#f0f0f0').pack()
                 return
             
-            # Create treeview
             columns = ('ID', 'Name', 'Department', 'Check-in', 'Check-out', 'Status')
-            tree = ttk.Treeview(results_frame, columns=columns, show='headings', height=10)
-            
-            for col in columns:
-                tree.heading(col, text=col)
-                tree.column(col, width=100)
-            
-            tree.pack(fill='both', expand=True, padx=10, pady=10)
-            
-            # Add records
-            for record in records:
-                tree.insert('', 'end', values=(
-                    record.get('employee_id', ''),
-                    record.get('employee_name', ''),
-                    record.get('department', ''),
-                    record.get('check_in', 'N/A'),
-                    record.get('check_out', 'N/A'),
-                    record.get('status', '')
-                ))
+            rows = [(
+                record.get('employee_id', ''),
+                record.get('employee_name', ''),
+                record.get('department', ''),
+                record.get('check_in', 'N/A'),
+                record.get('check_out', 'N/A'),
+                record.get('status', '')
+            ) for record in records]
+            table = VirtualTable(results_frame, columns, rows, height=10, show_filter=True)
+            table.pack(fill='both', expand=True, padx=10, pady=10)
         
         tk.Button(
             date_frame,
@@ -1856,6 +1928,7 @@ class AttendanceGUI:
         
         # Load today's attendance by default
         load_attendance()
+        self.watch_data_changes(["attendance"], load_attendance)
     
     def create_correction_requests_tab(self, notebook):
         """Create correction requests tab"""
@@ -1869,90 +1942,104 @@ class AttendanceGUI:
             bg='#f0f0f0'
         ).pack(pady=(20, 10))
         
-        # Get all correction requests
-        requests = self.data_handler.get_correction_requests()
+        # Rebuilt in place on approve/reject and when requests change elsewhere
+        list_frame = tk.Frame(tab, bg='#f0f0f0')
+        list_frame.pack(fill='both', expand=True)
         
-        if not requests:
-            tk.Label(
-                tab,
-                text="No pending correction requests",
-                font=('Arial', 12),
-                bg='#f0f0f0'
-            ).pack(pady=50)
-        else:
-            # Create treeview for requests
-            columns = ('ID', 'Employee', 'Date', 'Original', 'Requested', 'Status')
-            tree = ttk.Treeview(tab, columns=columns, show='headings', height=10)
-            
-            for col in columns:
-                tree.heading(col, text=col)
-                tree.column(col, width=100)
-            
-            tree.column('Employee', width=150)
-            tree.pack(fill='both', expand=True, padx=10, pady=10)
-            
-            # Add requests
-            for request in requests:
-                tree.insert('', 'end', values=(
-                    request.get('id', ''),
-                    request.get('employee_name', ''),
-                    request.get('original_date', ''),
-                    request.get('original_status', ''),
-                    request['requested_correction'].get('status', ''),
-                    request.get('status', '')
-                ))
-            
-            # Action buttons frame
-            action_frame = tk.Frame(tab, bg='#f0f0f0')
-            action_frame.pack(pady=10)
-            
-            tk.Label(action_frame, text="Request ID:", bg='#f0f0f0').pack(side='left', padx=5)
-            request_id_entry = tk.Entry(action_frame, width=10)
-            request_id_entry.pack(side='left', padx=5)
-            
-            def approve_request():
-                try:
-                    req_id = int(request_id_entry.get())
-                    success = self.data_handler.update_correction_request(
-                        req_id, "Approved", "Admin", "Request approved"
-                    )
-                    if success:
-                        messagebox.showinfo("Success", "Request approved")
-                        self.create_correction_requests_tab(notebook)  # Refresh
-                    else:
-                        messagebox.showerror("Error", "Failed to approve request")
-                except:
-                    messagebox.showerror("Error", "Invalid request ID")
+        # Action buttons frame
+        action_frame = tk.Frame(tab, bg='#f0f0f0')
+        action_frame.pack(pady=10)
+        
+        def populate():
+            for widget in list_frame.winfo_children():
+                widget.destroy()
             
-            def reject_request():
-                try:
-                    req_id = int(request_id_entry.get())
-                    success = self.data_handler.update_correction_request(
-                        req_id, "Rejected", "Admin", "Request rejected"
-                    )
-                    if success:
-                        messagebox.showinfo("Success", "Request rejected")
-                        self.create_correction_requests_tab(notebook)  # Refresh
-                    else:
-                        messagebox.showerror("Error", "Failed to reject request")
-                except:
-                    messagebox.showerror("Error", "Invalid request ID")
+            # Get all correction requests
+            requests = self.data_handler.get_correction_requests()
             
-            tk.Button(
-                action_frame,
-                text="Approve",
-                bg='#27ae60',
-                fg='white',
-                command=approve_request
-            ).pack(side='left', padx=5)
+            if not requests:
+                tk.Label(
+                    list_frame,
+                    text="No pending correction requests",
+                    font=('Arial', 12),
+                    bg='#f0f0f0'
+                ).pack(pady=50)
+                return
             
-            tk.Button(
-                action_frame,
-                text="Reject",
-                bg='#e74c3c',
-                fg='white',
-                command=reject_request
-            ).pack(side='left', padx=5)
+            columns = ('ID', 'Employee', 'Date', 'Original', 'Requested', 'Status')
+            rows = [(
+                request.get('id', ''),
+                request.get('employee_name', ''),
+                request.get('original_date', ''),
+                request.get('original_status', ''),
+                request['requested_correction'].get('status', ''),
+                request.get('status', '')
+            ) for request in requests]
+            
+            def select_request(req_id, values):
+                request_id_entry.delete(0, 'end')
+                request_id_entry.insert(0, str(req_id))
+            
+            table = VirtualTable(
+                list_frame, columns, rows,
+                row_ids=[request.get('id') for request in requests],
+                height=10,
+                column_widths={'Employee': 150},
+                show_filter=True,
+                on_activate=select_request
+            )
+            table.pack(fill='both', expand=True, padx=10, pady=10)
+        
+        tk.Label(action_frame, text="Request ID:", bg='#f0f0f0').pack(side='left', padx=5)
+        request_id_entry = tk.Entry(action_frame, width=10)
+        request_id_entry.pack(side='left', padx=5)
+        
+        def approve_request():
+            try:
+                req_id = int(request_id_entry.get())
+                success = self.data_handler.update_correction_request(
+                    req_id, "Approved", "Admin", "Request approved"
+                )
+                if success:
+                    messagebox.showinfo("Success", "Request approved")
+                    populate()  # Refresh
+                else:
+                    messagebox.showerror("Error", "Failed to approve request")
+            except:
+                messagebox.showerror("Error", "Invalid request ID")
+        
+        def reject_request():
+            try:
+                req_id = int(request_id_entry.get())
+                success = self.data_handler.update_correction_request(
+                    req_id, "Rejected", "Admin", "Request rejected"
+                )
+                if success:
+                    messagebox.showinfo("Success", "Request rejected")
+                    populate()  # Refresh
+                else:
+                    messagebox.showerror("Error", "Failed to reject request")
+            except:
+                messagebox.showerror("Error", "Invalid request ID")
+        
+        tk.Button(
+            action_frame,
+            text="Approve",
+            bg='#27ae60',
+            fg='white',
+            command=approve_request
+        ).pack(side='left', padx=5)
+        
+        tk.Button(
+            action_frame,
+            text="Reject",
+            bg='#e74c3c',
+            fg='white',
+            command=reject_request
+        ).pack(side='left', padx=5)
+        
+        populate()
+        self.watch_data_changes(["correction_requests"], populate)
     
     def create_student_admin_tab(self, notebook):
         """Create student management tab"""
@@ -1985,41 +2072,41 @@ class AttendanceGUI:
                 bg='#f0f0f0'
             ).pack(pady=50)
         else:
-            # Create treeview (excel-like) with numbering
+            # Excel-like table with numbering; rows are rendered as they scroll into view
             columns = ('No.', 'ID', 'Name', 'Class', 'Age', 'Parent Contact', 'Health')
-            tree = ttk.Treeview(view_tab, columns=columns, show='headings', height=15)
-            
-            for col in columns:
-                tree.heading(col, text=col)
-                tree.column(col, width=110)
-            
-            tree.column('Name', width=180)
-            tree.column('Parent Contact', width=130)
-            tree.pack(fill='both', expand=True, padx=10, pady=10)
-            
-            # Insert students with numbering
-            for idx, student in enumerate(students, start=1):
-                tree.insert('', 'end', values=(
-                    idx,
-                    student.get('id', ''),
-                    student.get('name', ''),
-                    student.get('class', ''),
-                    student.get('age', ''),
-                    student.get('parent_contact', ''),
-                    student.get('health_status', '')
-                ))
+            rows = [(
+                idx,
+                student.get('id', ''),
+                student.get('name', ''),
+                student.get('class', ''),
+                student.get('age', ''),
+                student.get('parent_contact', ''),
+                student.get('health_status', '')
+            ) for idx, student in enumerate(students, start=1)]
+            table = VirtualTable(
+                view_tab, columns, rows,
+                default_width=110,
+                column_widths={'Name': 180, 'Parent Contact': 130},
+                show_filter=True
+            )
+            table.pack(fill='both', expand=True, padx=10, pady=10)
             
             # Export to Excel button
             export_frame = tk.Frame(view_tab, bg='#f0f0f0')
             export_frame.pack(pady=10)
             
-            def export_excel_all():
-                success, msg, path = self.admin_manager.export_students_to_excel(None)
+            def export_done(result):
+                success, msg, path = result
                 if success:
                     messagebox.showinfo("Exported", f"{msg}\nSaved to: {path}")
                 else:
                     messagebox.showerror("Error", msg)
             
+            def export_excel_all():
+                self.run_in_background(self.admin_manager.export_students_to_excel, None,
+                                       on_done=export_done, message="Exporting students to Excel...",
+                                       scope="global")
+            
             tk.Button(export_frame, text="Export to Excel (All)", bg='#9b59b6', fg='white', command=export_excel_all).pack(side='left', padx=10)
         
         # Add Student Tab (Admin)
@@ -2105,7 +2192,8 @@ class AttendanceGUI:
             ("📊 Attendance Report", self.generate_attendance_report),
             ("👨‍🎓 Student Report", self.generate_student_report),
             ("🏫 Class Report", self.generate_class_report),
-            ("👨‍🏫 Employee Report", self.generate_employee_report)
+            ("👨‍🏫 Employee Report", self.generate_employee_report),
+            ("💵 Payroll Export", self.generate_payroll_export)
         ]
         
         for i, (text, command) in enumerate(report_options):
@@ -2175,6 +2263,22 @@ class AttendanceGUI:
         listbox.pack(pady=5)
         for ann in ann_list:
             listbox.insert('end', f"{ann['id']}: {ann['title']} ({ann['date'][:10]}) [{ann.get('priority','')}]")
+        
+        # Expired announcements live in the dashboard archive; page through them on request
+        history_page = {"next": 1}
+        
+        def load_older():
+            history = self.data_handler.get_dashboard_history("announcements", history_page["next"], 20)
+            for ann in history["items"]:
+                listbox.insert('end', f"{ann['id']}: {ann['title']} ({ann['date'][:10]}) [archived]")
+            history_page["next"] += 1
+            if history_page["next"] * 20 - 20 >= history["total"]:
+                older_btn.config(state='disabled')
+        
+        older_btn = tk.Button(tab, text="Load Older Announcements", command=load_older, width=22)
+        older_btn.pack(pady=5)
+        if self.data_handler.dashboard_archive.count("announcements") == 0:
+            older_btn.config(state='disabled')
     
     def create_settings_tab(self, notebook):
         """Create settings tab with all system settings"""
@@ -2453,13 +2557,16 @@ class AttendanceGUI:
             justify='left'
         ).pack(anchor='w')
         
-        def create_backup():
-            success = self.data_handler.create_backup()
+        def backup_done(success):
             if success:
                 messagebox.showinfo("Success", "Backup created successfully!")
             else:
                 messagebox.showerror("Error", "Failed to create backup")
         
+        def create_backup():
+            self.run_in_background(self.data_handler.create_backup, on_done=backup_done,
+                                   message="Creating backup...", scope="global")
+        
         tk.Button(
             info_tab,
             text="Create Database Backup",
@@ -2467,7 +2574,79 @@ class AttendanceGUI:
             fg='white',
             command=create_backup,
             width=20
-        ).pack(pady=20)
+        ).pack(pady=(20, 5))
+        
+        def restore_done(success):
+            if success:
+                messagebox.showinfo("Success", "Backup restored. Reopen views to see the restored data.")
+            else:
+                messagebox.showerror("Error", "Failed to restore backup")
+        
+        def restore_backup():
+            snapshots = self.data_handler.list_backups()
+            if not snapshots:
+                messagebox.showinfo("Restore Backup", "No backups have been taken yet")
+                return
+            dialog = tk.Toplevel(self.root)
+            dialog.title("Restore Backup")
+            dialog.geometry("320x300")
+            dialog.transient(self.root)
+            dialog.grab_set()
+            tk.Label(dialog, text="Choose a backup to restore", font=('Arial', 11, 'bold')).pack(pady=10)
+            listbox = tk.Listbox(dialog, height=10)
+            for snapshot_id in snapshots:
+                listbox.insert(tk.END, snapshot_id)
+            listbox.selection_set(0)
+            listbox.pack(fill='both', expand=True, padx=10)
+            
+            def do_restore():
+                selection = listbox.curselection()
+                if not selection:
+                    return
+                snapshot_id = snapshots[selection[0]]
+                if not messagebox.askyesno("Restore Backup", f"Overwrite current data with backup {snapshot_id}?", parent=dialog):
+                    return
+                dialog.destroy()
+                self.run_in_background(self.data_handler.restore_backup, snapshot_id, on_done=restore_done,
+                                       message="Restoring backup...", scope="global")
+            
+            tk.Button(dialog, text="Restore", bg='#e74c3c', fg='white', command=do_restore).pack(pady=10)
+        
+        tk.Button(
+            info_tab,
+            text="Restore Backup",
+            bg='#7f8c8d',
+            fg='white',
+            command=restore_backup,
+            width=20
+        ).pack(pady=(5, 20))
+        
+        def rollover_done(result):
+            success, message, _ = result
+            if success:
+                messagebox.showinfo("School Year Rollover", message)
+                self.show_admin_panel()
+            else:
+                messagebox.showerror("Error", message)
+        
+        def rollover():
+            if not messagebox.askyesno(
+                "School Year Rollover",
+                f"Archive school year {school_info['year']}, promote every class and graduate the final class?\n\n"
+                "Results and attendance for the year are moved to a read-only archive. A backup is taken first."
+            ):
+                return
+            self.run_in_background(self.admin_manager.rollover_school_year, on_done=rollover_done,
+                                   message="Rolling over school year...", scope="global")
+        
+        tk.Button(
+            info_tab,
+            text="End School Year",
+            bg='#e67e22',
+            fg='white',
+            command=rollover,
+            width=20
+        ).pack(pady=(0, 20))
     
     def logout_admin(self):
         """Logout admin and return to login screen"""
@@ -2498,14 +2677,7 @@ class AttendanceGUI:
         else:
             # Create attendance table
             columns = ('Student ID', 'Name', 'Present', 'Absent', 'Late', 'Attendance %')
-            tree = ttk.Treeview(self.content_frame, columns=columns, show='headings', height=15)
-            
-            for col in columns:
-                tree.heading(col, text=col)
-                tree.column(col, width=100)
-            
-            tree.column('Name', width=150)
-            tree.pack(fill='both', expand=True, padx=20, pady=20)
+            rows = []
             
             # Calculate attendance for each student
             for student in students:
@@ -2520,7 +2692,7 @@ class AttendanceGUI:
                 else:
                     percentage = 0
                 
-                tree.insert('', 'end', values=(
+                rows.append((
                     student['id'],
                     student['name'],
                     present,
@@ -2529,6 +2701,9 @@ class AttendanceGUI:
                     f"{percentage:.1f}%"
                 ))
             
+            table = VirtualTable(self.content_frame, columns, rows, column_widths={'Name': 150})
+            table.pack(fill='both', expand=True, padx=20, pady=20)
+            
             # Record attendance for today
             tk.Label(
                 self.content_frame,
@@ -2607,41 +2782,15 @@ class AttendanceGUI:
             bg='#f0f0f0'
         ).pack(pady=(20, 10))
         
-        # Get all students in this grade
-        students = self.data_handler.get_students_by_class(self.current_grade)
+        loading = self.show_loading(text="Loading results...")
         
-        if not students:
-            tk.Label(
-                self.content_frame,
-                text="No students in this grade",
-                font=('Arial', 14),
-                bg='#f0f0f0'
-            ).pack(pady=20)
-        else:
-            # Create notebook for different terms
-            notebook = ttk.Notebook(self.content_frame)
-            notebook.pack(fill='both', expand=True, padx=10, pady=10)
-            
-            # Get available terms
+        def load_results(grade):
+            students = self.data_handler.get_students_by_class(grade)
             terms = self.data_handler.get_available_terms()
-            
+            subjects = self.data_handler.get_available_subjects()
+            term_rows = {}
             for term in terms:
-                term_tab = tk.Frame(notebook, bg='#f0f0f0')
-                notebook.add(term_tab, text=term)
-                
-                # Get subjects for this term
-                subjects = self.data_handler.get_available_subjects()
-                
-                # Create results table
-                columns = ['Student'] + subjects + ['Average']
-                tree = ttk.Treeview(term_tab, columns=columns, show='headings', height=15)
-                
-                for col in columns:
-                    tree.heading(col, text=col)
-                    tree.column(col, width=80)
-                
-                tree.column('Student', width=150)
-                tree.pack(fill='both', expand=True, padx=10, pady=10)
+                rows = []
                 
                 # Add student results
                 for student in students:
@@ -2666,7 +2815,43 @@ class AttendanceGUI:
                     else:
                         row_data.append('')
                     
-                    tree.insert('', 'end', values=row_data)
+                    # Class position on the term total
+                    position = self.data_handler.rankings.position(student['id'], term)
+                    row_data.append(position['rank'] if position else '')
+                    
+                    rows.append(row_data)
+                term_rows[term] = rows
+            return students, terms, subjects, term_rows
+        
+        def on_loaded(data):
+            loading.destroy()
+            self.build_grade_results(*data)
+        
+        self.run_in_background(load_results, self.current_grade, on_done=on_loaded,
+                               message=f"Loading Grade {self.current_grade} results...")
+    
+    def build_grade_results(self, students, terms, subjects, term_rows):
+        """Build the results screen from data loaded by show_grade_results"""
+        if not students:
+            tk.Label(
+                self.content_frame,
+                text="No students in this grade",
+                font=('Arial', 14),
+                bg='#f0f0f0'
+            ).pack(pady=20)
+        else:
+            # Create notebook for different terms
+            notebook = ttk.Notebook(self.content_frame)
+            notebook.pack(fill='both', expand=True, padx=10, pady=10)
+            
+            for term in terms:
+                term_tab = tk.Frame(notebook, bg='#f0f0f0')
+                notebook.add(term_tab, text=term)
+                
+                # Create results table
+                columns = ['Student'] + subjects + ['Average', 'Position']
+                table = VirtualTable(term_tab, columns, term_rows[term], default_width=80, column_widths={'Student': 150})
+                table.pack(fill='both', expand=True, padx=10, pady=10)
             
             # Add/edit results frame
             edit_frame = tk.Frame(self.content_frame, bg='#f0f0f0')
@@ -2699,7 +2884,7 @@ class AttendanceGUI:
             result_subject_combo = ttk.Combobox(
                 edit_frame,
                 textvariable=result_subject_var,
-                values=self.data_handler.get_available_subjects(),
+                values=subjects,
                 width=15
             )
             result_subject_combo.grid(row=2, column=1, padx=5, pady=5)
@@ -2779,6 +2964,69 @@ class AttendanceGUI:
                 command=self.show_employee_dashboard
             ).pack(side='left', padx=5)
     
+    def show_class_analytics(self):
+        """Show class-wide academic statistics for the current grade"""
+        self.clear_content_frame()
+        
+        tk.Label(
+            self.content_frame,
+            text=f"Grade {self.current_grade} Class Analytics",
+            font=('Arial', 20, 'bold'),
+            bg='#f0f0f0'
+        ).pack(pady=(20, 10))
+        
+        body = tk.Frame(self.content_frame, bg='#f0f0f0')
+        body.pack(fill='both', expand=True)
+        loading = self.show_loading(body, "Computing class statistics...")
+        
+        tk.Button(
+            self.content_frame,
+            text="Back to Grade Management",
+            command=lambda: self.show_grade_management(self.current_grade)
+        ).pack(pady=20)
+        
+        fmt = lambda v: "" if v is None else f"{v:.1f}"
+        
+        def show_summary(summary):
+            loading.destroy()
+            if not summary["terms"]:
+                tk.Label(body, text="No academic results recorded for this grade", font=('Arial', 14), bg='#f0f0f0').pack(pady=20)
+                return
+            
+            notebook = ttk.Notebook(body)
+            notebook.pack(fill='both', expand=True, padx=10, pady=10)
+            columns = ('Subject', 'Count', 'Mean', 'Median', 'Std Dev', 'P25', 'P75', 'P90', 'A', 'B', 'C', 'D', 'F')
+            for term, stats in summary["terms"].items():
+                tab = tk.Frame(notebook, bg='#f0f0f0')
+                notebook.add(tab, text=term)
+                grades = "   ".join(f"{g}: {n}" for g, n in stats['grade_distribution'].items())
+                tk.Label(
+                    tab,
+                    text=f"Class average {fmt(stats['mean'])}  |  median {fmt(stats['median'])}  |  "
+                         f"std dev {fmt(stats['std'])}  |  range {fmt(stats['min'])}-{fmt(stats['max'])}\n"
+                         f"Grade distribution: {grades}",
+                    font=('Arial', 11),
+                    bg='#f0f0f0',
+                    justify='left'
+                ).pack(anchor='w', padx=10, pady=10)
+                rows = [(
+                    subject, sub['count'], fmt(sub['mean']), fmt(sub['median']), fmt(sub['std']),
+                    fmt(sub['p25']), fmt(sub['p75']), fmt(sub['p90']),
+                    *sub['grade_distribution'].values()
+                ) for subject, sub in stats['subjects'].items()]
+                table = VirtualTable(tab, columns, rows, height=10, default_width=60, column_widths={'Subject': 150})
+                table.pack(fill='both', expand=True, padx=10, pady=10)
+            
+            if summary["term_deltas"]:
+                changes = []
+                for delta in summary["term_deltas"]:
+                    change = delta['mean_change']
+                    changes.append(f"{delta['from']} → {delta['to']}: {'n/a' if change is None else f'{change:+.1f}'}")
+                tk.Label(body, text="Term-over-term change: " + "   ".join(changes), font=('Arial', 11), bg='#f0f0f0').pack(pady=5)
+        
+        self.run_in_background(self.report_generator.analytics.class_summary, self.current_grade,
+                               on_done=show_summary, message="Computing class statistics...")
+    
     def show_health_records(self):
         """Show health records for the current grade"""
         self.clear_content_frame()
@@ -2803,15 +3051,7 @@ class AttendanceGUI:
         else:
             # Create health records table
             columns = ('Student ID', 'Name', 'Health Status', 'Allergies', 'Emergency Contact')
-            tree = ttk.Treeview(self.content_frame, columns=columns, show='headings', height=15)
-            
-            for col in columns:
-                tree.heading(col, text=col)
-                tree.column(col, width=120)
-            
-            tree.column('Name', width=150)
-            tree.column('Allergies', width=200)
-            tree.pack(fill='both', expand=True, padx=20, pady=20)
+            rows = []
             
             # Add student health records
             for student in students:
@@ -2819,13 +3059,21 @@ class AttendanceGUI:
                 if not allergies:
                     allergies = 'None'
                 
-                tree.insert('', 'end', values=(
+                rows.append((
                     student['id'],
                     student['name'],
                     student.get('health_status', 'Unknown'),
                     allergies,
                     student.get('emergency_contact', 'N/A')
                 ))
+            
+            table = VirtualTable(
+                self.content_frame, columns, rows,
+                default_width=120,
+                column_widths={'Name': 150, 'Allergies': 200},
+                show_filter=True
+            )
+            table.pack(fill='both', expand=True, padx=20, pady=20)
         
         tk.Button(
             self.content_frame,
@@ -2866,7 +3114,47 @@ class AttendanceGUI:
             )
             
             canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-            canvas.configure(yscrollcommand=scrollbar.set)
+            
+            # Photos load lazily: only cells scrolled into view get a thumbnail
+            pending = []  # (cell frame, label, photo path, student name)
+            thumb_size = (100, 100)
+            
+            def set_photo(label, path, name):
+                photo = self.thumbnails.photo_image(path, thumb_size)
+                if photo:
+                    label.config(image=photo, text=name, compound='top')
+                    label.image = photo
+                else:
+                    label.config(text=f"{name}\n(No photo)")
+            
+            def load_visible():
+                if not canvas.winfo_exists():
+                    return
+                top = canvas.canvasy(0) - 150
+                bottom = canvas.canvasy(0) + canvas.winfo_height() + 150
+                for item in list(pending):
+                    cell, label, path, name = item
+                    y = cell.winfo_y()
+                    if y + cell.winfo_height() < top or y > bottom:
+                        continue
+                    pending.remove(item)
+                    if self.thumbnails.cached_photo(path, thumb_size):
+                        set_photo(label, path, name)
+                    else:
+                        # Build the thumbnail file off the Tk thread, then wrap it in a PhotoImage
+                        self.run_in_background(
+                            self.thumbnails.thumbnail_file, path, thumb_size,
+                            on_done=lambda _, l=label, p=path, n=name: l.winfo_exists() and set_photo(l, p, n),
+                            message="Loading photos..."
+                        )
+            
+            def on_scroll(first, last):
+                scrollbar.set(first, last)
+                if pending:
+                    canvas.after_idle(load_visible)
+            
+            canvas.configure(yscrollcommand=on_scroll)
+            canvas.bind("<Configure>", lambda e: canvas.after_idle(load_visible))
             
             # Display student photos in a grid
             for i, student in enumerate(students):
@@ -2876,19 +3164,13 @@ class AttendanceGUI:
                 frame = tk.Frame(scrollable_frame, bg='white', relief='solid', borderwidth=1)
                 frame.grid(row=row, column=col, padx=10, pady=10)
                 
-                # Student photo
-                photo_path = self.data_handler.get_student_photo(student['id'])
+                # Student photo (filled in by load_visible once the cell is on screen)
+                photo_path = self.data_handler.student_photo_path(student)
                 photo_label = tk.Label(frame, text=student['name'], bg='white', font=('Arial', 9))
                 
-                if photo_path and os.path.exists(photo_path):
-                    try:
-                        img = Image.open(photo_path)
-                        img.thumbnail((100, 100))
-                        photo = ImageTk.PhotoImage(img)
-                        photo_label.config(image=photo, compound='top')
-                        photo_label.image = photo
-                    except:
-                        photo_label.config(text=f"{student['name']}\n(No photo)")
+                if photo_path:
+                    photo_label.config(text=f"{student['name']}\n(loading...)")
+                    pending.append((frame, photo_label, photo_path, student['name']))
                 else:
                     photo_label.config(text=f"{student['name']}\n(No photo)")
                 
@@ -3160,11 +3442,12 @@ class AttendanceGUI:
         
         start_date, end_date = date_range
         
-        # Generate report
-        summary = self.report_generator.print_summary_report(start_date, end_date)
-        
-        # Show report
-        self.show_report_dialog("Attendance Report", summary)
+        # Generate report off the Tk thread, then show it
+        self.run_in_background(
+            self.report_generator.print_summary_report, start_date, end_date,
+            on_done=lambda summary: self.show_report_dialog("Attendance Report", summary),
+            message="Generating attendance report...", scope="global"
+        )
     
     def generate_student_report(self):
         """Generate student report"""
@@ -3190,12 +3473,11 @@ class AttendanceGUI:
             return
         
         # Generate report
-        filepath, message = self.report_generator.generate_student_report(student_id)
-        
-        if filepath:
-            messagebox.showinfo("Success", f"{message}\n\nReport saved to:\n{filepath}")
-        else:
-            messagebox.showerror("Error", message)
+        self.run_in_background(
+            self.report_generator.generate_student_report, student_id,
+            on_done=self.show_report_saved,
+            message="Generating student report...", scope="global"
+        )
     
     def generate_class_report(self):
         """Generate class report"""
@@ -3215,12 +3497,11 @@ class AttendanceGUI:
             return
         
         # Generate report
-        filepath, message = self.report_generator.generate_class_report(class_selection)
-        
-        if filepath:
-            messagebox.showinfo("Success", f"{message}\n\nReport saved to:\n{filepath}")
-        else:
-            messagebox.showerror("Error", message)
+        self.run_in_background(
+            self.report_generator.generate_class_report, class_selection,
+            on_done=self.show_report_saved,
+            message=f"Generating {class_selection} report...", scope="global"
+        )
     
     def generate_employee_report(self):
         """Generate employee report (with period specification)"""
@@ -3252,8 +3533,32 @@ class AttendanceGUI:
         start_date, end_date = date_range
         
         # Generate report via ReportGenerator
-        filepath, message = self.report_generator.generate_employee_report(employee_id, start_date, end_date)
+        self.run_in_background(
+            self.report_generator.generate_employee_report, employee_id, start_date, end_date,
+            on_done=self.show_report_saved,
+            message="Generating employee report...", scope="global"
+        )
+    
+    def generate_payroll_export(self):
+        """Export hours and overtime pay for all employees over a period to CSV"""
+        date_range = self.get_date_range_dialog("Payroll Export")
+        if not date_range:
+            return
+        start_date, end_date = date_range
         
+        def export_done(result):
+            success, message, path = result
+            if success:
+                messagebox.showinfo("Exported", f"{message}\n\nSaved to:\n{path}")
+            else:
+                messagebox.showerror("Error", message)
+        
+        self.run_in_background(self.admin_manager.export_payroll_csv, start_date, end_date,
+                               on_done=export_done, message="Running payroll...", scope="global")
+    
+    def show_report_saved(self, result):
+        """Completion callback for report jobs returning (filepath, message)"""
+        filepath, message = result
         if filepath:
             messagebox.showinfo("Success", f"{message}\n\nReport saved to:\n{filepath}")
         else:
@@ -0,0 +1,105 @@
+# id_sequences.py - persisted, monotonic id allocators, one per collection
+# data/sequences.json holds the last id handed out per collection ({"employees": 41,
+# ...}). reserve() bumps it under a thread lock and a cross-process lock on
+# data/.sequences.lock, so two threads or processes never get the same id, and an
+# insert no longer scans the collection for max(id). A bulk import reserves a block
+# of consecutive ids in one step. A collection without an entry is seeded once from
+# its seed function (the highest id already in its files), so existing data keeps
+# its ids. Ids are never reused, even after a delete or a failed save.
+import os
+import time
+import threading
+
+import json_codec
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:  # Windows: fall back to an O_EXCL lock file
+    FCNTL_AVAILABLE = False
+
+STALE_LOCK_SECONDS = 30  # an O_EXCL lock file older than this was left by a crashed process
+
+
+class _FileLock:
+    """Blocking cross-process lock (flock where available)"""
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    def __enter__(self):
+        if FCNTL_AVAILABLE:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            return self
+        while True:
+            try:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o644)
+                return self
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.path) > STALE_LOCK_SECONDS:
+                        os.remove(self.path)
+                except OSError:
+                    pass
+                time.sleep(0.01)
+
+    def __exit__(self, *exc):
+        if FCNTL_AVAILABLE:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+        else:
+            os.close(self._fd)
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+        self._fd = None
+
+
+class IdSequences:
+    def __init__(self, path, seeds=None):
+        self.path = path
+        self.seeds = dict(seeds or {})  # collection -> callable returning the highest id in use
+        self._lock = threading.Lock()
+        self._file_lock = _FileLock(os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.lock"))
+
+    def _load(self):
+        try:
+            return json_codec.load(self.path)
+        except (FileNotFoundError, *json_codec.DECODE_ERRORS):
+            return {}
+
+    def _last(self, state, name):
+        if name in state:
+            return state[name]
+        seed = self.seeds.get(name)
+        return int(seed() or 0) if seed else 0
+
+    def reserve(self, name, count=1):
+        """Allocate count consecutive ids for a collection; returns the first"""
+        if count < 1:
+            raise ValueError("count must be at least 1")
+        with self._lock, self._file_lock:
+            state = self._load()
+            first = self._last(state, name) + 1
+            state[name] = first + count - 1
+            json_codec.dump_atomic(self.path, state)
+            return first
+
+    def next_id(self, name):
+        return self.reserve(name, 1)
+
+    def advance(self, name, used_id):
+        """Never hand out ids up to used_id (for rows written with ids of their own, e.g.
+        a restore or a migration)"""
+        with self._lock, self._file_lock:
+            state = self._load()
+            last = self._last(state, name)
+            if used_id > last or name not in state:
+                state[name] = max(used_id, last)
+                json_codec.dump_atomic(self.path, state)
+
+    def last(self, name):
+        """Last id handed out (or seeded) for a collection, without allocating"""
+        return self._last(self._load(), name)
@@ -0,0 +1,110 @@
+# json_codec.py - one JSON encoder/decoder for data files and API responses
+# Uses the fastest library available: orjson, then msgspec, then the stdlib json
+# module. dumps() always returns UTF-8 bytes and loads() takes bytes or str, so
+# callers don't care which backend is active. Raw wraps already-encoded JSON (a
+# cached shard encoding, say) so a response can embed it without a decode/encode
+# round trip.
+#
+#   python benchmarks/json_codec.py   # parse/serialize timings for each backend
+import os
+import json
+import uuid
+from functools import lru_cache
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgspec
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    MSGSPEC_AVAILABLE = False
+
+BACKENDS = tuple(name for name, available in (("orjson", ORJSON_AVAILABLE), ("msgspec", MSGSPEC_AVAILABLE), ("json", True)) if available)
+BACKEND = BACKENDS[0]
+
+# Everything loads() can raise for malformed input (orjson's error is a ValueError)
+DECODE_ERRORS = (ValueError, msgspec.DecodeError) if MSGSPEC_AVAILABLE else (ValueError,)
+
+
+class Raw:
+    """Already-encoded JSON that dumps() embeds verbatim as a top-level dict value"""
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = data if isinstance(data, bytes) else data.encode("utf-8")
+
+
+@lru_cache(maxsize=None)
+def _encoder(backend, indent, default):
+    if backend == "orjson":
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return lambda obj: orjson.dumps(obj, default=default, option=option)
+    if backend == "msgspec":
+        encoder = msgspec.json.Encoder(enc_hook=default)
+        if indent:
+            return lambda obj: msgspec.json.format(encoder.encode(obj), indent=2)
+        return encoder.encode
+    if indent:
+        return lambda obj: json.dumps(obj, indent=2, default=default).encode("utf-8")
+    return lambda obj: json.dumps(obj, separators=(",", ":"), default=default).encode("utf-8")
+
+
+def _decoder(backend):
+    if backend == "orjson":
+        return orjson.loads
+    if backend == "msgspec":
+        return msgspec.json.Decoder().decode
+    return json.loads
+
+
+_loads = _decoder(BACKEND)
+
+
+def dumps(obj, indent=False, default=None, backend=None):
+    """Encode to UTF-8 bytes (indent=True: 2-space indentation, as the data files use)"""
+    encode = _encoder(backend or BACKEND, indent, default)
+    if not isinstance(obj, dict) or not any(isinstance(v, Raw) for v in obj.values()):
+        return encode(obj)
+    # Encode placeholders, then splice the raw bytes in
+    token = uuid.uuid4().hex
+    raws = {}
+    shell = {}
+    for key, value in obj.items():
+        if isinstance(value, Raw):
+            placeholder = f"__raw_{token}_{len(raws)}__"
+            raws[f'"{placeholder}"'.encode("ascii")] = value.data
+            value = placeholder
+        shell[key] = value
+    encoded = encode(shell)
+    for placeholder, data in raws.items():
+        encoded = encoded.replace(placeholder, data, 1)
+    return encoded
+
+
+def loads(data, backend=None):
+    return (_decoder(backend) if backend else _loads)(data)
+
+
+def load(path):
+    """Decode a JSON file (raises FileNotFoundError / DECODE_ERRORS)"""
+    with open(path, "rb") as f:
+        return _loads(f.read())
+
+
+def dump_atomic(path, obj, indent=True):
+    """Write obj to path via a dot-prefixed temp file and os.replace"""
+    directory = os.path.dirname(path)
+    tmp = os.path.join(directory, f".{os.path.basename(path)}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(dumps(obj, indent=indent))
+    os.replace(tmp, path)
+
+
+def join_arrays(encoded_arrays):
+    """Concatenate encoded JSON arrays (e.g. per-shard caches) into one array"""
+    parts = [a.strip()[1:-1].strip() for a in encoded_arrays]
+    return b"[" + b",".join(p for p in parts if p) + b"]"
@@ -9,6 +9,7 @@ from werkzeug.serving import make_server
 
 # Import the factory that creates the Flask app (we import this at module level)
 from api_server import create_app
+from maintenance import create_scheduler
 
 def run_flask_in_thread(app, host='127.0.0.1', port=5000):
     server = make_server(host, port, app, threaded=True)
@@ -22,12 +23,6 @@ def main():
         print("School Management System - Starting...")
         print("=" * 50)
 
-        # Create Flask app and run it in background
-        app = create_app(static_folder=".", static_index="INDEX.HTML")
-        print("Starting local API server at http://127.0.0.1:5000 ...")
-        server, server_thread = run_flask_in_thread(app, '127.0.0.1', 5000)
-        time.sleep(0.2)  # small delay to allow server to bind
-
         # Import backend modules here so we get their import-time errors inside try/except
         try:
             from data_handler import DataHandler
@@ -43,6 +38,18 @@ def main():
 
         # Initialize backend modules for GUI (they will use same JSON files)
         data_handler = DataHandler()
+
+        # Create Flask app sharing the GUI's DataHandler (so both see the same change events)
+        # and run it in background
+        app = create_app(data_handler=data_handler, static_folder=".", static_index="INDEX.HTML")
+        print("Starting local API server at http://127.0.0.1:5000 ...")
+        server, server_thread = run_flask_in_thread(app, '127.0.0.1', 5000)
+        time.sleep(0.2)  # small delay to allow server to bind
+
+        # Backups, compaction and cleanup on a low-priority background thread
+        scheduler = create_scheduler(data_handler)
+        scheduler.start()
+
         report_generator = ReportGenerator(data_handler)
         student_manager = StudentManager(data_handler)
         admin_manager = AdminManager(data_handler, student_manager)
@@ -63,6 +70,8 @@ def main():
         # webbrowser.open("http://127.0.0.1:5000/sis?role=admin")
 
         root.mainloop()
+        scheduler.stop()
+        app_gui.tasks.shutdown()
 
     except Exception as e:
         print(f"\n❌ CRITICAL ERROR: {e}")
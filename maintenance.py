@@ -0,0 +1,301 @@
+# maintenance.py - in-process scheduler for periodic housekeeping
+# One low-priority daemon thread runs the jobs below one at a time: auto-backup,
+# attendance compaction (sealing closed months, moving stray database.json rows),
+# index refresh, cache eviction, dashboard retention, schema validation and
+# stale-report cleanup. Next-run times get random jitter so processes started
+# together don't fire together, a lock file per job stops
+# two processes (e.g. the GUI and a headless API server) from overlapping, and nothing
+# starts inside the quiet hours (morning check-in by default) or so close to them that
+# the job's recorded duration would run into them. Run history lives in
+# data/.maintenance.json (a dot-file, so backups and change events ignore it).
+import os
+import json
+import time
+import random
+import threading
+import traceback
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:  # Windows: fall back to O_EXCL lock files
+    FCNTL_AVAILABLE = False
+
+from thumbnail_cache import ThumbnailCache
+
+STATE_FILE = ".maintenance.json"
+REPORTS_DIR = "reports"
+DEFAULT_QUIET_HOURS = [["06:30", "09:30"]]
+HISTORY_SIZE = 20
+STALE_LOCK_SECONDS = 6 * 3600
+STARTUP_DELAY = (60, 300)  # seconds before a never-run job first runs
+
+
+class Job:
+    def __init__(self, name, func, interval, jitter=0.1, enabled=None):
+        self.name = name
+        self.func = func
+        self.interval = interval        # seconds
+        self.jitter = jitter            # +/- fraction of interval
+        self.enabled = enabled or (lambda: True)
+        self.next_run = None
+
+    def schedule_after(self, last_run):
+        spread = self.interval * self.jitter
+        return last_run + self.interval + random.uniform(-spread, spread)
+
+
+class JobLock:
+    """Cross-process, non-blocking lock on data/.maintenance-<job>.lock"""
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    def acquire(self):
+        if FCNTL_AVAILABLE:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+            self._fd = fd
+            return True
+        try:
+            if time.time() - os.path.getmtime(self.path) > STALE_LOCK_SECONDS:
+                os.remove(self.path)  # left behind by a crashed process
+        except OSError:
+            pass
+        try:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o644)
+            return True
+        except FileExistsError:
+            return False
+
+    def release(self):
+        if self._fd is None:
+            return
+        if FCNTL_AVAILABLE:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+        else:
+            os.close(self._fd)
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+        self._fd = None
+
+
+def _minutes(hhmm):
+    hours, minutes = hhmm.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+class MaintenanceScheduler:
+    def __init__(self, data_handler, tick=30, nice=10):
+        self.data_handler = data_handler
+        self.tick = tick
+        self.nice = nice
+        self.state_file = os.path.join(data_handler.data_dir, STATE_FILE)
+        self.jobs = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self._state_lock = threading.Lock()
+
+    def add_job(self, job):
+        self.jobs[job.name] = job
+        return job
+
+    # Run history
+    def load_state(self):
+        try:
+            with open(self.state_file, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"jobs": {}}
+
+    def _record_run(self, name, started, duration, status, result=None, error=None):
+        with self._state_lock:
+            state = self.load_state()
+            entry = state.setdefault("jobs", {}).setdefault(name, {"history": []})
+            entry.update(last_run=started.isoformat(), last_duration=round(duration, 3), last_status=status)
+            if error:
+                entry["last_error"] = error
+            else:
+                entry.pop("last_error", None)
+            if result is not None:
+                entry["last_result"] = result
+            entry["history"] = (entry.get("history", []) + [round(duration, 3)])[-HISTORY_SIZE:]
+            tmp = os.path.join(os.path.dirname(self.state_file), f"{STATE_FILE}.tmp")
+            with open(tmp, "w") as f:
+                json.dump(state, f, indent=2)
+            os.replace(tmp, self.state_file)
+
+    def expected_duration(self, name):
+        history = self.load_state().get("jobs", {}).get(name, {}).get("history", [])
+        return max(history) if history else 0.0
+
+    # Quiet hours
+    def quiet_hours(self):
+        settings = self.data_handler.load_json(self.data_handler.settings_file)
+        return settings.get("maintenance_quiet_hours", DEFAULT_QUIET_HOURS)
+
+    def quiet_until(self, now, duration=0.0):
+        """End of the quiet window that now..now+duration overlaps, or None if clear"""
+        start = now.hour * 60 + now.minute + now.second / 60
+        end = start + duration / 60
+        for window in self.quiet_hours():
+            try:
+                q_start, q_end = _minutes(window[0]), _minutes(window[1])
+            except (ValueError, IndexError, AttributeError):
+                continue
+            for day_offset in (-1440, 0, 1440):  # yesterday's, today's and tomorrow's window
+                lo, hi = q_start + day_offset, q_end + day_offset
+                if hi <= lo:
+                    hi += 1440  # window spans midnight
+                if start < hi and end > lo:
+                    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+                    return midnight + timedelta(minutes=hi)
+        return None
+
+    # Running
+    def run_job(self, name):
+        """Run one job now (if its lock is free); returns (status, result)"""
+        job = self.jobs[name]
+        lock = JobLock(os.path.join(self.data_handler.data_dir, f".maintenance-{name}.lock"))
+        if not lock.acquire():
+            return "skipped", "already running in another process"
+        started = datetime.now()
+        t0 = time.monotonic()
+        try:
+            result = job.func()
+            status, error = "ok", None
+        except Exception as e:
+            result, status, error = None, "error", f"{type(e).__name__}: {e}"
+            traceback.print_exc()
+        finally:
+            lock.release()
+        duration = time.monotonic() - t0
+        self._record_run(name, started, duration, status, result, error)
+        return status, result if status == "ok" else error
+
+    def _initial_schedule(self):
+        state = self.load_state().get("jobs", {})
+        now = time.time()
+        for name, job in self.jobs.items():
+            last = state.get(name, {}).get("last_run")
+            if last:
+                try:
+                    job.next_run = max(job.schedule_after(datetime.fromisoformat(last).timestamp()),
+                                       now + random.uniform(*STARTUP_DELAY))
+                    continue
+                except ValueError:
+                    pass
+            job.next_run = now + random.uniform(*STARTUP_DELAY)
+
+    def _lower_priority(self):
+        try:
+            # Linux applies this to the calling thread only
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), self.nice)
+        except (AttributeError, OSError):
+            pass
+
+    def _loop(self):
+        self._lower_priority()
+        self._initial_schedule()
+        while not self._stop.wait(self.tick):
+            for name, job in sorted(self.jobs.items(), key=lambda item: item[1].next_run):
+                if self._stop.is_set() or time.time() < job.next_run:
+                    continue
+                try:
+                    if not job.enabled():
+                        job.next_run = job.schedule_after(time.time())
+                        continue
+                    resume = self.quiet_until(datetime.now(), self.expected_duration(name))
+                except Exception:
+                    traceback.print_exc()
+                    resume = None
+                if resume is not None:
+                    job.next_run = resume.timestamp() + random.uniform(0, job.interval * job.jitter)
+                    continue
+                self.run_job(name)
+                job.next_run = job.schedule_after(time.time())
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="maintenance", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+# Jobs
+def clean_reports(reports_dir, max_age_days):
+    """Delete generated reports older than max_age_days; returns how many"""
+    if not os.path.isdir(reports_dir):
+        return 0
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    for entry in os.scandir(reports_dir):
+        if entry.is_file() and entry.stat().st_mtime < cutoff:
+            try:
+                os.remove(entry.path)
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+def create_scheduler(data_handler, reports_dir=REPORTS_DIR, **kwargs):
+    """Scheduler with the standard jobs; intervals/limits come from settings.json"""
+    scheduler = MaintenanceScheduler(data_handler, **kwargs)
+    thumbnails = ThumbnailCache(data_handler.photos_dir)
+
+    def settings():
+        return data_handler.load_json(data_handler.settings_file)
+
+    def backup():
+        if not data_handler.create_backup():
+            raise RuntimeError("create_backup failed")
+        return {"snapshots": len(data_handler.list_backups())}
+
+    def compact_attendance():
+        moved = data_handler.migrate_attendance_segments()
+        sealed = data_handler.attendance.seal_closed_months()
+        return {"rows_moved": moved, "months_sealed": sealed}
+
+    def refresh_indexes():
+        data_handler.rankings.refresh()
+        return {}
+
+    def evict_caches():
+        return {"attendance_months": data_handler.attendance.evict_cache(),
+                "attendance_files": data_handler.attendance.collect_replaced(),
+                "archives": data_handler.archives.clear_cache(),
+                "thumbnails": thumbnails.prune_orphans()}
+
+    def validate_data():
+        report = data_handler.validate_data()
+        return {"checked": report["checked"], "invalid": len(report["errors"])}
+
+    def archive_dashboard():
+        return {"moved": data_handler.archive_dashboard()}
+
+    def reports():
+        return {"removed": clean_reports(reports_dir, settings().get("report_retention_days", 30))}
+
+    backup_hours = settings().get("backup_interval_hours", 24)
+    scheduler.add_job(Job("auto_backup", backup, backup_hours * 3600,
+                          enabled=lambda: settings().get("auto_backup", True)))
+    scheduler.add_job(Job("compact_attendance", compact_attendance, 6 * 3600))
+    scheduler.add_job(Job("refresh_indexes", refresh_indexes, 6 * 3600))
+    scheduler.add_job(Job("evict_caches", evict_caches, 3600, jitter=0.25))
+    scheduler.add_job(Job("archive_dashboard", archive_dashboard, 24 * 3600))
+    scheduler.add_job(Job("validate_data", validate_data, 24 * 3600))
+    scheduler.add_job(Job("clean_reports", reports, 24 * 3600))
+    return scheduler
@@ -0,0 +1,90 @@
+# month_bitmap.py - compact storage for students' monthly_attendance
+# A month is stored as a single int: bit (day - 1) is set when the student was
+# present that day, e.g. {"2024-03": 5} means present on March 1st and 3rd. The
+# month length comes from the key, so counts are a popcount and nothing else needs
+# storing. The legacy format ({"present_dates": [...], "summary": {...}}) is still
+# read, and migrate_student() converts it in place.
+import calendar
+from datetime import date
+
+
+def popcount(mask):
+    try:
+        return mask.bit_count()
+    except AttributeError:  # Python < 3.10
+        return bin(mask).count("1")
+
+
+def month_days(month_key):
+    """Number of days in a 'YYYY-MM' month (ValueError for malformed keys)"""
+    year, month = [int(x) for x in month_key.split("-")]
+    return calendar.monthrange(year, month)[1]
+
+
+def days_to_mask(month_key, present_dates):
+    """Mask from ISO dates, 'DD' strings or day numbers; out-of-range days are ignored"""
+    num_days = month_days(month_key)
+    mask = 0
+    for d in present_dates:
+        try:
+            day = d if isinstance(d, int) else int(str(d).split("-")[-1])
+        except ValueError:
+            continue
+        if 1 <= day <= num_days:
+            mask |= 1 << (day - 1)
+    return mask
+
+
+def mask_days(mask):
+    """Day numbers (1-based) set in mask"""
+    days = []
+    day = 1
+    while mask:
+        if mask & 1:
+            days.append(day)
+        mask >>= 1
+        day += 1
+    return days
+
+
+def mask_to_dates(month_key, mask):
+    year, month = [int(x) for x in month_key.split("-")]
+    return [date(year, month, day).isoformat() for day in mask_days(mask)]
+
+
+def entry_mask(month_key, entry):
+    """Mask for a stored month entry in either format"""
+    if isinstance(entry, int):
+        return entry
+    if isinstance(entry, dict):
+        return days_to_mask(month_key, entry.get("present_dates", []))
+    return 0
+
+
+def summary(month_key, mask):
+    num_days = month_days(month_key)
+    present = popcount(mask)
+    return {"present": present, "absent": num_days - present, "month_days": num_days}
+
+
+def expand(month_key, entry):
+    """Stored entry -> the {"present_dates", "summary"} shape callers have always received"""
+    mask = entry_mask(month_key, entry)
+    return {"present_dates": mask_to_dates(month_key, mask), "summary": summary(month_key, mask)}
+
+
+def migrate_student(student):
+    """Convert a student's legacy month entries to masks in place; returns True if changed"""
+    months = student.get("monthly_attendance")
+    if not isinstance(months, dict):
+        return False
+    changed = False
+    for month_key, entry in list(months.items()):
+        if isinstance(entry, int):
+            continue
+        try:
+            months[month_key] = entry_mask(month_key, entry)
+        except ValueError:
+            continue  # malformed month key; leave as-is
+        changed = True
+    return changed
@@ -0,0 +1,120 @@
+# payroll.py - worked/overtime hours and overtime pay for every employee in one pass
+# The period's attendance is gathered once into flat arrays (employee index, worked
+# seconds). Rows carry a stored worked_seconds (see attendance_time); any that don't
+# have their times parsed as a byte matrix rather than with strptime per row.
+# Per-employee totals are np.bincount reductions. Semantics match
+# the original per-employee DataHandler.calculate_overtime: a shift is
+# (check_out - check_in) wrapped to 0-24h, overtime is the part of each day beyond the
+# employee's daily hours, and overtime pay is overtime hours x overtime_rate.
+from datetime import datetime
+import numpy as np
+
+CSV_COLUMNS = ("employee_id", "name", "department", "days_worked", "daily_hours",
+               "total_hours", "regular_hours", "overtime_hours", "overtime_pay")
+
+
+def parse_times(values):
+    """'HH:MM:SS' strings -> float seconds-of-day array (NaN where malformed)"""
+    if not values:
+        return np.empty(0)
+    raw = np.array([v if isinstance(v, str) and len(v) == 8 and v.isascii() else "" for v in values], dtype="S8")
+    chars = raw.view(np.uint8).reshape(len(values), 8).astype(np.int64)
+    digits = chars - ord("0")
+    digit_cols = [0, 1, 3, 4, 6, 7]
+    valid = ((chars[:, 2] == ord(":")) & (chars[:, 5] == ord(":"))
+             & np.all((digits[:, digit_cols] >= 0) & (digits[:, digit_cols] <= 9), axis=1))
+    hh = digits[:, 0] * 10 + digits[:, 1]
+    mm = digits[:, 3] * 10 + digits[:, 4]
+    ss = digits[:, 6] * 10 + digits[:, 7]
+    valid &= (hh < 24) & (mm < 60) & (ss < 60)
+    seconds = (hh * 3600 + mm * 60 + ss).astype(float)
+    seconds[~valid] = np.nan
+    # Rare non-canonical values (e.g. "8:05:00") go through strptime like they used to
+    for i in np.flatnonzero(~valid):
+        try:
+            t = datetime.strptime(values[i], "%H:%M:%S")
+            seconds[i] = t.hour * 3600 + t.minute * 60 + t.second
+        except (TypeError, ValueError):
+            pass
+    return seconds
+
+
+def _daily_hours(employee, hours_settings):
+    settings = hours_settings.get("employee_settings", {}).get(str(employee.get("id")), {})
+    return settings.get("daily", hours_settings.get("standard_daily_hours", 8))
+
+
+def compute_payroll(attendance, employees, hours_settings, start_date, end_date, employee_ids=None):
+    """Payroll rows (one per employee, in `employees` order) for start_date..end_date.
+
+    attendance is an iterable of attendance records or dicts (anything with .get),
+    employees likewise; employee_ids optionally limits the run.
+    """
+    if employee_ids is not None:
+        wanted = set(employee_ids)
+        employees = [e for e in employees if e.get("id") in wanted]
+    index = {e.get("id"): i for i, e in enumerate(employees)}
+    overtime_rate = hours_settings.get("overtime_rate", 1.5)
+    daily = np.array([float(_daily_hours(e, hours_settings)) for e in employees])
+
+    # Stored worked_seconds where the record has it; otherwise parse the two strings
+    emp_idx, seconds = [], []
+    parse_at, check_in, check_out = [], [], []
+    for record in attendance:
+        i = index.get(record.get("employee_id"))
+        if i is None:
+            continue
+        rdate = record.get("date")
+        if not rdate or not (start_date <= rdate <= end_date):
+            continue
+        ci, co = record.get("check_in"), record.get("check_out")
+        if ci and co:
+            stored = record.get("worked_seconds")
+            if stored is None:
+                parse_at.append(len(seconds))
+                check_in.append(ci)
+                check_out.append(co)
+            emp_idx.append(i)
+            seconds.append(np.nan if stored is None else stored)
+
+    n = len(employees)
+    emp_idx = np.array(emp_idx, dtype=np.int64)
+    seconds = np.array(seconds, dtype=float)
+    if parse_at:
+        seconds[parse_at] = np.mod(parse_times(check_out) - parse_times(check_in), 86400)
+    ok = ~np.isnan(seconds)
+    emp_idx = emp_idx[ok]
+    hours = seconds[ok] / 3600.0
+    overtime = np.maximum(hours - daily[emp_idx], 0.0)
+
+    total = np.bincount(emp_idx, weights=hours, minlength=n)
+    ot_total = np.bincount(emp_idx, weights=overtime, minlength=n)
+    ot_pay = np.bincount(emp_idx, weights=overtime * overtime_rate, minlength=n)
+    days = np.bincount(emp_idx, minlength=n)
+
+    rows = []
+    for i, employee in enumerate(employees):
+        rows.append({
+            "employee_id": employee.get("id"),
+            "name": employee.get("name", ""),
+            "department": employee.get("department", ""),
+            "days_worked": int(days[i]),
+            "daily_hours": float(daily[i]),
+            "total_hours": round(float(total[i]), 2),
+            "regular_hours": round(float(total[i] - ot_total[i]), 2),
+            "overtime_hours": round(float(ot_total[i]), 2),
+            "overtime_pay": round(float(ot_pay[i]), 2),
+        })
+    return rows
+
+
+def iter_csv(rows):
+    """Yield CSV text line by line (header first) for a payroll run"""
+    def cell(value):
+        text = str(value)
+        if any(c in text for c in ',"\n'):
+            text = '"' + text.replace('"', '""') + '"'
+        return text
+    yield ",".join(CSV_COLUMNS) + "\n"
+    for row in rows:
+        yield ",".join(cell(row[c]) for c in CSV_COLUMNS) + "\n"
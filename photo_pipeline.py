@@ -0,0 +1,118 @@
+# photo_pipeline.py - single-decode photo ingest producing content-addressed renditions
+# An uploaded/selected photo is decoded once, rotated per its EXIF orientation and
+# stripped of metadata, then encoded at each rendition size (WebP where Pillow
+# supports it, JPEG otherwise). Files are named by the hash of their encoded bytes,
+# so a given name never changes content and can be cached by browsers indefinitely.
+import os
+import io
+import re
+import hashlib
+
+try:
+    from PIL import Image, ImageOps, features
+    PIL_AVAILABLE = True
+    WEBP_AVAILABLE = features.check("webp")
+except ImportError:
+    PIL_AVAILABLE = False
+    WEBP_AVAILABLE = False
+    print("Warning: Pillow (PIL) not installed. Photos will be stored as uploaded.")
+
+# Rendition name -> bounding box. "medium" is what records reference as `photo`.
+RENDITIONS = {
+    "medium": (300, 300),
+    "thumb": (96, 96),
+}
+PRIMARY_RENDITION = "medium"
+
+# prefix_<16 hex>_<rendition>.<ext>; anything matching is immutable
+HASHED_NAME_RE = re.compile(r"^[A-Za-z0-9]+_\d+_[0-9a-f]{16}_[a-z]+\.(webp|jpg|png|gif)$")
+
+
+def output_format():
+    """(PIL format, file extension) used for new renditions"""
+    return ("WEBP", "webp") if WEBP_AVAILABLE else ("JPEG", "jpg")
+
+
+def is_hashed_name(filename):
+    return bool(HASHED_NAME_RE.match(os.path.basename(filename)))
+
+
+def _read_source(source):
+    """Accept raw bytes, a file path or a binary file object"""
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            return f.read()
+    return source.read()
+
+
+def _write_once(photos_dir, filename, payload):
+    """Write payload atomically unless an identical (same-hash) file already exists"""
+    path = os.path.join(photos_dir, filename)
+    if not os.path.exists(path):
+        tmp = os.path.join(photos_dir, f".{filename}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(payload)
+        os.replace(tmp, path)
+    return path
+
+
+def _sniff_extension(data):
+    if data.startswith(b"\x89PNG"):
+        return "png"
+    if data.startswith(b"GIF8"):
+        return "gif"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return "jpg"
+
+
+def ingest_photo(source, photos_dir, prefix):
+    """Store a photo under photos_dir and return {rendition name: filename}.
+
+    source is raw bytes, a path or a binary file object; prefix identifies the owner
+    (e.g. "student_12"). Raises ValueError if the data is not a readable image.
+    """
+    data = _read_source(source)
+    if not data:
+        raise ValueError("Empty photo")
+    os.makedirs(photos_dir, exist_ok=True)
+
+    if not PIL_AVAILABLE:
+        # Without Pillow keep the original bytes as the only rendition
+        ext = _sniff_extension(data)
+        digest = hashlib.sha1(data).hexdigest()[:16]
+        filename = f"{prefix}_{digest}_{PRIMARY_RENDITION}.{ext}"
+        _write_once(photos_dir, filename, data)
+        return {PRIMARY_RENDITION: filename}
+
+    try:
+        with Image.open(io.BytesIO(data)) as opened:
+            img = ImageOps.exif_transpose(opened)
+            img.load()
+    except Exception as e:
+        raise ValueError(f"Unreadable image: {e}")
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+
+    fmt, ext = output_format()
+    if fmt == "JPEG" and img.mode == "RGBA":
+        img = img.convert("RGB")
+
+    renditions = {}
+    # Largest first so each step downsamples the previous result instead of the original
+    for name, size in sorted(RENDITIONS.items(), key=lambda item: -item[1][0]):
+        img.thumbnail(size)
+        buf = io.BytesIO()
+        # No exif/icc arguments: saved renditions carry no metadata
+        if fmt == "WEBP":
+            img.save(buf, fmt, quality=80, method=4)
+        else:
+            img.save(buf, fmt, quality=85, optimize=True, progressive=True)
+        payload = buf.getvalue()
+        digest = hashlib.sha1(payload).hexdigest()[:16]
+        filename = f"{prefix}_{digest}_{name}.{ext}"
+        _write_once(photos_dir, filename, payload)
+        renditions[name] = filename
+    return renditions
@@ -0,0 +1,134 @@
+# records.py - compact in-memory models for students, employees and attendance rows
+# DataHandler keeps the parsed JSON files as lists of these instead of dict trees.
+# Each class uses __slots__ and interns its categorical strings (class, department,
+# status, ...), so thousands of records share one copy of "Grade 10" or "Present".
+# from_dict/to_dict round-trip the JSON/API shape exactly: keys missing from the
+# source stay missing, and keys the model doesn't know about are kept in `extra`.
+import sys
+
+_MISSING = object()
+
+PLAIN = 0    # stored as-is
+INTERN = 1   # sys.intern()'d when a str
+NESTED = 2   # dict/list owned by the record; copied on to_dict so callers can mutate
+
+
+def _copy_nested(value):
+    if isinstance(value, dict):
+        return {k: _copy_nested(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy_nested(v) for v in value]
+    return value
+
+
+class Record:
+    __slots__ = ("extra",)
+    # (json key, attribute, kind) in the order keys are written back out
+    FIELDS = ()
+    _ATTRS = {}  # json key -> attribute
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._ATTRS = {key: attr for key, attr, _ in cls.FIELDS}
+
+    @classmethod
+    def from_dict(cls, data):
+        obj = cls.__new__(cls)
+        get = data.get
+        intern = sys.intern
+        for key, attr, kind in cls.FIELDS:
+            value = get(key, _MISSING)
+            if kind == INTERN and type(value) is str:
+                value = intern(value)
+            setattr(obj, attr, value)
+        known = cls._ATTRS
+        obj.extra = {k: v for k, v in data.items() if k not in known} or None
+        return obj
+
+    def to_dict(self):
+        out = {}
+        for key, attr, kind in self.FIELDS:
+            value = getattr(self, attr)
+            if value is _MISSING:
+                continue
+            out[key] = _copy_nested(value) if kind == NESTED else value
+        if self.extra:
+            out.update(_copy_nested(self.extra))
+        return out
+
+    def get(self, key, default=None):
+        """dict-style read of a JSON key, for code that handles records and dicts alike"""
+        attr = self._ATTRS.get(key)
+        if attr is not None:
+            value = getattr(self, attr)
+            return default if value is _MISSING else value
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        return default
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.get('id', '')!r})"
+
+
+class Student(Record):
+    __slots__ = ("id", "name", "class_name", "parent_contact", "parent_email", "dob", "age",
+                 "address", "health_status", "allergies", "emergency_contact", "enrollment_date",
+                 "photo", "photo_renditions", "academic_results", "attendance_record",
+                 "monthly_attendance", "term_attendance")
+    FIELDS = (
+        ("id", "id", PLAIN),
+        ("name", "name", PLAIN),
+        ("class", "class_name", INTERN),
+        ("parent_contact", "parent_contact", PLAIN),
+        ("parent_email", "parent_email", PLAIN),
+        ("dob", "dob", PLAIN),
+        ("age", "age", PLAIN),
+        ("address", "address", PLAIN),
+        ("health_status", "health_status", INTERN),
+        ("allergies", "allergies", INTERN),
+        ("emergency_contact", "emergency_contact", PLAIN),
+        ("enrollment_date", "enrollment_date", INTERN),
+        ("photo", "photo", PLAIN),
+        ("photo_renditions", "photo_renditions", NESTED),
+        ("academic_results", "academic_results", NESTED),
+        ("attendance_record", "attendance_record", NESTED),
+        ("monthly_attendance", "monthly_attendance", NESTED),
+        ("term_attendance", "term_attendance", NESTED),
+    )
+
+
+class Employee(Record):
+    __slots__ = ("id", "name", "department", "role", "email", "phone", "address", "password",
+                 "assigned_grades", "photo", "photo_renditions", "working_hours")
+    FIELDS = (
+        ("id", "id", PLAIN),
+        ("name", "name", PLAIN),
+        ("department", "department", INTERN),
+        ("assigned_grades", "assigned_grades", NESTED),
+        ("role", "role", INTERN),
+        ("password", "password", PLAIN),
+        ("email", "email", PLAIN),
+        ("phone", "phone", PLAIN),
+        ("address", "address", PLAIN),
+        ("photo", "photo", PLAIN),
+        ("photo_renditions", "photo_renditions", NESTED),
+        ("working_hours", "working_hours", NESTED),
+    )
+
+
+class AttendanceRecord(Record):
+    __slots__ = ("employee_id", "employee_name", "department", "date", "check_in", "check_out",
+                 "status", "timestamp", "check_in_sec", "check_out_sec", "worked_seconds")
+    FIELDS = (
+        ("employee_id", "employee_id", PLAIN),
+        ("employee_name", "employee_name", INTERN),
+        ("department", "department", INTERN),
+        ("date", "date", INTERN),
+        ("check_in", "check_in", PLAIN),
+        ("check_out", "check_out", PLAIN),
+        ("status", "status", INTERN),
+        ("timestamp", "timestamp", PLAIN),
+        ("check_in_sec", "check_in_sec", PLAIN),
+        ("check_out_sec", "check_out_sec", PLAIN),
+        ("worked_seconds", "worked_seconds", PLAIN),
+    )
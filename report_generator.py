@@ -5,11 +5,15 @@ from datetime import datetime, timedelta
 import os
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_pdf import PdfPages
+from class_analytics import ClassAnalytics
+import attendance_time
 
 class ReportGenerator:
-    def __init__(self, data_handler):
+    def __init__(self, data_handler, reports_dir="reports"):
         self.data_handler = data_handler
-        self.reports_dir = "reports"
+        self.reports_dir = reports_dir
+        # Shared with the GUI and API so the results matrix is built once per change
+        self.analytics = ClassAnalytics(data_handler)
         
         if not os.path.exists(self.reports_dir):
             os.makedirs(self.reports_dir)
@@ -97,30 +101,22 @@ class ReportGenerator:
             
             # Table content
             pdf.set_font("Arial", '', 8)
+            # Get employee's daily hours
+            hours_settings = self.data_handler.get_working_hours_settings()
+            employee_settings = hours_settings.get("employee_settings", {}).get(str(employee_id), {})
+            daily_hours = employee_settings.get("daily", hours_settings.get("standard_daily_hours", 8))
             for record in records:
                 hours = "N/A"
                 overtime = "No"
                 
                 if record.get('check_in') and record.get('check_out'):
-                    try:
-                        check_in = datetime.strptime(record['check_in'], "%H:%M:%S")
-                        check_out = datetime.strptime(record['check_out'], "%H:%M:%S")
-                        hours = (check_out - check_in).seconds / 3600
-                        
-                        # Get employee's daily hours
-                        hours_settings = self.data_handler.get_working_hours_settings()
-                        employee_settings = hours_settings.get("employee_settings", {}).get(str(employee_id), {})
-                        daily_hours = employee_settings.get("daily", hours_settings.get("standard_daily_hours", 8))
-                        
-                        if hours > daily_hours:
-                            overtime = f"Yes (+{hours - daily_hours:.1f}h)"
-                        else:
-                            overtime = "No"
-                        
-                        hours = f"{hours:.2f}"
-                    except:
-                        hours = "N/A"
+                    worked = attendance_time.worked_hours(record)
+                    if worked is None:
                         overtime = "N/A"
+                    else:
+                        if worked > daily_hours:
+                            overtime = f"Yes (+{worked - daily_hours:.1f}h)"
+                        hours = f"{worked:.2f}"
                 
                 row_data = [
                     record.get('date', ''),
@@ -196,14 +192,8 @@ class ReportGenerator:
             hours_worked = 0
             overtime = 0
             
-            if record.get('check_in') and record.get('check_out'):
-                try:
-                    check_in = datetime.strptime(record['check_in'], "%H:%M:%S")
-                    check_out = datetime.strptime(record['check_out'], "%H:%M:%S")
-                    hours_worked = (check_out - check_in).seconds / 3600
-                    total_hours += hours_worked
-                except:
-                    pass
+            hours_worked = attendance_time.worked_hours(record) or 0
+            total_hours += hours_worked
             
             status = record.get('status', '')
             if status == 'Present':
@@ -271,13 +261,8 @@ class ReportGenerator:
         for record in records:
             hours_worked = ""
             if record.get("check_in") and record.get("check_out"):
-                try:
-                    check_in = datetime.strptime(record["check_in"], "%H:%M:%S")
-                    check_out = datetime.strptime(record["check_out"], "%H:%M:%S")
-                    hours = (check_out - check_in).seconds / 3600
-                    hours_worked = f"{hours:.2f}"
-                except:
-                    hours_worked = "N/A"
+                hours = attendance_time.worked_hours(record)
+                hours_worked = "N/A" if hours is None else f"{hours:.2f}"
             
             data.append({
                 "Date": record.get("date", ""),
@@ -341,13 +326,8 @@ class ReportGenerator:
         for record in records:
             hours_worked = ""
             if record.get("check_in") and record.get("check_out"):
-                try:
-                    check_in = datetime.strptime(record["check_in"], "%H:%M:%S")
-                    check_out = datetime.strptime(record["check_out"], "%H:%M:%S")
-                    hours = (check_out - check_in).seconds / 3600
-                    hours_worked = f"{hours:.2f}h"
-                except:
-                    hours_worked = "N/A"
+                hours = attendance_time.worked_hours(record)
+                hours_worked = "N/A" if hours is None else f"{hours:.2f}h"
             
             row_data = [
                 record.get("date", ""),
@@ -370,7 +350,9 @@ class ReportGenerator:
     
     def print_summary_report(self, start_date, end_date):
         """Generate and return a summary report for date range"""
-        records = self.data_handler.get_attendance_by_range(start_date, end_date)
+        # Validated records: malformed rows are left out and listed below
+        errors = []
+        records = self.data_handler.typed_records("attendance", start_date, end_date, errors=errors)
         
         if not records:
             return "No records found for the specified period."
@@ -382,26 +364,22 @@ class ReportGenerator:
         # Group by employee
         employees = {}
         for record in records:
-            emp_id = record['employee_id']
+            emp_id = record.get('employee_id')
             if emp_id not in employees:
                 employees[emp_id] = {
-                    'name': record['employee_name'],
-                    'department': record['department'],
+                    'name': record.get('employee_name', ''),
+                    'department': record.get('department', ''),
                     'days_present': 0,
                     'total_hours': 0
                 }
             
-            if record.get('status') == 'Present':
+            if record.get('status', 'Present') == 'Present':
                 employees[emp_id]['days_present'] += 1
             
-            if record.get('check_in') and record.get('check_out'):
-                try:
-                    check_in = datetime.strptime(record['check_in'], "%H:%M:%S")
-                    check_out = datetime.strptime(record['check_out'], "%H:%M:%S")
-                    hours = (check_out - check_in).seconds / 3600
-                    employees[emp_id]['total_hours'] += hours
-                except:
-                    pass
+            if record.get('worked_seconds') is not None:
+                employees[emp_id]['total_hours'] += record.get('worked_seconds') / 3600
+            else:
+                employees[emp_id]['total_hours'] += attendance_time.worked_hours(record) or 0
         
         summary += "\nEmployee Summary:\n"
         for emp_id, data in employees.items():
@@ -409,6 +387,11 @@ class ReportGenerator:
             summary += f"  Days Present: {data['days_present']}\n"
             summary += f"  Total Hours: {data['total_hours']:.2f}\n"
         
+        if errors:
+            summary += f"\nSkipped {len(errors)} invalid record(s):\n"
+            for error in errors:
+                summary += f"  {error.source}: {error.message}\n"
+        
         return summary
     
     # Other existing methods...
@@ -486,14 +469,21 @@ class ReportGenerator:
             pdf.cell(0, 10, "Academic Results", 0, 1)
             pdf.set_font("Arial", '', 10)
             
+            positions = self.data_handler.rankings.student_positions(student_id)
             for term, subjects in results.items():
                 if subjects:
+                    term_positions = positions.get(term, {})
+                    heading = f"{term}:"
+                    if term_positions.get('total'):
+                        heading += f"  Position {term_positions['total']['label']}"
                     pdf.set_font("Arial", 'B', 10)
-                    pdf.cell(0, 8, f"{term}:", 0, 1)
+                    pdf.cell(0, 8, heading, 0, 1)
                     pdf.set_font("Arial", '', 9)
                     
                     for subject, score in subjects.items():
-                        pdf.cell(0, 6, f"  {subject}: {score}/100", 0, 1)
+                        subject_position = term_positions.get('subjects', {}).get(subject)
+                        suffix = f"  ({subject_position['label']})" if subject_position else ""
+                        pdf.cell(0, 6, f"  {subject}: {score}/100{suffix}", 0, 1)
                     pdf.ln(2)
         
         # Footer
@@ -591,14 +581,48 @@ class ReportGenerator:
             pdf.ln()
         
         # Academic Performance Summary (if available)
-        has_results = any('academic_results' in s and s['academic_results'] for s in students)
-        if has_results:
+        analysis = self.analytics.class_summary(class_name)
+        if analysis["terms"]:
             pdf.add_page()
             pdf.set_font("Arial", 'B', 12)
             pdf.cell(0, 10, "Academic Performance Summary", 0, 1)
             
-            pdf.set_font("Arial", '', 10)
-            pdf.cell(0, 8, "Detailed academic analysis would require individual student reports.", 0, 1)
+            fmt = lambda v: "-" if v is None else f"{v:.1f}"
+            for term, stats in analysis["terms"].items():
+                pdf.set_font("Arial", 'B', 10)
+                pdf.cell(0, 8, f"{term}", 0, 1)
+                pdf.set_font("Arial", '', 9)
+                pdf.cell(0, 6, f"  Class average: {fmt(stats['mean'])}   Median: {fmt(stats['median'])}   "
+                               f"Std dev: {fmt(stats['std'])}   Range: {fmt(stats['min'])} - {fmt(stats['max'])}", 0, 1)
+                pdf.cell(0, 6, f"  Percentiles  25th: {fmt(stats['p25'])}   75th: {fmt(stats['p75'])}   90th: {fmt(stats['p90'])}", 0, 1)
+                grades = "   ".join(f"{g}: {n}" for g, n in stats['grade_distribution'].items())
+                pdf.cell(0, 6, f"  Grade distribution (all scores)  {grades}", 0, 1)
+                
+                # Per-subject table
+                sub_widths = [45, 20, 20, 20, 20, 55]
+                pdf.set_font("Arial", 'B', 9)
+                for i, header in enumerate(["Subject", "Mean", "Median", "Std", "Count", "A / B / C / D / F"]):
+                    pdf.cell(sub_widths[i], 7, header, 1, 0, 'C')
+                pdf.ln()
+                pdf.set_font("Arial", '', 9)
+                for subject, sub in stats['subjects'].items():
+                    pdf.cell(sub_widths[0], 7, subject[:22], 1, 0, 'L')
+                    pdf.cell(sub_widths[1], 7, fmt(sub['mean']), 1, 0, 'C')
+                    pdf.cell(sub_widths[2], 7, fmt(sub['median']), 1, 0, 'C')
+                    pdf.cell(sub_widths[3], 7, fmt(sub['std']), 1, 0, 'C')
+                    pdf.cell(sub_widths[4], 7, str(sub['count']), 1, 0, 'C')
+                    pdf.cell(sub_widths[5], 7, " / ".join(str(n) for n in sub['grade_distribution'].values()), 1, 0, 'C')
+                    pdf.ln()
+                pdf.ln(3)
+            
+            if analysis["term_deltas"]:
+                pdf.set_font("Arial", 'B', 10)
+                pdf.cell(0, 8, "Term-over-term change (average per student)", 0, 1)
+                pdf.set_font("Arial", '', 9)
+                for delta in analysis["term_deltas"]:
+                    change = delta['mean_change']
+                    text = "-" if change is None else f"{change:+.1f}"
+                    pdf.cell(0, 6, f"  {delta['from']} -> {delta['to']}: {text}", 0, 1)
         
         # Footer
         pdf.ln(10)
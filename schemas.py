@@ -0,0 +1,160 @@
+# schemas.py - validated decoding of the data files
+# One field table per collection (students, employees, attendance, correction
+# requests, announcements) gives each field's JSON key, accepted types and whether
+# it is required. The tables only validate: there is no second set of model
+# classes. Valid students, employees and attendance rows come back as the
+# records.py models (Student, Employee, AttendanceRecord); correction requests and
+# announcements, which have no model, come back as the dicts they were parsed as.
+#   - fields missing from older files stay missing (read them with .get(key,
+#     default)), and keys the schema doesn't know are kept rather than rejected;
+#   - a record with a wrong type or a missing required field is reported as a
+#     SchemaError (file, index, id, message) and left out, instead of failing the
+#     whole file or turning up later as a .get() default.
+# The records are read-only views for reports and checks; writes still go through
+# DataHandler's dict-based methods.
+from collections import namedtuple
+
+import storage_format
+from records import AttendanceRecord, Employee, Student
+
+NONE = type(None)
+
+# (json key, accepted types, required)
+FIELDS = {
+    "students": (
+        ("id", (int,), True),
+        ("name", (str,), False),
+        ("class", (str,), False),
+        ("parent_contact", (str,), False),
+        ("parent_email", (str,), False),
+        ("dob", (str,), False),
+        ("age", (int,), False),
+        ("address", (str,), False),
+        ("health_status", (str,), False),
+        ("allergies", (str,), False),
+        ("emergency_contact", (str,), False),
+        ("enrollment_date", (str,), False),
+        ("photo", (str, NONE), False),
+        ("photo_renditions", (dict, NONE), False),
+        ("academic_results", (dict,), False),
+        ("attendance_record", (dict,), False),
+        ("monthly_attendance", (dict,), False),
+        ("term_attendance", (dict,), False),
+    ),
+    "employees": (
+        ("id", (int,), True),
+        ("name", (str,), False),
+        ("department", (str,), False),
+        ("role", (str,), False),
+        ("password", (str,), False),
+        ("email", (str,), False),
+        ("phone", (str,), False),
+        ("address", (str,), False),
+        ("assigned_grades", (list,), False),
+        ("photo", (str, NONE), False),
+        ("photo_renditions", (dict, NONE), False),
+        ("working_hours", (dict,), False),
+    ),
+    "attendance": (
+        ("employee_id", (int,), True),
+        ("employee_name", (str,), False),
+        ("department", (str,), False),
+        ("date", (str,), True),
+        ("check_in", (str, NONE), False),
+        ("check_out", (str, NONE), False),
+        ("status", (str,), False),
+        ("timestamp", (str,), False),
+        ("check_in_sec", (int, NONE), False),
+        ("check_out_sec", (int, NONE), False),
+        ("worked_seconds", (int, NONE), False),
+    ),
+    "correction_requests": (
+        ("id", (int,), True),
+        ("employee_id", (int,), True),
+        ("employee_name", (str,), False),
+        ("original_date", (str,), False),
+        ("original_status", (str,), False),
+        ("requested_correction", (dict,), False),
+        ("reason", (str,), False),
+        ("status", (str,), False),
+        ("submitted_date", (str,), False),
+        ("processed_by", (str, int, NONE), False),
+        ("processed_date", (str, NONE), False),
+        ("notes", (str,), False),
+    ),
+    "announcements": (
+        ("id", (int,), True),
+        ("title", (str,), False),
+        ("content", (str,), False),
+        ("author", (str,), False),
+        ("author_id", (int, str, NONE), False),
+        ("date", (str,), False),
+        ("priority", (str,), False),
+        ("visible_to", (list,), False),
+        ("attachments", (list,), False),
+        ("expires", (str, NONE), False),
+    ),
+}
+# The list each collection sits under in its file
+LIST_KEYS = {"students": "students", "employees": "employees", "attendance": "attendance",
+             "correction_requests": "requests", "announcements": "announcements"}
+# The records.py model valid records are built as (other collections stay dicts)
+MODELS = {"students": Student, "employees": Employee, "attendance": AttendanceRecord}
+
+SchemaError = namedtuple("SchemaError", "kind source index record_id message")
+Decoded = namedtuple("Decoded", "records errors")
+
+_JSON_NAMES = {dict: "object", list: "array", str: "str", int: "int", NONE: "null"}
+
+
+def _record_id(kind, item):
+    if not isinstance(item, dict):
+        return None
+    if kind == "attendance":
+        return (item.get("employee_id"), item.get("date"))
+    return item.get("id")
+
+
+def _type_name(value):
+    return _JSON_NAMES.get(type(value), type(value).__name__)
+
+
+def check(kind, item):
+    """Why one parsed record doesn't fit the schema, or None if it does"""
+    if not isinstance(item, dict):
+        return f"Expected `object`, got `{_type_name(item)}`"
+    for key, types, required in FIELDS[kind]:
+        if key not in item:
+            if required:
+                return f"Object missing required field `{key}`"
+            continue
+        value = item[key]
+        # bool is an int subclass, but true/false is not a number here
+        if not isinstance(value, types) or (isinstance(value, bool) and bool not in types):
+            expected = " | ".join(_JSON_NAMES.get(t, t.__name__) for t in types)
+            return f"Expected `{expected}`, got `{_type_name(value)}` - at `$.{key}`"
+    return None
+
+
+def validate_records(kind, items, source=""):
+    """Decoded(records, errors) for an already-parsed list of dicts"""
+    model = MODELS.get(kind)
+    records, errors = [], []
+    for index, item in enumerate(items):
+        message = check(kind, item)
+        if message is not None:
+            errors.append(SchemaError(kind, source, index, _record_id(kind, item), message))
+        else:
+            records.append(model.from_dict(item) if model is not None else item)
+    return Decoded(records, errors)
+
+
+def decode(kind, data, source=""):
+    """Decode a data file's bytes, JSON or MessagePack (e.g. a student shard, an attendance
+    segment, dashboard.json), into Decoded(records, errors) for the list under
+    LIST_KEYS[kind]. Raises storage_format.DECODE_ERRORS if the bytes don't parse at all."""
+    parsed = storage_format.loads(data)
+    items = parsed.get(LIST_KEYS[kind], []) if isinstance(parsed, dict) else None
+    if not isinstance(items, list):
+        return Decoded([], [SchemaError(kind, source, None, None, f"Expected an object with a `{LIST_KEYS[kind]}` array")])
+    return validate_records(kind, items, source)
@@ -0,0 +1,194 @@
+# school_year.py - end-of-year rollover and the archives it leaves behind
+# A rollover writes the closing year's per-student data (class, results, attendance)
+# to data/archive/school_year_<year>.json.gz, made read-only, then promotes every
+# class to the next one in the class list (the last class graduates and leaves the
+# student shards) and resets academic_results, attendance_record,
+# monthly_attendance and term_attendance - one rewrite of the student shards. The
+# archives stay queryable: YearArchives.transcript() gathers a student's past years.
+import os
+import re
+import json
+import gzip
+import stat
+import threading
+from datetime import datetime
+
+import month_bitmap
+
+ARCHIVE_PREFIX = "school_year_"
+ARCHIVE_SUFFIX = ".json.gz"
+YEAR_FIELDS = ("academic_results", "attendance_record", "monthly_attendance", "term_attendance")
+_YEAR_RE = re.compile(r"^(\d{4})\s*[-/]\s*(\d{4})$")
+
+
+def next_school_year(school_year):
+    """'2024-2025' -> '2025-2026' (None if the label isn't in that form)"""
+    match = _YEAR_RE.match((school_year or "").strip())
+    if not match:
+        return None
+    start, end = int(match.group(1)), int(match.group(2))
+    return f"{start + 1}-{end + 1}"
+
+
+def promotion_map(classes, overrides=None):
+    """class -> next class in `classes` order, None for the final class (graduates)"""
+    mapping = {c: (classes[i + 1] if i + 1 < len(classes) else None) for i, c in enumerate(classes)}
+    mapping.update(overrides or {})
+    return mapping
+
+
+def empty_year_data(terms):
+    return {
+        "academic_results": {term: {} for term in terms},
+        "attendance_record": {"present": 0, "absent": 0, "late": 0},
+        "monthly_attendance": {},
+        "term_attendance": {},
+    }
+
+
+def archive_entry(student, outcome, next_class=None):
+    entry = {"id": student.get("id"), "name": student.get("name", ""), "class": student.get("class", ""),
+             "outcome": outcome}
+    if next_class:
+        entry["next_class"] = next_class
+    for field in YEAR_FIELDS:
+        entry[field] = student.get(field) or {}
+    return entry
+
+
+def plan_rollover(students, classes, terms, overrides=None, retain=()):
+    """Split students into (archive entries, students for the new year, counts).
+    Pure: nothing is written and the input dicts are not modified."""
+    mapping = promotion_map(classes, overrides)
+    retain = set(retain)
+    entries, remaining = [], []
+    counts = {"promoted": 0, "graduated": 0, "retained": 0, "unchanged": 0}
+    for student in students:
+        class_name = student.get("class", "")
+        if student.get("id") in retain:
+            outcome, new_class = "retained", class_name
+        elif class_name not in mapping:
+            outcome, new_class = "unchanged", class_name  # not in the class list; left where it is
+        elif mapping[class_name] is None:
+            outcome, new_class = "graduated", None
+        else:
+            outcome, new_class = "promoted", mapping[class_name]
+        counts[outcome] += 1
+        entries.append(archive_entry(student, outcome, new_class if outcome == "promoted" else None))
+        if outcome == "graduated":
+            continue
+        updated = dict(student)
+        updated["class"] = new_class
+        updated.update(empty_year_data(terms))
+        remaining.append(updated)
+    return entries, remaining, counts
+
+
+def write_archive(path, archive):
+    """Write a gzip archive and mark it read-only; refuses to overwrite an existing one"""
+    if os.path.exists(path):
+        raise FileExistsError(f"Archive already exists: {path}")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(gzip.compress(json.dumps(archive).encode("utf-8"), mtime=0))
+    os.chmod(tmp, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+    os.replace(tmp, path)
+    return path
+
+
+def remove_archive(path):
+    """Undo write_archive (used when the rollover's student shard write fails)"""
+    try:
+        os.chmod(path, stat.S_IRUSR | stat.S_IWUSR)
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class YearArchives:
+    """Read access to data/archive, with each archive's id index cached by file signature"""
+    def __init__(self, archive_dir):
+        self.archive_dir = archive_dir
+        self._lock = threading.Lock()
+        self._cache = {}  # year -> ((mtime_ns, size), archive, {student_id: entry})
+
+    def path_for(self, school_year):
+        safe = re.sub(r"[^0-9A-Za-z_-]", "_", school_year)
+        return os.path.join(self.archive_dir, f"{ARCHIVE_PREFIX}{safe}{ARCHIVE_SUFFIX}")
+
+    def years(self):
+        """Archived school years, oldest first"""
+        if not os.path.isdir(self.archive_dir):
+            return []
+        years = []
+        for name in os.listdir(self.archive_dir):
+            if name.startswith(ARCHIVE_PREFIX) and name.endswith(ARCHIVE_SUFFIX):
+                years.append(name[len(ARCHIVE_PREFIX):-len(ARCHIVE_SUFFIX)])
+        return sorted(years)
+
+    def _load(self, school_year):
+        path = self.path_for(school_year)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        sig = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            cached = self._cache.get(school_year)
+        if cached and cached[0] == sig:
+            return cached
+        try:
+            with gzip.open(path, "rt") as f:
+                archive = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Error reading archive {path}: {e}")
+            return None
+        index = {entry.get("id"): entry for entry in archive.get("students", [])}
+        loaded = (sig, archive, index)
+        with self._lock:
+            self._cache[school_year] = loaded
+        return loaded
+
+    def clear_cache(self):
+        with self._lock:
+            count = len(self._cache)
+            self._cache.clear()
+        return count
+
+    def load(self, school_year):
+        loaded = self._load(school_year)
+        return loaded[1] if loaded else None
+
+    def transcript(self, student_id):
+        """One entry per archived year the student appears in, oldest first"""
+        years = []
+        for school_year in self.years():
+            loaded = self._load(school_year)
+            if not loaded:
+                continue
+            entry = loaded[2].get(student_id)
+            if entry is None:
+                continue
+            monthly = {}
+            for month_key, value in (entry.get("monthly_attendance") or {}).items():
+                try:
+                    monthly[month_key] = month_bitmap.summary(month_key, month_bitmap.entry_mask(month_key, value))
+                except ValueError:
+                    continue
+            years.append({
+                "school_year": school_year,
+                "class": entry.get("class", ""),
+                "outcome": entry.get("outcome", ""),
+                "next_class": entry.get("next_class"),
+                "academic_results": entry.get("academic_results", {}),
+                "term_attendance": entry.get("term_attendance", {}),
+                "attendance_record": entry.get("attendance_record", {}),
+                "monthly_summary": monthly,
+            })
+        return years
+
+
+def build_archive(school_year, classes, entries):
+    return {"school_year": school_year, "archived_at": datetime.now().isoformat(),
+            "classes": list(classes), "students": entries}
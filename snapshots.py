@@ -0,0 +1,160 @@
+# snapshots.py - immutable, versioned views of students, employees and attendance
+# Reports, exports and list endpoints read through a Snapshot: tuples of shared
+# records that never change once published. Taking the current snapshot is one
+# attribute read - no lock, no file IO - and the reader keeps a consistent view (the
+# class list matches the students, a transfer is either fully applied or not at all)
+# for as long as it holds it, however long the report runs and whatever is written
+# meanwhile. Writers never touch a published snapshot: each write marks its
+# collection stale through the change notifier, and the next reader builds a new
+# version - reusing the previous version's tuples for every class and month whose
+# file didn't change - and swaps it in. A version is freed once no reader holds it.
+# Attendance is held as rows only for the open months (the hot month, undated rows);
+# a sealed month is held as its segment file name, which never changes contents
+# (see attendance_store), and is read through the store's cache when a reader asks
+# for it, so a snapshot doesn't keep years of attendance in memory. A late correction
+# writes a new revision of a sealed month; the file it replaces stays on disk while
+# any live snapshot names it (the store asks retains()) and is removed afterwards.
+import itertools
+import threading
+import weakref
+from types import MappingProxyType
+
+from attendance_store import months_between
+
+KINDS = ("students", "employees", "attendance")
+
+
+class Snapshot:
+    """One consistent version of the data; every collection is a tuple of shared,
+    read-only records (Student, Employee, AttendanceRecord)"""
+    __slots__ = ("version", "classes", "students", "by_class", "employees", "open_months", "sealed_months", "_store",
+                 "__weakref__")
+
+    def __init__(self, version, classes, by_class, employees, open_months, sealed_months, store):
+        self.version = version
+        self.classes = classes
+        self.by_class = MappingProxyType(by_class)
+        self.students = tuple(s for c in by_class for s in by_class[c])
+        self.employees = employees
+        self.open_months = MappingProxyType(open_months)  # month -> tuple of rows
+        self.sealed_months = MappingProxyType(sealed_months)  # month -> segment file name
+        self._store = store
+
+    def students_in(self, class_name):
+        return self.by_class.get(class_name, ())
+
+    def attendance(self, start_date=None, end_date=None):
+        """AttendanceRecords in month order; with a range only the overlapping months"""
+        known = self.open_months.keys() | self.sealed_months.keys()
+        covered = months_between(start_date, end_date) if start_date and end_date else None
+        if covered is not None:
+            months = [m for m in covered if m in known]
+        else:
+            months = sorted(known)
+        for month in months:
+            rows = self.open_months.get(month)
+            if rows is None:
+                rows = self._store.records(month, self.sealed_months[month])
+            for record in rows:
+                if start_date and end_date and not (start_date <= (record.date or "") <= end_date):
+                    continue
+                yield record
+
+    def __repr__(self):
+        return (f"Snapshot(v{self.version}, {len(self.students)} students, {len(self.employees)} employees, "
+                f"{len(self.open_months) + len(self.sealed_months)} attendance months)")
+
+
+class SnapshotManager:
+    def __init__(self, data_handler):
+        self.data_handler = data_handler
+        self._current = None
+        self._stale = set(KINDS)
+        self._build_lock = threading.Lock()
+        self._versions = itertools.count(1)
+        # (collection, class/month) -> (source list, tuple): unchanged parts are reused
+        self._parts = {}
+        self._live = weakref.WeakSet()  # published snapshots some reader still holds
+        data_handler.notifier.subscribe(self._on_change, KINDS)
+        data_handler.attendance.retain = self.retains
+
+    def _on_change(self, event):
+        self._stale.add(event.kind)
+
+    def current(self):
+        """The newest snapshot, built first if a write has happened since the last one.
+        Without the change watcher running, writes by other processes aren't announced,
+        so every call re-checks the files (cheap: unchanged files are not re-read)."""
+        snapshot = self._current
+        if snapshot is not None and not self._stale and self.data_handler.notifier.watching():
+            return snapshot
+        return self._publish()
+
+    def invalidate(self, kinds=KINDS):
+        self._stale.update(kinds)
+
+    def retains(self, filename):
+        """True while a live snapshot refers to this attendance segment file"""
+        return any(filename in snapshot.sealed_months.values() for snapshot in list(self._live))
+
+    def _publish(self):
+        with self._build_lock:
+            previous = self._current
+            stale = set(KINDS) if previous is None or not self.data_handler.notifier.watching() else set(self._stale)
+            if previous is not None and not stale:
+                return previous  # another reader built it while we waited
+            # Cleared before building: a write that lands mid-build marks the kind again
+            self._stale.difference_update(stale)
+            if "students" in stale:
+                classes, by_class = self._build_students()
+            else:
+                classes, by_class = previous.classes, dict(previous.by_class)
+            employees = self._build_employees() if "employees" in stale else previous.employees
+            if "attendance" in stale:
+                open_months, sealed_months = self._build_attendance()
+            else:
+                open_months, sealed_months = dict(previous.open_months), dict(previous.sealed_months)
+            snapshot = Snapshot(next(self._versions), classes, by_class, employees, open_months, sealed_months,
+                                self.data_handler.attendance)
+            self._live.add(snapshot)
+            self._current = snapshot
+            return snapshot
+
+    def _reuse(self, key, rows):
+        part = self._parts.get(key)
+        if part is not None and part[0] is rows:
+            return part[1]
+        frozen = tuple(rows)
+        self._parts[key] = (rows, frozen)
+        return frozen
+
+    def _build_students(self):
+        shards = self.data_handler.student_shards
+        # Multi-shard writes (add, remove, transfer, replace) hold the manifest lock
+        # throughout, so under it every shard is either before or after each of them
+        with shards.consistent():
+            manifest = shards.manifest()
+            order = shards.ordered_classes(manifest)
+            by_class = {c: self._reuse(("students", c), shards.records(c)) for c in order}
+            classes = tuple(manifest["classes"])
+        self._forget("students", by_class)
+        return classes, by_class
+
+    def _build_employees(self):
+        return self._reuse(("employees", None), self.data_handler.employee_records())
+
+    def _build_attendance(self):
+        store = self.data_handler.attendance
+        open_months, sealed_months = {}, {}
+        with store.consistent():
+            for month, entry in store.manifest()["segments"].items():
+                if entry.get("closed"):
+                    sealed_months[month] = entry["file"]
+                else:
+                    open_months[month] = self._reuse(("attendance", month), store.records(month))
+        self._forget("attendance", open_months)
+        return open_months, sealed_months
+
+    def _forget(self, collection, live):
+        for key in [k for k in self._parts if k[0] == collection and k[1] not in live]:
+            del self._parts[key]
@@ -0,0 +1,85 @@
+# storage_format.py - JSON or MessagePack on disk, detected per file
+# Any data file (a top-level file such as employees.json, a student shard or an
+# attendance segment) may hold either format. Readers detect the format from the
+# first byte - a JSON document starts with "{" or "[" (after whitespace), a
+# MessagePack map/array with 0x80-0x9f or 0xdc-0xdf - so file names, manifests,
+# backups and change events are the same for both. Writers keep a file in the
+# format it already has; convert_storage.py switches files between formats and
+# exports JSON copies for people to read. Manifests and settings stay JSON.
+import json_codec
+
+try:
+    import msgspec.msgpack as _msgspec_msgpack
+    MSGPACK_AVAILABLE = True
+    MSGPACK_BACKEND = "msgspec"
+except ImportError:
+    try:
+        import msgpack as _msgpack
+        MSGPACK_AVAILABLE = True
+        MSGPACK_BACKEND = "msgpack"
+    except ImportError:
+        MSGPACK_AVAILABLE = False
+        MSGPACK_BACKEND = None
+
+JSON = "json"
+MSGPACK = "msgpack"
+FORMATS = (JSON, MSGPACK)
+_WHITESPACE = b" \t\r\n"
+# What loads() raises for malformed data (msgspec's DecodeError is already in the
+# JSON list; the msgpack library raises ValueError subclasses). FormatUnavailable is
+# deliberately not included: a file we can't read must not be treated as empty.
+DECODE_ERRORS = json_codec.DECODE_ERRORS
+
+
+class FormatUnavailable(RuntimeError):
+    """A MessagePack file was found (or requested) but no MessagePack library is installed"""
+
+
+def detect(data):
+    """JSON or MSGPACK for a file's bytes (empty counts as JSON)"""
+    for byte in data[:64]:
+        if byte in _WHITESPACE:
+            continue
+        if 0x80 <= byte <= 0x9f or 0xdc <= byte <= 0xdf:
+            return MSGPACK
+        return JSON
+    return JSON
+
+
+def _require_msgpack():
+    if not MSGPACK_AVAILABLE:
+        raise FormatUnavailable("MessagePack data needs msgspec or msgpack installed")
+
+
+def loads(data):
+    """Decode bytes in either format (raises DECODE_ERRORS when malformed)"""
+    if detect(data) == JSON:
+        return json_codec.loads(data)
+    _require_msgpack()
+    if MSGPACK_BACKEND == "msgspec":
+        return _msgspec_msgpack.decode(data)
+    return _msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+def dumps(obj, fmt=JSON, indent=True):
+    """Encode obj in fmt; indent applies to JSON only"""
+    if fmt == JSON:
+        return json_codec.dumps(obj, indent=indent)
+    _require_msgpack()
+    if MSGPACK_BACKEND == "msgspec":
+        return _msgspec_msgpack.encode(obj)
+    return _msgpack.packb(obj, use_bin_type=True)
+
+
+def load(path):
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+def file_format(path, default=JSON):
+    """Format of an existing file (from its first bytes), or default if it doesn't exist"""
+    try:
+        with open(path, "rb") as f:
+            return detect(f.read(64))
+    except OSError:
+        return default
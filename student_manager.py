@@ -8,16 +8,21 @@ class StudentManager:
         self.data_handler = data_handler
 
     def add_new_student(self, name, class_name, parent_contact="", parent_email="", dob="", address="", health_status="Good", allergies="", emergency_contact=""):
+        success, message, _ = self.create_student(name, class_name, parent_contact, parent_email, dob, address, health_status, allergies, emergency_contact)
+        return success, message
+
+    def create_student(self, name, class_name, parent_contact="", parent_email="", dob="", address="", health_status="Good", allergies="", emergency_contact=""):
+        """Like add_new_student, but also returns the new student's id (None on failure)"""
         if not name or not class_name:
-            return False, "Name and class are required"
-        students = self.data_handler.get_all_students()
-        if any(student['name'].lower() == name.lower() and student['class'] == class_name for student in students):
-            return False, "Student with this name already exists in this class"
+            return False, "Name and class are required", None
+        students = self.data_handler.get_students_by_class(class_name)
+        if any(student['name'].lower() == name.lower() for student in students):
+            return False, "Student with this name already exists in this class", None
         age = self.data_handler.calculate_age(dob) if dob else 0
-        success = self.data_handler.add_student(name=name, class_name=class_name, parent_contact=parent_contact, parent_email=parent_email, dob=dob, age=age, address=address, health_status=health_status, allergies=allergies, emergency_contact=emergency_contact)
-        if success:
-            return True, f"Student '{name}' added to {class_name}"
-        return False, "Failed to add student"
+        student_id = self.data_handler.add_student(name=name, class_name=class_name, parent_contact=parent_contact, parent_email=parent_email, dob=dob, age=age, address=address, health_status=health_status, allergies=allergies, emergency_contact=emergency_contact)
+        if student_id:
+            return True, f"Student '{name}' added to {class_name}", student_id
+        return False, "Failed to add student", None
 
     def update_student_results(self, student_id, term, subject, score):
         if not 0 <= score <= 100:
@@ -28,8 +33,7 @@ class StudentManager:
         return False, "Failed to update results"
 
     def get_student_full_info(self, student_id):
-        students = self.data_handler.get_all_students()
-        student = next((s for s in students if s['id'] == student_id), None)
+        student = self.data_handler.get_student(student_id)
         if not student:
             return None
         student["photo_path"] = self.data_handler.get_student_photo(student_id)
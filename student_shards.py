@@ -0,0 +1,419 @@
+# student_shards.py - students stored as one shard file per class
+# data/students/ holds "<class slug>.json" ({"class": ..., "students": [...]}) per class
+# and manifest.json with the class list, the shard file names and counts, the
+# id -> class index and the next student id. Reading a class opens one shard; a change
+# to one student rewrites only that student's shard (plus the manifest when the
+# index or counts change: add, remove, transfer). Each shard has its own lock; an
+# edit within one class (update, update_shard) holds only that lock, so edits to
+# different classes don't wait on each other. Writes that change the manifest also
+# take the manifest lock: always after their shard locks, which they take in sorted
+# class order (see _locked), so two writes never wait on each other's locks. A write
+# by student id re-checks the student's class once it holds the lock, in case a
+# transfer moved them meanwhile (see _locked_student). Shards are JSON or MessagePack
+# ("grade-10.msgpack") per the manifest's "format"; the manifest itself stays JSON.
+# New ids come from `sequences` (an id_sequences.IdSequences, collection "students")
+# when given, otherwise from the manifest's next_id.
+import os
+import re
+import threading
+from contextlib import contextmanager, ExitStack
+
+import json_codec
+import storage_format
+from records import Student
+
+MANIFEST = "manifest.json"
+UNASSIGNED = ""  # students with no class share one shard
+
+
+def slugify(class_name):
+    slug = re.sub(r"[^0-9a-z]+", "-", (class_name or "").lower()).strip("-")
+    return slug or "unassigned"
+
+
+def _format_of(filename):
+    """A shard's format from its extension ("grade-10.msgpack")"""
+    ext = filename.rsplit(".", 1)[-1]
+    return ext if ext in storage_format.FORMATS else storage_format.JSON
+
+
+class StudentShards:
+    def __init__(self, root_dir, on_write=None, sequences=None):
+        self.root_dir = root_dir
+        self.manifest_file = os.path.join(root_dir, MANIFEST)
+        self.on_write = on_write
+        self.sequences = sequences
+        self._manifest_lock = threading.RLock()
+        self._shard_locks = {}
+        self._shard_locks_guard = threading.Lock()
+        self._cache = {}  # class -> (file, (mtime_ns, size), [Student])
+        self._encoded = {}  # class -> (file, (mtime_ns, size), encoded student list)
+
+    # Manifest
+    def exists(self):
+        return os.path.exists(self.manifest_file)
+
+    def manifest(self):
+        try:
+            data = json_codec.load(self.manifest_file)
+        except (FileNotFoundError, *json_codec.DECODE_ERRORS):
+            data = {}
+        data.setdefault("version", 1)
+        data.setdefault("classes", [])
+        data.setdefault("shards", {})
+        data.setdefault("index", {})
+        data.setdefault("next_id", 1)
+        data.setdefault("format", storage_format.JSON)
+        return data
+
+    def _write(self, path, payload, fmt=storage_format.JSON):
+        os.makedirs(self.root_dir, exist_ok=True)
+        tmp = os.path.join(self.root_dir, f".{os.path.basename(path)}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(storage_format.dumps(payload, fmt))
+        os.replace(tmp, path)
+        if self.on_write:
+            self.on_write(path)
+
+    def _save_manifest(self, manifest):
+        self._write(self.manifest_file, manifest)
+
+    def consistent(self):
+        """Lock held by every write that changes the manifest (add, remove, transfer,
+        replace); readers holding it see no half-applied change. A single-shard edit
+        doesn't take it: it replaces one file, so readers see it whole or not at all."""
+        return self._manifest_lock
+
+    def classes(self):
+        return list(self.manifest()["classes"])
+
+    def count(self):
+        """Total number of students, from the manifest's per-shard counts"""
+        return sum(entry.get("count", 0) for entry in self.manifest()["shards"].values())
+
+    def last_id(self):
+        """Highest student id allocated so far (seeds the "students" sequence)"""
+        manifest = self.manifest()
+        return max(manifest["next_id"] - 1, max((int(i) for i in manifest["index"]), default=0))
+
+    def class_of(self, student_id):
+        return self.manifest()["index"].get(str(student_id))
+
+    def _shard_lock(self, class_name):
+        with self._shard_locks_guard:
+            return self._shard_locks.setdefault(class_name, threading.RLock())
+
+    @contextmanager
+    def _locked(self, class_names, manifest=True):
+        """Shard locks for class_names in sorted order, then (unless manifest is False)
+        the manifest lock: the one lock order every write uses"""
+        with ExitStack() as stack:
+            for class_name in sorted(set(class_names)):
+                stack.enter_context(self._shard_lock(class_name))
+            if manifest:
+                stack.enter_context(self._manifest_lock)
+            yield
+
+    @contextmanager
+    def _locked_student(self, student_id, also=None, manifest=True):
+        """_locked for the class holding student_id (plus `also`); yields that class, or
+        None if the student doesn't exist. The class is looked up again once locked and
+        the locks retaken if a transfer moved the student in between."""
+        while True:
+            class_name = self.class_of(student_id)
+            if class_name is None:
+                yield None
+                return
+            with self._locked([class_name] if also is None else [class_name, also], manifest):
+                if self.class_of(student_id) == class_name:
+                    yield class_name
+                    return
+
+    @contextmanager
+    def _locked_all(self, extra=()):
+        """Every shard's lock (plus extra classes') and the manifest lock, retried if a
+        class was added between reading the manifest and taking the locks"""
+        extra = set(extra)
+        while True:
+            class_names = set(self.manifest()["shards"]) | extra
+            with self._locked(class_names):
+                if set(self.manifest()["shards"]) <= class_names:
+                    yield
+                    return
+
+    def _shard_file(self, manifest, class_name):
+        """File name for a class's shard, allocating a unique one for new classes"""
+        entry = manifest["shards"].get(class_name)
+        if entry:
+            return entry["file"]
+        taken = {e["file"].rsplit(".", 1)[0] for e in manifest["shards"].values()}
+        base = stem = slugify(class_name)
+        n = 2
+        while stem in taken or stem == MANIFEST.rsplit(".", 1)[0]:
+            stem, n = f"{base}-{n}", n + 1
+        filename = f"{stem}.{manifest['format']}"
+        manifest["shards"][class_name] = {"file": filename, "count": 0}
+        return filename
+
+    def signature(self):
+        """Stat signature over the manifest and every shard (changes on any write), as
+        ((None, manifest sig), (class, shard sig), ...)"""
+        sig = []
+        manifest = self.manifest()
+        paths = [(None, self.manifest_file)] + [(c, os.path.join(self.root_dir, e["file"]))
+                                               for c, e in manifest["shards"].items()]
+        for class_name, path in paths:
+            try:
+                st = os.stat(path)
+                sig.append((class_name, (st.st_mtime_ns, st.st_size)))
+            except OSError:
+                sig.append((class_name, None))
+        return tuple(sig)
+
+    # Shard IO
+    def shard_paths(self):
+        """[(class, shard path)] in class-list order"""
+        manifest = self.manifest()
+        return [(c, os.path.join(self.root_dir, manifest["shards"][c]["file"])) for c in self.ordered_classes(manifest)]
+
+    def load_shard(self, class_name):
+        """A class's students as fresh dicts"""
+        entry = self.manifest()["shards"].get(class_name)
+        if not entry:
+            return []
+        try:
+            return storage_format.load(os.path.join(self.root_dir, entry["file"])).get("students", [])
+        except (FileNotFoundError, *storage_format.DECODE_ERRORS) as e:
+            print(f"Error reading student shard {entry['file']}: {e}")
+            return []
+
+    def _save_shard(self, manifest, class_name, students):
+        filename = self._shard_file(manifest, class_name)
+        self._write(os.path.join(self.root_dir, filename), {"class": class_name, "students": students},
+                    _format_of(filename))
+        manifest["shards"][class_name]["count"] = len(students)
+        self._cache.pop(class_name, None)
+        self._encoded.pop(class_name, None)
+
+    def _shard_signature(self, class_name):
+        """(file, (mtime_ns, size)) of a class's shard, or None if it has none"""
+        entry = self.manifest()["shards"].get(class_name)
+        if not entry:
+            return None
+        try:
+            st = os.stat(os.path.join(self.root_dir, entry["file"]))
+        except OSError:
+            return None
+        return entry["file"], (st.st_mtime_ns, st.st_size)
+
+    def records(self, class_name):
+        """A class's students as shared Student records (read-only), cached per shard file"""
+        current = self._shard_signature(class_name)
+        if current is None:
+            return []
+        cached = self._cache.get(class_name)
+        if cached and cached[:2] == current:
+            return cached[2]
+        rows = [Student.from_dict(d) for d in self.load_shard(class_name)]
+        self._cache[class_name] = current + (rows,)
+        return rows
+
+    def encoded(self, class_name):
+        """A class's students as an encoded JSON array, re-encoded only when the shard changes"""
+        current = self._shard_signature(class_name)
+        if current is None:
+            return b"[]"
+        cached = self._encoded.get(class_name)
+        if cached and cached[:2] == current:
+            return cached[2]
+        data = json_codec.dumps(self.load_shard(class_name))
+        self._encoded[class_name] = current + (data,)
+        return data
+
+    def cache_bytes(self):
+        """On-disk size of the cached shards plus the cached encodings (a rough memory measure)"""
+        return (sum(sig[1] for _, sig, _ in list(self._cache.values()))
+                + sum(len(data) for _, _, data in list(self._encoded.values())))
+
+    def evict_cache(self):
+        """Drop every parsed shard and encoding; returns how many were held"""
+        count = len(self._cache) + len(self._encoded)
+        self._cache.clear()
+        self._encoded.clear()
+        return count
+
+    def encoded_all(self):
+        """Every student as one encoded JSON array, built from the per-shard encodings"""
+        return json_codec.join_arrays(self.encoded(c) for c in self.ordered_classes(self.manifest()))
+
+    def ordered_classes(self, manifest):
+        """Classes with a shard: the class list's order, then any unlisted ones"""
+        listed = [c for c in manifest["classes"] if c in manifest["shards"]]
+        return listed + sorted(c for c in manifest["shards"] if c not in manifest["classes"])
+
+    def iter_records(self):
+        """Every student, class by class in class-list order"""
+        for class_name in self.ordered_classes(self.manifest()):
+            yield from self.records(class_name)
+
+    def get(self, student_id):
+        class_name = self.class_of(student_id)
+        if class_name is None:
+            return None
+        return next((s for s in self.records(class_name) if s.id == student_id), None)
+
+    # Writes
+    def add_class(self, class_name):
+        with self._manifest_lock:
+            manifest = self.manifest()
+            if class_name in manifest["classes"]:
+                return False
+            manifest["classes"].append(class_name)
+            self._save_manifest(manifest)
+            return True
+
+    def add(self, student):
+        """Add a student (its "id" is allocated here); returns the new id"""
+        class_name = student.get("class") or UNASSIGNED
+        with self._locked([class_name]):
+            manifest = self.manifest()
+            new_id = self.sequences.next_id("students") if self.sequences else manifest["next_id"]
+            student["id"] = new_id
+            if class_name and class_name not in manifest["classes"]:
+                manifest["classes"].append(class_name)
+            students = self.load_shard(class_name)
+            students.append(student)
+            self._save_shard(manifest, class_name, students)
+            manifest["index"][str(new_id)] = class_name
+            manifest["next_id"] = max(manifest["next_id"], new_id + 1)
+            self._save_manifest(manifest)
+            return new_id
+
+    def update(self, student_id, update, saved=None):
+        """Run update(student_dict) on one student inside its shard's lock and save the shard
+        if it returns True; saved(student_dict), if given, runs after the save with the lock
+        still held. Returns the updated dict, or None if not found/unchanged."""
+        with self._locked_student(student_id, manifest=False) as class_name:
+            if class_name is None:
+                return None
+            students = self.load_shard(class_name)
+            student = next((s for s in students if s.get("id") == student_id), None)
+            if student is None or not update(student):
+                return None
+            self._save_shard(self.manifest(), class_name, students)
+            if saved:
+                saved(student)
+            return student
+
+    def update_shard(self, class_name, update):
+        """Run update(students) on a whole shard and save it if it returns True (edits
+        students in place; the manifest lock is only taken if the shard is new or its
+        count changed)"""
+        with self._locked([class_name], manifest=False):
+            students = self.load_shard(class_name)
+            if not update(students):
+                return False
+            manifest = self.manifest()
+            entry = manifest["shards"].get(class_name)
+            if entry and entry.get("count") == len(students):
+                self._save_shard(manifest, class_name, students)
+                return True
+            with self._manifest_lock:
+                manifest = self.manifest()
+                self._save_shard(manifest, class_name, students)
+                self._save_manifest(manifest)
+            return True
+
+    def remove(self, student_id):
+        with self._locked_student(student_id) as class_name:
+            if class_name is None:
+                return False
+            manifest = self.manifest()
+            students = [s for s in self.load_shard(class_name) if s.get("id") != student_id]
+            self._save_shard(manifest, class_name, students)
+            manifest["index"].pop(str(student_id), None)
+            self._save_manifest(manifest)
+            return True
+
+    def move(self, student_id, new_class, updates=None):
+        """Transfer a student to another class (shard), applying updates on the way"""
+        new_class = new_class or UNASSIGNED
+        with self._locked_student(student_id, also=new_class) as old_class:
+            if old_class is None:
+                return False
+            manifest = self.manifest()
+            source = self.load_shard(old_class)
+            student = next((s for s in source if s.get("id") == student_id), None)
+            if student is None:
+                return False
+            student.update(updates or {})
+            student["class"] = new_class
+            if old_class == new_class:
+                self._save_shard(manifest, old_class, source)
+            else:
+                target = self.load_shard(new_class)
+                target.append(student)
+                self._save_shard(manifest, new_class, target)
+                self._save_shard(manifest, old_class, [s for s in source if s.get("id") != student_id])
+            if new_class and new_class not in manifest["classes"]:
+                manifest["classes"].append(new_class)
+            manifest["index"][str(student_id)] = new_class
+            self._save_manifest(manifest)
+            return True
+
+    def replace_all(self, students, classes=None):
+        """Rewrite every shard from a full student list (migration, import, rollover).
+        Shards of classes left empty are kept, empty, so the class list stays intact."""
+        with self._locked_all(s.get("class") or UNASSIGNED for s in students):
+            manifest = self.manifest()
+            if classes is not None:
+                manifest["classes"] = list(classes)
+            by_class = {c: [] for c in manifest["shards"]}
+            for student in students:
+                class_name = student.get("class") or UNASSIGNED
+                by_class.setdefault(class_name, []).append(student)
+                if class_name and class_name not in manifest["classes"]:
+                    manifest["classes"].append(class_name)
+            for class_name, members in by_class.items():
+                self._save_shard(manifest, class_name, members)
+            manifest["index"] = {str(s.get("id")): s.get("class") or UNASSIGNED for s in students}
+            manifest["next_id"] = max([manifest["next_id"]] + [int(s.get("id") or 0) + 1 for s in students])
+            self._save_manifest(manifest)
+            if self.sequences:
+                self.sequences.advance("students", manifest["next_id"] - 1)
+            return True
+
+    def convert(self, fmt):
+        """Rewrite every shard in fmt (renaming it to the matching extension) and make it
+        the format for new shards; returns the number of shards rewritten"""
+        if fmt not in storage_format.FORMATS:
+            raise ValueError(f"format must be one of {storage_format.FORMATS}")
+        converted = 0
+        with self._locked_all():
+            manifest = self.manifest()
+            manifest["format"] = fmt
+            removed = []
+            for class_name, entry in manifest["shards"].items():
+                if _format_of(entry["file"]) == fmt:
+                    continue
+                students = self.load_shard(class_name)
+                removed.append(entry["file"])
+                entry["file"] = f"{entry['file'].rsplit('.', 1)[0]}.{fmt}"
+                self._save_shard(manifest, class_name, students)
+                converted += 1
+            self._save_manifest(manifest)
+            for filename in removed:
+                try:
+                    os.remove(os.path.join(self.root_dir, filename))
+                except OSError:
+                    pass
+        return converted
+
+    def migrate_from(self, legacy_file):
+        """Split a monolithic students.json into shards and move it aside as
+        students.json.migrated; returns the number of students migrated"""
+        data = storage_format.load(legacy_file)
+        students = data.get("students", [])
+        self.replace_all(students, data.get("classes", []))
+        os.replace(legacy_file, legacy_file + ".migrated")
+        return len(students)
@@ -0,0 +1,189 @@
+# tenant_pool.py - several schools served from one process, one DataHandler each
+# Each school's data lives in its own directory under a root ("schools/<school id>/",
+# laid out like data/). TenantPool opens a school's DataHandler, managers, report
+# generator and maintenance scheduler on first use and keeps at most max_tenants
+# open: beyond that the least recently used school with no request in flight is
+# closed, as is any school idle for longer than idle_seconds. After each request the
+# school's parsed-record caches are measured against cache_budget_mb and trimmed if
+# over. The API picks the school from the X-School-ID header or a /schools/<id>/
+# path prefix (see SchoolPrefixMiddleware and api_server.create_app(tenant_pool=...)).
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+
+HEADER = "X-School-ID"
+PATH_PREFIX = "/schools/"
+ENVIRON_KEY = "sis.school_id"
+SCHOOL_ID_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$")
+
+
+class UnknownSchool(LookupError):
+    """No data directory for this school id (or the id is malformed)"""
+
+
+class Tenant:
+    """One open school: its DataHandler and everything built on it"""
+    __slots__ = ("school_id", "data_handler", "student_manager", "admin_manager", "report_generator",
+                 "scheduler", "active", "last_used")
+
+    def __init__(self, school_id, data_handler, student_manager, admin_manager, report_generator, scheduler=None):
+        self.school_id = school_id
+        self.data_handler = data_handler
+        self.student_manager = student_manager
+        self.admin_manager = admin_manager
+        self.report_generator = report_generator
+        self.scheduler = scheduler
+        self.active = 0  # requests in flight
+        self.last_used = time.monotonic()
+
+    def close(self):
+        if self.scheduler:
+            self.scheduler.stop()
+        self.data_handler.notifier.stop()
+
+
+def open_tenant(school_id, data_dir, reports_dir, maintenance=True):
+    # Imported here: the backend modules pull in pandas/fpdf, which callers that only
+    # need the middleware shouldn't pay for
+    from data_handler import DataHandler
+    from student_manager import StudentManager
+    from admin_manager import AdminManager
+    from report_generator import ReportGenerator
+    from maintenance import create_scheduler
+
+    data_handler = DataHandler(data_dir)
+    data_handler.start_change_watcher()
+    student_manager = StudentManager(data_handler)
+    scheduler = None
+    if maintenance:
+        scheduler = create_scheduler(data_handler, reports_dir=reports_dir)
+        scheduler.start()
+    return Tenant(school_id, data_handler, student_manager, AdminManager(data_handler, student_manager),
+                  ReportGenerator(data_handler, reports_dir), scheduler)
+
+
+class TenantPool:
+    def __init__(self, root_dir="schools", max_tenants=16, idle_seconds=1800, cache_budget_mb=64,
+                 reports_root="reports", maintenance=True, opener=open_tenant):
+        self.root_dir = root_dir
+        self.max_tenants = max_tenants
+        self.idle_seconds = idle_seconds
+        self.cache_budget = cache_budget_mb * 2**20 if cache_budget_mb else None
+        self.reports_root = reports_root
+        self.maintenance = maintenance
+        self.opener = opener
+        self._tenants = OrderedDict()  # school id -> Tenant, least recently used first
+        self._lock = threading.Lock()
+        self._opening = {}  # school id -> lock held while its DataHandler is built
+        os.makedirs(root_dir, exist_ok=True)
+
+    # Schools
+    def data_dir(self, school_id):
+        if not isinstance(school_id, str) or not SCHOOL_ID_RE.match(school_id):
+            raise UnknownSchool(f"Invalid school id {school_id!r}")
+        return os.path.join(self.root_dir, school_id)
+
+    def schools(self):
+        """Ids of every school with a data directory"""
+        return sorted(name for name in os.listdir(self.root_dir)
+                      if SCHOOL_ID_RE.match(name) and os.path.isdir(os.path.join(self.root_dir, name)))
+
+    def create_school(self, school_id):
+        """Add a school (an empty data directory; its files are created on first open)"""
+        path = self.data_dir(school_id)
+        if os.path.isdir(path):
+            return False
+        os.makedirs(path)
+        return True
+
+    # Checkout
+    def acquire(self, school_id):
+        """Open (or reuse) a school's Tenant and mark a request in flight; pair with release()"""
+        path = self.data_dir(school_id)
+        with self._lock:
+            tenant = self._checkout(school_id)
+            if tenant is None:
+                opening = self._opening.setdefault(school_id, threading.Lock())
+        if tenant is None:
+            # Built outside the pool lock so one school's first load doesn't stall the rest
+            with opening:
+                with self._lock:
+                    tenant = self._checkout(school_id)
+                if tenant is None:
+                    if not os.path.isdir(path):
+                        raise UnknownSchool(f"Unknown school {school_id!r}")
+                    tenant = self.opener(school_id, path, os.path.join(self.reports_root, school_id), self.maintenance)
+                    with self._lock:
+                        tenant.active += 1
+                        self._tenants[school_id] = tenant
+                        self._opening.pop(school_id, None)
+        with self._lock:
+            tenant.last_used = time.monotonic()
+            self._tenants.move_to_end(school_id)
+            closed = self._evict()
+        for old in closed:
+            old.close()
+        return tenant
+
+    def _checkout(self, school_id):
+        # Counted in the same locked step as the lookup, so _evict can't close it in between
+        tenant = self._tenants.get(school_id)
+        if tenant is not None:
+            tenant.active += 1
+        return tenant
+
+    def retain(self, tenant):
+        """One more user of a tenant that is already checked out (e.g. a stream that
+        outlives its request); pair with release()"""
+        with self._lock:
+            tenant.active += 1
+
+    def release(self, tenant):
+        with self._lock:
+            tenant.active -= 1
+            tenant.last_used = time.monotonic()
+        if self.cache_budget and tenant.data_handler.cache_bytes() > self.cache_budget:
+            tenant.data_handler.trim_caches()
+
+    def _evict(self):
+        """Drop idle-too-long and over-limit tenants (never one with a request in flight);
+        returns them for closing outside the lock"""
+        closed = []
+        now = time.monotonic()
+        for school_id, tenant in list(self._tenants.items()):
+            if len(self._tenants) > self.max_tenants or (self.idle_seconds and now - tenant.last_used > self.idle_seconds):
+                if tenant.active == 0:
+                    closed.append(self._tenants.pop(school_id))
+        return closed
+
+    def stats(self):
+        with self._lock:
+            tenants = list(self._tenants.values())
+        return [{"school_id": t.school_id, "active": t.active, "idle_seconds": round(time.monotonic() - t.last_used, 1),
+                 "cache_bytes": t.data_handler.cache_bytes()} for t in tenants]
+
+    def close(self):
+        with self._lock:
+            tenants = list(self._tenants.values())
+            self._tenants.clear()
+        for tenant in tenants:
+            tenant.close()
+
+
+class SchoolPrefixMiddleware:
+    """WSGI wrapper: /schools/<id>/api/... is served as /api/... with the school id
+    in the environ (where api_server looks before the X-School-ID header)"""
+    def __init__(self, app, prefix=PATH_PREFIX):
+        self.app = app
+        self.prefix = prefix
+
+    def __call__(self, environ, start_response):
+        path = environ.get("PATH_INFO", "")
+        if path.startswith(self.prefix):
+            school_id, _, rest = path[len(self.prefix):].partition("/")
+            environ[ENVIRON_KEY] = school_id
+            environ["SCRIPT_NAME"] = environ.get("SCRIPT_NAME", "") + self.prefix + school_id
+            environ["PATH_INFO"] = "/" + rest
+        return self.app(environ, start_response)
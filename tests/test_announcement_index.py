@@ -0,0 +1,56 @@
+import json
+
+from announcement_index import AnnouncementIndex
+
+
+class FakeNotifier:
+    def notify_write(self, path):
+        pass
+
+
+class FakeDataHandler:
+    """What AnnouncementIndex reads from DataHandler (which itself needs pandas)"""
+    def __init__(self, tmp_path, announcements):
+        self.dashboard_file = str(tmp_path / "dashboard.json")
+        self.notifier = FakeNotifier()
+        with open(self.dashboard_file, "w") as f:
+            json.dump({"announcements": announcements, "events": []}, f)
+
+    def load_json(self, path):
+        with open(path) as f:
+            return json.load(f)
+
+
+def _index(tmp_path, ids=(2, 12)):
+    handler = FakeDataHandler(tmp_path, [{"id": i, "date": f"2024-01-{i:02d}", "visible_to": ["All"]} for i in ids])
+    return AnnouncementIndex(handler, str(tmp_path / "announcement_reads.log"))
+
+
+def test_receipts_are_read_back_once(tmp_path):
+    index = _index(tmp_path)
+    assert index.mark_read(7, [12, 12]) == 1
+    assert index.mark_read(7, [12, 2]) == 1
+    assert index.unread_count(7) == 0 and index.unread_count(8) == 2
+    assert index.read_count(12) == 1
+
+
+def test_log_with_crlf_lines_keeps_byte_offsets(tmp_path):
+    # Receipts appended in text mode on Windows end in \r\n on disk
+    index = _index(tmp_path)
+    for _ in range(4):
+        with open(tmp_path / "announcement_reads.log", "ab") as f:
+            f.write(b"12,7\r\n" * 4)
+        assert index.read_count(12) == 1
+    # Reading from a short offset would start mid-line and take "2,7" for a receipt
+    assert index.read_count(2) == 0
+    assert index.unread_count(7) == 1
+
+
+def test_partly_written_line_waits_for_its_newline(tmp_path):
+    index = _index(tmp_path)
+    with open(tmp_path / "announcement_reads.log", "ab") as f:
+        f.write(b"12,7\n2,")
+    assert index.read_count(12) == 1 and index.read_count(2) == 0
+    with open(tmp_path / "announcement_reads.log", "ab") as f:
+        f.write(b"7\n")
+    assert index.read_count(2) == 1
@@ -0,0 +1,45 @@
+import os
+
+from backup_store import BackupStore
+
+
+def _write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def _read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def test_restore_returns_data_to_the_snapshot(tmp_path):
+    data = str(tmp_path / "data")
+    _write(os.path.join(data, "employees.json"), '{"employees": []}')
+    _write(os.path.join(data, "attendance", "2024-01.json"), '{"attendance": []}')
+    store = BackupStore(data)
+    snapshot_id = store.create_snapshot()["id"]
+
+    # Written after the snapshot: an edit, a new month, a new photo, and a dot-file
+    _write(os.path.join(data, "employees.json"), '{"employees": [{"id": 1}]}')
+    _write(os.path.join(data, "attendance", "2024-02.json"), '{"attendance": [{"employee_id": 1}]}')
+    _write(os.path.join(data, "photos", "new.jpg"), "jpeg")
+    _write(os.path.join(data, ".maintenance.json"), "{}")
+
+    store.restore(snapshot_id, remove_extra=True)
+    assert _read(os.path.join(data, "employees.json")) == '{"employees": []}'
+    assert _read(os.path.join(data, "attendance", "2024-01.json")) == '{"attendance": []}'
+    assert not os.path.exists(os.path.join(data, "attendance", "2024-02.json"))
+    assert not os.path.exists(os.path.join(data, "photos", "new.jpg"))
+    assert os.path.exists(os.path.join(data, ".maintenance.json"))
+    assert store.snapshots() == [snapshot_id]
+
+
+def test_restore_elsewhere_keeps_extra_files(tmp_path):
+    data, target = str(tmp_path / "data"), str(tmp_path / "copy")
+    _write(os.path.join(data, "settings.json"), "{}")
+    _write(os.path.join(target, "other.json"), "{}")
+    store = BackupStore(data)
+    assert store.restore(store.create_snapshot()["id"], target_dir=target, remove_extra=True) == 1
+    assert os.path.exists(os.path.join(target, "other.json"))
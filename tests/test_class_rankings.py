@@ -0,0 +1,87 @@
+from change_notifier import ChangeNotifier
+from class_rankings import ClassRankings
+from student_shards import StudentShards
+
+
+class FakeDataHandler:
+    """What ClassRankings reads from DataHandler (which itself needs pandas)"""
+    def __init__(self, root):
+        self.notifier = ChangeNotifier(str(root), poll_interval=60)
+        self.student_shards = StudentShards(str(root / "students"), on_write=self.notifier.notify_write)
+        self.signatures = 0
+
+    def students_signature(self):
+        self.signatures += 1
+        return self.student_shards.signature()
+
+    def get_all_students(self):
+        return [s for c in self.student_shards.classes() for s in self.student_shards.load_shard(c)]
+
+    def set_score(self, rankings, student_id, score):
+        """DataHandler.update_student_results' protocol"""
+        was_current = False
+
+        def update(s):
+            nonlocal was_current
+            was_current = rankings.expect_write()
+            s.setdefault("academic_results", {}).setdefault("T1", {})["Math"] = score
+            return True
+        return self.student_shards.update(
+            student_id, update, saved=lambda s: rankings.record_score(s, "T1", "Math", score, was_current))
+
+
+def _setup(tmp_path):
+    handler = FakeDataHandler(tmp_path)
+    handler.student_shards.replace_all(
+        [{"id": i, "name": f"s{i}", "class": "A" if i <= 3 else "B", "academic_results": {"T1": {"Math": i * 10}}}
+         for i in range(1, 7)], ["A", "B"])
+    return handler, ClassRankings(handler)
+
+
+def test_incremental_update(tmp_path):
+    handler, rankings = _setup(tmp_path)
+    assert rankings.position(1, "T1")["rank"] == 3
+    handler.set_score(rankings, 1, 99)
+    assert rankings.position(1, "T1")["label"] == "1st of 3"
+    assert rankings.class_table("A", "T1")[0] == (1, 1, 99)
+
+
+def test_write_to_another_class_between_check_and_update(tmp_path):
+    handler, rankings = _setup(tmp_path)
+    rankings.position(1, "T1")
+    was_current = rankings.expect_write()
+    # Lands after the check, before our save: the rankings must not be marked current
+    handler.student_shards.update(4, lambda s: s["academic_results"]["T1"].update(Math=100) or True)
+
+    def update(s):
+        s["academic_results"]["T1"]["Math"] = 99
+        return True
+    handler.student_shards.update(1, update, saved=lambda s: rankings.record_score(s, "T1", "Math", 99, was_current))
+    assert rankings.position(4, "T1")["rank"] == 1
+    assert rankings.position(1, "T1")["rank"] == 1
+
+
+def test_unranked_edit_to_the_same_class_is_not_hidden(tmp_path):
+    handler, rankings = _setup(tmp_path)
+    rankings.position(1, "T1")
+    # A write that doesn't go through the rankings (e.g. an edit form)
+    handler.student_shards.update(2, lambda s: s["academic_results"]["T1"].update(Math=100) or True)
+    handler.set_score(rankings, 1, 50)
+    assert rankings.position(2, "T1")["rank"] == 1
+    assert rankings.position(1, "T1")["rank"] == 2
+
+
+def test_reads_skip_the_signature_while_the_watcher_runs(tmp_path):
+    handler, rankings = _setup(tmp_path)
+    handler.notifier.start()
+    try:
+        rankings.position(1, "T1")
+        handler.signatures = 0
+        for _ in range(50):
+            rankings.position(1, "T1")
+        assert handler.signatures == 0
+        handler.student_shards.update(5, lambda s: s["academic_results"]["T1"].update(Math=1) or True)
+        assert rankings.position(5, "T1")["rank"] == 3
+        assert handler.signatures == 1
+    finally:
+        handler.notifier.stop()
@@ -0,0 +1,79 @@
+import json
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from id_sequences import IdSequences
+
+
+def _allocate(path, count):
+    sequences = IdSequences(path)
+    return [sequences.next_id("students") for _ in range(count)]
+
+
+def test_threads_never_share_an_id(tmp_path):
+    sequences = IdSequences(str(tmp_path / "sequences.json"))
+    ids, lock = [], threading.Lock()
+
+    def allocate():
+        got = [sequences.next_id("students") for _ in range(50)]
+        with lock:
+            ids.extend(got)
+
+    threads = [threading.Thread(target=allocate) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(30)
+    assert sorted(ids) == list(range(1, 401))
+    assert sequences.last("students") == 400
+
+
+def test_processes_never_share_an_id(tmp_path):
+    path = str(tmp_path / "sequences.json")
+    with ProcessPoolExecutor(4) as pool:
+        batches = list(pool.map(_allocate, [path] * 4, [25] * 4))
+    ids = [i for batch in batches for i in batch]
+    assert sorted(ids) == list(range(1, 101))
+
+
+def test_reserve_hands_out_consecutive_blocks(tmp_path):
+    sequences = IdSequences(str(tmp_path / "sequences.json"))
+    assert sequences.reserve("employees", 10) == 1
+    assert sequences.next_id("employees") == 11
+    assert sequences.reserve("employees", 5) == 12
+    with pytest.raises(ValueError):
+        sequences.reserve("employees", 0)
+
+
+def test_seeded_once_from_existing_data(tmp_path):
+    calls = []
+
+    def seed():
+        calls.append(1)
+        return 41
+
+    sequences = IdSequences(str(tmp_path / "sequences.json"), seeds={"employees": seed})
+    assert sequences.next_id("employees") == 42
+    assert sequences.next_id("employees") == 43
+    assert calls == [1]
+    # Collections keep their own counters
+    assert sequences.next_id("announcements") == 1
+
+
+def test_ids_are_not_reused_after_a_reload(tmp_path):
+    path = str(tmp_path / "sequences.json")
+    IdSequences(path, seeds={"students": lambda: 5}).next_id("students")
+    # The seed has gone down (e.g. the newest student was deleted); the file wins
+    assert IdSequences(path, seeds={"students": lambda: 0}).next_id("students") == 7
+    with open(path) as f:
+        assert json.load(f) == {"students": 7}
+
+
+def test_advance_skips_ids_written_elsewhere(tmp_path):
+    sequences = IdSequences(str(tmp_path / "sequences.json"))
+    sequences.next_id("students")
+    sequences.advance("students", 20)
+    sequences.advance("students", 3)  # never moves backwards
+    assert sequences.next_id("students") == 21
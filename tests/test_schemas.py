@@ -0,0 +1,39 @@
+import json
+
+import schemas
+from records import AttendanceRecord, Student
+
+
+def _payload(kind, items):
+    return json.dumps({schemas.LIST_KEYS[kind]: items}).encode()
+
+
+def test_valid_records_decode_to_the_records_models():
+    decoded = schemas.decode("students", _payload("students", [{"id": 1, "name": "a", "class": "Grade 1", "house": "Red"}]))
+    assert decoded.errors == []
+    [student] = decoded.records
+    assert type(student) is Student
+    assert (student.class_name, student.get("age", 0)) == ("Grade 1", 0)
+    # Unknown keys are kept and missing ones stay missing
+    assert student.to_dict() == {"id": 1, "name": "a", "class": "Grade 1", "house": "Red"}
+
+
+def test_invalid_records_are_reported_and_skipped():
+    rows = [{"employee_id": 1, "date": "2024-01-02", "status": "Present"},
+            {"employee_id": "1", "date": "2024-01-03"},
+            {"employee_id": True, "date": "2024-01-04"},
+            {"employee_id": 2},
+            "row"]
+    decoded = schemas.decode("attendance", _payload("attendance", rows), "attendance/2024-01.json")
+    assert [type(r) for r in decoded.records] == [AttendanceRecord]
+    assert [(e.index, e.record_id) for e in decoded.errors] == [(1, ("1", "2024-01-03")), (2, (True, "2024-01-04")),
+                                                                (3, (2, None)), (4, None)]
+    assert "`$.employee_id`" in decoded.errors[0].message
+    assert "`date`" in decoded.errors[2].message
+
+
+def test_collections_without_a_model_stay_dicts():
+    item = {"id": 3, "title": "t", "visible_to": ["All"]}
+    decoded = schemas.decode("announcements", _payload("announcements", [item]))
+    assert decoded.records == [item] and decoded.errors == []
+    assert schemas.decode("announcements", b'{"announcements": 5}').errors[0].index is None
@@ -0,0 +1,73 @@
+import gc
+from datetime import date
+
+from attendance_store import AttendanceStore
+from change_notifier import ChangeNotifier
+from snapshots import SnapshotManager
+from student_shards import StudentShards
+
+
+class FakeDataHandler:
+    """The parts of DataHandler a SnapshotManager reads (DataHandler itself needs pandas)"""
+    def __init__(self, root):
+        self.notifier = ChangeNotifier(str(root))
+        self.student_shards = StudentShards(str(root / "students"))
+        self.attendance = AttendanceStore(str(root / "attendance"))
+        self.employees = []
+
+    def employee_records(self):
+        return self.employees
+
+
+def _setup(tmp_path):
+    handler = FakeDataHandler(tmp_path)
+    handler.student_shards.replace_all([{"id": i, "name": f"s{i}", "class": f"Grade {i % 2}"} for i in range(1, 7)],
+                                       ["Grade 0", "Grade 1"])
+    handler.attendance.add_rows([{"employee_id": 1, "date": "2024-01-15", "status": "Present"},
+                                 {"employee_id": 1, "date": "2024-02-15", "status": "Present"}])
+    handler.attendance.seal_closed_months(date(2024, 2, 20))
+    return handler, SnapshotManager(handler)
+
+
+def test_held_snapshot_does_not_see_later_writes(tmp_path):
+    handler, manager = _setup(tmp_path)
+    before = manager.current()
+    handler.student_shards.move(1, "Grade 0")
+    after = manager.current()
+    assert after.version > before.version
+    assert [s.id for s in before.students_in("Grade 1")] == [1, 3, 5]
+    assert [s.id for s in after.students_in("Grade 1")] == [3, 5]
+    assert len(before.students) == len(after.students) == 6
+
+
+def test_unchanged_classes_are_shared_between_versions(tmp_path):
+    handler, manager = _setup(tmp_path)
+    before = manager.current()
+    handler.student_shards.update(2, lambda s: s.update(name="renamed") or True)
+    after = manager.current()
+    assert after.students_in("Grade 1") is before.students_in("Grade 1")
+    assert after.students_in("Grade 0") is not before.students_in("Grade 0")
+
+
+def test_replaced_sealed_month_is_kept_while_a_snapshot_names_it(tmp_path):
+    handler, manager = _setup(tmp_path)
+    store = handler.attendance
+    held = manager.current()
+    old_file = held.sealed_months["2024-01"]
+    store.update_month("2024-01", lambda rows: rows.append({"employee_id": 2, "date": "2024-01-20"}) or True)
+    assert store.manifest()["segments"]["2024-01"]["file"] != old_file
+    assert [r.employee_id for r in held.attendance("2024-01-01", "2024-01-31")] == [1]
+    assert [r.employee_id for r in manager.current().attendance("2024-01-01", "2024-01-31")] == [1, 2]
+    del held
+    gc.collect()
+    assert not manager.retains(old_file)
+    assert store.collect_replaced() == 1
+
+
+def test_attendance_range_with_malformed_dates_reads_every_month(tmp_path):
+    _, manager = _setup(tmp_path)
+    snapshot = manager.current()
+    assert len(list(snapshot.attendance())) == 2
+    assert list(snapshot.attendance("a", "b")) == []
+    # Not a ValueError: every month is read and rows are compared as strings
+    assert len(list(snapshot.attendance("2024-01-01", "2024-1-31"))) == 2
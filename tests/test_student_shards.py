@@ -0,0 +1,116 @@
+import threading
+import time
+
+from student_shards import StudentShards
+
+
+def _shards(tmp_path):
+    shards = StudentShards(str(tmp_path / "students"))
+    shards.replace_all([{"id": i, "name": f"s{i}", "class": f"Grade {i % 3}", "score": 0} for i in range(1, 31)],
+                       ["Grade 0", "Grade 1", "Grade 2"])
+    return shards
+
+
+def _run(*targets, timeout=30):
+    threads = [threading.Thread(target=t, daemon=True) for t in targets]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout)
+    return [t for t in threads if t.is_alive()]
+
+
+def test_updates_and_replace_all_do_not_deadlock(tmp_path):
+    shards = _shards(tmp_path)
+
+    def updates():
+        for n in range(200):
+            shards.update(1 + n % 30, lambda s: s.update(score=s["score"] + 1) or True)
+
+    def replaces():
+        for _ in range(20):
+            shards.replace_all([dict(s) for c in shards.classes() for s in shards.load_shard(c)])
+
+    assert _run(updates, replaces) == []
+    assert shards.count() == 30
+
+
+def test_moves_in_opposite_directions_do_not_deadlock(tmp_path):
+    shards = _shards(tmp_path)
+    a = next(s["id"] for s in shards.load_shard("Grade 1"))
+    b = next(s["id"] for s in shards.load_shard("Grade 2"))
+
+    def forth():
+        for n in range(50):
+            shards.move(a, "Grade 2" if n % 2 == 0 else "Grade 1")
+
+    def back():
+        for n in range(50):
+            shards.move(b, "Grade 1" if n % 2 == 0 else "Grade 2")
+
+    def convert():
+        for n in range(10):
+            shards.convert("json")
+
+    assert _run(forth, back, convert) == []
+    assert shards.count() == 30
+    assert sorted(int(i) for i in shards.manifest()["index"]) == list(range(1, 31))
+
+
+def test_move_within_the_same_class_applies_updates(tmp_path):
+    shards = _shards(tmp_path)
+    assert shards.move(3, "Grade 0", {"name": "renamed"})
+    assert shards.class_of(3) == "Grade 0"
+    assert shards.get(3).name == "renamed"
+    assert shards.count() == 30
+
+
+def test_concurrent_adds_get_distinct_ids(tmp_path):
+    shards = _shards(tmp_path)
+    ids = []
+
+    def adds():
+        for _ in range(25):
+            ids.append(shards.add({"name": "new", "class": "Grade 1"}))
+
+    assert _run(adds, adds, adds) == []
+    assert len(set(ids)) == 75
+    assert shards.count() == 105
+
+
+def test_edits_to_different_classes_run_at_the_same_time(tmp_path):
+    shards = _shards(tmp_path)
+    # Each edit waits inside its shard's lock until the other one is in its own
+    both_inside = threading.Barrier(2, timeout=5)
+
+    def edit(student_id):
+        def update(student):
+            both_inside.wait()
+            student["score"] = 1
+            return True
+        return lambda: shards.update(student_id, update)
+
+    assert _run(edit(1), edit(2)) == []  # students 1 and 2 are in Grade 1 and Grade 2
+    assert not both_inside.broken
+    assert [s["score"] for s in shards.load_shard("Grade 1") + shards.load_shard("Grade 2") if s["id"] in (1, 2)] == [1, 1]
+
+
+def test_update_follows_a_student_moved_while_it_waited(tmp_path):
+    shards = _shards(tmp_path)
+    started = threading.Event()
+    results = []
+
+    def update():
+        started.set()
+        results.append(shards.update(4, lambda s: s.update(name="renamed") or True))
+
+    with shards._shard_lock("Grade 1"):
+        thread = threading.Thread(target=update, daemon=True)
+        thread.start()
+        started.wait(5)
+        time.sleep(0.1)  # let it look up the class and block on the lock
+        assert shards.move(4, "Grade 0")  # same thread, so the held lock is re-entered
+    thread.join(5)
+    assert results and results[0] is not None
+    assert shards.class_of(4) == "Grade 0"
+    assert shards.get(4).name == "renamed"
@@ -0,0 +1,127 @@
+import pytest
+
+from tenant_pool import ENVIRON_KEY, SchoolPrefixMiddleware, TenantPool, UnknownSchool
+
+
+class FakeDataHandler:
+    def __init__(self):
+        self.trimmed = 0
+
+    def cache_bytes(self):
+        return 10 * 2**20
+
+    def trim_caches(self):
+        self.trimmed += 1
+
+
+class FakeTenant:
+    def __init__(self, school_id):
+        self.school_id = school_id
+        self.data_handler = FakeDataHandler()
+        self.active = 0
+        self.last_used = 0
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def _pool(tmp_path, schools="abc", **kwargs):
+    opened = []
+
+    def opener(school_id, data_dir, reports_dir, maintenance):
+        opened.append(school_id)
+        return FakeTenant(school_id)
+
+    kwargs.setdefault("idle_seconds", 0)
+    pool = TenantPool(str(tmp_path / "schools"), reports_root=str(tmp_path / "reports"), opener=opener, **kwargs)
+    for school_id in schools:
+        pool.create_school(school_id)
+    return pool, opened
+
+
+def test_reuses_an_open_school(tmp_path):
+    pool, opened = _pool(tmp_path)
+    first = pool.acquire("a")
+    pool.release(first)
+    assert pool.acquire("a") is first
+    assert opened == ["a"]
+
+
+def test_unknown_and_malformed_schools(tmp_path):
+    pool, _ = _pool(tmp_path)
+    with pytest.raises(UnknownSchool):
+        pool.acquire("zz")
+    with pytest.raises(UnknownSchool):
+        pool.acquire("../a")
+
+
+def test_evicts_least_recently_used_idle_school(tmp_path):
+    pool, _ = _pool(tmp_path, max_tenants=2)
+    a, b = pool.acquire("a"), pool.acquire("b")
+    pool.release(a)
+    pool.release(b)
+    pool.release(pool.acquire("a"))  # a is now the most recently used
+    c = pool.acquire("c")
+    assert b.closed and not a.closed
+    assert [s["school_id"] for s in pool.stats()] == ["a", "c"]
+    pool.release(c)
+
+
+def test_never_evicts_a_school_in_use(tmp_path):
+    pool, _ = _pool(tmp_path, max_tenants=1)
+    a = pool.acquire("a")
+    b = pool.acquire("b")
+    assert not a.closed and not b.closed
+    pool.release(a)
+    pool.release(pool.acquire("c"))
+    assert a.closed and not b.closed
+
+
+def test_retained_school_stays_open_after_its_request(tmp_path):
+    pool, _ = _pool(tmp_path, max_tenants=1)
+    a = pool.acquire("a")
+    pool.retain(a)  # e.g. an event stream outliving the request
+    pool.release(a)
+    pool.release(pool.acquire("b"))
+    assert not a.closed
+    pool.release(a)
+    pool.release(pool.acquire("c"))
+    assert a.closed
+
+
+def test_idle_schools_are_closed(tmp_path):
+    pool, _ = _pool(tmp_path, idle_seconds=60)
+    a = pool.acquire("a")
+    pool.release(a)
+    a.last_used -= 120
+    pool.release(pool.acquire("b"))
+    assert a.closed
+
+
+def test_trims_caches_over_budget(tmp_path):
+    pool, _ = _pool(tmp_path, cache_budget_mb=1)
+    a = pool.acquire("a")
+    pool.release(a)
+    assert a.data_handler.trimmed == 1
+
+
+def test_close_closes_every_school(tmp_path):
+    pool, _ = _pool(tmp_path)
+    tenants = [pool.acquire(s) for s in "ab"]
+    pool.close()
+    assert all(t.closed for t in tenants) and pool.stats() == []
+
+
+def test_prefix_middleware_moves_school_to_environ():
+    seen = {}
+
+    def app(environ, start_response):
+        seen.update(environ)
+        return []
+
+    SchoolPrefixMiddleware(app)({"PATH_INFO": "/schools/a/api/students", "SCRIPT_NAME": ""}, None)
+    assert (seen["PATH_INFO"], seen["SCRIPT_NAME"], seen[ENVIRON_KEY]) == ("/api/students", "/schools/a", "a")
+    seen.clear()
+    SchoolPrefixMiddleware(app)({"PATH_INFO": "/api/students", "SCRIPT_NAME": ""}, None)
+    assert seen["PATH_INFO"] == "/api/students" and ENVIRON_KEY not in seen
@@ -0,0 +1,128 @@
+# thumbnail_cache.py - persistent photo thumbnails for the GUI photo grids
+# Thumbnails are written once to data/photos/.thumbs, named by the source file's
+# content hash and the thumbnail size, so they survive restarts and are shared by
+# every screen that shows the same photo at the same size. Tk PhotoImage objects
+# built from them are kept in a small LRU so revisiting a grade costs nothing.
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+    print("Warning: Pillow (PIL) not installed. Photo thumbnails will be disabled.")
+
+
+class ThumbnailCache:
+    def __init__(self, photos_dir, max_images=256):
+        self.photos_dir = photos_dir
+        self.thumbs_dir = os.path.join(photos_dir, ".thumbs")
+        self.max_images = max_images
+        self._hashes = {}            # abspath -> ((mtime_ns, size), sha1 hex)
+        self._images = OrderedDict() # (sha1, size) -> PhotoImage, most recently used last
+        self._lock = threading.Lock()
+
+    def content_hash(self, path):
+        """sha1 of the file contents, memoized on (mtime, size) so unchanged files are hashed once"""
+        st = os.stat(path)
+        sig = (st.st_mtime_ns, st.st_size)
+        key = os.path.abspath(path)
+        with self._lock:
+            cached = self._hashes.get(key)
+        if cached and cached[0] == sig:
+            return cached[1]
+        digest = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(65536), b""):
+                digest.update(chunk)
+        value = digest.hexdigest()
+        with self._lock:
+            self._hashes[key] = (sig, value)
+        return value
+
+    def thumbnail_file(self, source_path, size=(100, 100)):
+        """Return the path of the cached thumbnail for source_path, creating it if needed.
+
+        Safe to call from worker threads. Returns None if the photo cannot be read.
+        """
+        if not PIL_AVAILABLE or not source_path or not os.path.exists(source_path):
+            return None
+        try:
+            key = self.content_hash(source_path)
+            thumb_path = os.path.join(self.thumbs_dir, f"{key}_{size[0]}x{size[1]}.png")
+            if os.path.exists(thumb_path):
+                return thumb_path
+            os.makedirs(self.thumbs_dir, exist_ok=True)
+            with Image.open(source_path) as img:
+                img.thumbnail(size)
+                if img.mode not in ("RGB", "RGBA"):
+                    img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+                tmp = f"{thumb_path}.{threading.get_ident()}.tmp"
+                img.save(tmp, "PNG")
+            os.replace(tmp, thumb_path)
+            return thumb_path
+        except Exception as e:
+            print(f"Error creating thumbnail for {source_path}: {e}")
+            return None
+
+    def prune_orphans(self):
+        """Delete thumbnails whose source photo no longer exists (replaced or removed
+        photos leave theirs behind); returns how many were removed"""
+        if not os.path.isdir(self.thumbs_dir):
+            return 0
+        live = set()
+        for entry in os.scandir(self.photos_dir):
+            if entry.is_file() and not entry.name.startswith("."):
+                try:
+                    live.add(self.content_hash(entry.path))
+                except OSError:
+                    continue
+        removed = 0
+        for entry in os.scandir(self.thumbs_dir):
+            if entry.name.endswith(".png") and entry.name.split("_", 1)[0] not in live:
+                try:
+                    os.remove(entry.path)
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
+
+    def cached_photo(self, source_path, size=(100, 100)):
+        """PhotoImage already in the LRU for this photo/size, or None (Tk thread only)"""
+        if not source_path:
+            return None
+        try:
+            key = (self.content_hash(source_path), tuple(size))
+        except OSError:
+            return None
+        image = self._images.get(key)
+        if image is not None:
+            self._images.move_to_end(key)
+        return image
+
+    def photo_image(self, source_path, size=(100, 100)):
+        """Tk PhotoImage for source_path at size, or None if there is no photo or it
+        can't be read (Tk thread only)"""
+        if not source_path:
+            return None
+        image = self.cached_photo(source_path, size)
+        if image is not None:
+            return image
+        thumb_path = self.thumbnail_file(source_path, size)
+        if not thumb_path:
+            return None
+        try:
+            from PIL import ImageTk
+            with Image.open(thumb_path) as img:
+                image = ImageTk.PhotoImage(img)
+            key = (self.content_hash(source_path), tuple(size))
+        except Exception as e:
+            print(f"Error loading thumbnail for {source_path}: {e}")
+            return None
+        self._images[key] = image
+        while len(self._images) > self.max_images:
+            self._images.popitem(last=False)
+        return image
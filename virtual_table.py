@@ -0,0 +1,228 @@
+# virtual_table.py - Treeview wrapper that renders large row sets through a fixed window
+import tkinter as tk
+from tkinter import ttk
+
+
+class VirtualTable(tk.Frame):
+    """Scrollable table for large datasets.
+
+    The full dataset lives in a Python list; the ttk.Treeview only ever holds one
+    screenful of items, which are refilled with the rows at the scroll position as the
+    user scrolls (scrollbar, mouse wheel or keyboard). The scrollbar is sized against
+    the whole filtered dataset. Sorting (click a heading) and filtering run against the
+    list, so the widget's item count stays the same however many rows there are.
+    """
+
+    def __init__(self, parent, columns, rows=None, row_ids=None, height=15, column_widths=None,
+                 default_width=100, show_filter=False, on_activate=None, bg='#f0f0f0'):
+        super().__init__(parent, bg=bg)
+        self.columns = tuple(columns)
+        self.on_activate = on_activate
+        self._rows = []         # full dataset (tuples of display values)
+        self._row_ids = None    # optional caller ids, parallel to _rows
+        self._view = []         # indexes into _rows after filter + sort
+        self._top = 0           # position in _view of the first row shown
+        self._slots = height    # Treeview items (rows that fit on screen)
+        self._selected = None   # index into _rows of the selected row
+        self._sort_column = None
+        self._sort_reverse = False
+        self._filter_text = ""
+        self._filter_job = None
+        self._search_text = None  # lowercased row text, built on first filter
+
+        self.filter_var = None
+        self.count_label = None
+        if show_filter:
+            bar = tk.Frame(self, bg=bg)
+            bar.pack(fill='x', pady=(0, 5))
+            tk.Label(bar, text="Filter:", bg=bg).pack(side='left', padx=5)
+            self.filter_var = tk.StringVar()
+            tk.Entry(bar, textvariable=self.filter_var, width=30).pack(side='left')
+            self.count_label = tk.Label(bar, text="", bg=bg, fg='#555')
+            self.count_label.pack(side='right', padx=5)
+            self.filter_var.trace_add('write', lambda *args: self._schedule_filter())
+
+        body = tk.Frame(self, bg=bg)
+        body.pack(fill='both', expand=True)
+        self.tree = ttk.Treeview(body, columns=self.columns, show='headings', height=height, selectmode='browse')
+        self.scrollbar = ttk.Scrollbar(body, orient='vertical', command=self._on_scrollbar)
+        widths = column_widths or {}
+        for col in self.columns:
+            self.tree.heading(col, text=col, command=lambda c=col: self.sort_by(c))
+            self.tree.column(col, width=widths.get(col, default_width))
+        self.tree.pack(side='left', fill='both', expand=True)
+        self.scrollbar.pack(side='right', fill='y')
+        self.tree.bind('<<TreeviewSelect>>', lambda e: self._on_select())
+        self.tree.bind('<Configure>', lambda e: self._on_resize())
+        self.tree.bind('<MouseWheel>', lambda e: self._scroll(-3 if e.delta > 0 else 3))
+        self.tree.bind('<Button-4>', lambda e: self._scroll(-3))
+        self.tree.bind('<Button-5>', lambda e: self._scroll(3))
+        for key, step in (('<Up>', -1), ('<Down>', 1), ('<Prior>', -height), ('<Next>', height)):
+            self.tree.bind(key, lambda e, step=step: self._move_selection(step))
+        self.tree.bind('<Home>', lambda e: self._move_selection(-len(self._view)))
+        self.tree.bind('<End>', lambda e: self._move_selection(len(self._view)))
+        if on_activate:
+            self.tree.bind('<Double-1>', lambda e: self._activate(self.tree.identify_row(e.y)))
+
+        if rows is not None:
+            self.set_rows(rows, row_ids)
+
+    # Data
+    def set_rows(self, rows, row_ids=None):
+        """Replace the dataset; keeps the current sort column and filter"""
+        self._rows = [tuple(r) for r in rows]
+        self._row_ids = list(row_ids) if row_ids is not None else None
+        self._search_text = None
+        self._selected = None
+        self._refresh_view()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def selected_index(self):
+        return self._selected
+
+    def selected_values(self):
+        idx = self.selected_index()
+        return self._rows[idx] if idx is not None else None
+
+    def selected_id(self):
+        idx = self.selected_index()
+        if idx is None:
+            return None
+        return self._row_ids[idx] if self._row_ids is not None else idx
+
+    # Sorting / filtering (against the dataset, not the widget)
+    def sort_by(self, column):
+        if self._sort_column == column:
+            self._sort_reverse = not self._sort_reverse
+        else:
+            self._sort_column, self._sort_reverse = column, False
+        for col in self.columns:
+            arrow = ""
+            if col == column:
+                arrow = " ▼" if self._sort_reverse else " ▲"
+            self.tree.heading(col, text=col + arrow)
+        self._refresh_view()
+
+    def set_filter(self, text):
+        self._filter_text = (text or "").strip().lower()
+        self._refresh_view()
+
+    def _schedule_filter(self):
+        if self._filter_job:
+            self.after_cancel(self._filter_job)
+        self._filter_job = self.after(200, lambda: self.set_filter(self.filter_var.get()))
+
+    @staticmethod
+    def _sort_key(value):
+        if value is None or value == '':
+            return (2, 0, '')
+        text = str(value)
+        try:
+            return (0, float(text.rstrip('%h')), '')
+        except ValueError:
+            return (1, 0, text.lower())
+
+    def _refresh_view(self):
+        view = range(len(self._rows))
+        if self._filter_text:
+            if self._search_text is None:
+                self._search_text = [" ".join(str(v) for v in row).lower() for row in self._rows]
+            needle = self._filter_text
+            view = [i for i in view if needle in self._search_text[i]]
+        if self._sort_column is not None:
+            col = self.columns.index(self._sort_column)
+            key = self._sort_key
+            rows = self._rows
+            view = sorted(view, key=lambda i: key(rows[i][col]), reverse=self._sort_reverse)
+        self._view = list(view)
+        if self._selected is not None and self._filter_text and self._selected not in set(self._view):
+            self._selected = None  # filtered out
+        self._top = 0
+        self._render()
+        if self.count_label is not None:
+            self.count_label.config(text=f"{len(self._view)} of {len(self._rows)} rows")
+
+    # Rendering: the Treeview's items are slots "0".."n-1", refilled from _view[_top:]
+    def _render(self):
+        self._top = max(0, min(self._top, len(self._view) - self._slots))
+        shown = self._view[self._top:self._top + self._slots]
+        children = self.tree.get_children()
+        if len(children) > len(shown):
+            self.tree.delete(*children[len(shown):])
+        rows = self._rows
+        selected_slot = None
+        for slot, i in enumerate(shown):
+            iid = str(slot)
+            if slot < len(children):
+                self.tree.item(iid, values=rows[i])
+            else:
+                self.tree.insert('', 'end', iid=iid, values=rows[i])
+            if i == self._selected:
+                selected_slot = iid
+        # The highlight follows the selected row, not the slot it was in
+        if selected_slot is not None:
+            if self.tree.selection() != (selected_slot,):
+                self.tree.selection_set(selected_slot)
+            self.tree.focus(selected_slot)
+        elif self.tree.selection():
+            self.tree.selection_set(())
+        total = len(self._view)
+        if total:
+            self.scrollbar.set(self._top / total, min(self._top + self._slots, total) / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def _scroll(self, rows):
+        self._top += rows
+        self._render()
+        return 'break'
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == 'moveto':
+            self._top = round(float(amount) * len(self._view))
+        elif action == 'scroll':
+            self._top += int(amount) * (self._slots if unit == 'pages' else 1)
+        self._render()
+
+    def _on_resize(self):
+        # Fit the slot count to the rows the Treeview has room for
+        children = self.tree.get_children()
+        bbox = self.tree.bbox(children[0]) if children else ''
+        if not bbox:
+            return
+        _, y, _, row_height = bbox
+        slots = max(1, (self.tree.winfo_height() - y) // max(row_height, 1))
+        if slots != self._slots:
+            self._slots = slots
+            self._render()
+
+    def _on_select(self):
+        selection = self.tree.selection()
+        if selection:
+            self._selected = self._view[self._top + int(selection[0])]
+        elif self._selected is not None and self._selected in self._view[self._top:self._top + self._slots]:
+            self._selected = None  # deselected while in view (not just scrolled away)
+
+    def _move_selection(self, step):
+        if not self._view:
+            return 'break'
+        try:
+            position = self._view.index(self._selected) + step
+        except ValueError:
+            position = self._top
+        position = max(0, min(position, len(self._view) - 1))
+        self._selected = self._view[position]
+        if position < self._top:
+            self._top = position
+        elif position >= self._top + self._slots:
+            self._top = position - self._slots + 1
+        self._render()
+        return 'break'
+
+    def _activate(self, slot):
+        if slot:
+            self._selected = self._view[self._top + int(slot)]
+        if self.on_activate and self.selected_index() is not None:
+            self.on_activate(self.selected_id(), self.selected_values())